@@ -1,7 +1,15 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 import os
+import hmac
+import logging
+import json
+import asyncio
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -9,9 +17,54 @@ from dotenv import load_dotenv
 env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+# The connector and path builder log per request and on upstream errors.
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="%(levelname)s %(name)s: %(message)s")
+
 from .modules.path_builder import PathBuilder
+from .modules import metrics
+from .modules.recorder import TrafficRecorder, RecordingMiddleware
+from .modules.admission import Overloaded
+from .modules.tree_codec import EncodedTrees, etag_matches
+
+@asynccontextmanager
+async def lifespan(app):
+    # Serve straight away and load the TF-IDF index, knowledge graph and
+    # Gemini SDK in the background; a request arriving first loads what it
+    # needs itself. WARMUP=false leaves everything to first use.
+    if os.environ.get("WARMUP", "true").lower() == "true":
+        warmup = asyncio.get_running_loop().run_in_executor(None, path_builder.warmup)
+        warmup.add_done_callback(log_warmup_failure)
+    interval = reload_interval()
+    watcher = asyncio.create_task(watch_data(interval)) if interval > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+
+def log_warmup_failure(future):
+    # Nobody awaits the warmup; without this its errors would go unseen.
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Warmup failed, loading on first use instead: {future.exception()}")
 
-app = FastAPI(title="Neural LearnPath API")
+def reload_interval():
+    # DATA_RELOAD_INTERVAL (seconds) polls domains.json and knowledge_graph.json
+    # and reloads them when they change. POST /admin/reload only reaches the
+    # worker that serves it, so with several workers the poll is how the
+    # others pick up an edit, and it is on by default.
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    return float(os.environ.get("DATA_RELOAD_INTERVAL", "10" if workers > 1 else "0"))
+
+async def watch_data(interval):
+    path_builder.reload_if_changed()  # records the files as loaded at start
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            summary = await run_in_threadpool(path_builder.reload_if_changed)
+            if summary is not None:
+                print(f"Reloaded data files: {summary}")
+        except Exception as e:
+            print(f"Data reload failed, keeping the loaded data: {e}")
+
+app = FastAPI(title="Neural LearnPath API", lifespan=lifespan)
 
 # CORS Middleware
 app.add_middleware(
@@ -20,11 +73,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read ETag and send it back as If-None-Match.
+    expose_headers=["ETag"],
 )
+# Record traffic for utils/replay_traffic.py when TRAFFIC_LOG names a file.
+# With several workers, put "{pid}" in the name to give each its own file.
+traffic_log = os.environ.get("TRAFFIC_LOG")
+if traffic_log:
+    app.add_middleware(
+        RecordingMiddleware,
+        recorder=TrafficRecorder(
+            traffic_log.format(pid=os.getpid()),
+            max_bytes=int(os.environ.get("TRAFFIC_LOG_MAX_MB", "50")) * 1024 * 1024,
+            backups=int(os.environ.get("TRAFFIC_LOG_BACKUPS", "5")),
+        ),
+    )
+# Outermost, so request counts and latencies include CORS handling.
+app.add_middleware(metrics.MetricsMiddleware)
 # Note: If CORS still fails with credentials, consider specific origins
 # allow_origins=["http://localhost:5500", "http://127.0.0.1:5500", "http://localhost:8000"]
 
 path_builder = PathBuilder()
+# Tree responses serialized and compressed once, reused while the same tree
+# keeps being served from a cache or the knowledge graph.
+encoded_trees = EncodedTrees(int(os.environ.get("ENCODED_TREES", "512")))
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    # Shed load quickly; well-behaved clients back off for Retry-After.
+    return JSONResponse(
+        {"error": str(exc), "retry_after": exc.retry_after},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 class PathRequest(BaseModel):
     text: str
@@ -35,20 +116,132 @@ class ProcessRequest(BaseModel):
     level: str = "beginner"
     selected_node: str = "root"
 
+def with_tree_id(result):
+    # Cached results are shared, so add the ID on a shallow copy.
+    if isinstance(result, dict) and "tree" in result:
+        encoded = encoded_trees.get(result)
+        key = encoded.tree_id if encoded is not None else None
+        return {**result, "tree_id": path_builder.register_tree(result, key)}
+    return result
+
+def tree_response(http_request, result):
+    # Trees go out as pre-encoded bytes with an ETag; a client that already
+    # has this exact response gets a 304. Errors (and anything that does not
+    # validate as a tree) take the normal JSON path.
+    encoded = encoded_trees.get(result)
+    if encoded is None:
+        return with_tree_id(result)
+    path_builder.register_tree(result, encoded.tree_id)
+    headers = {"ETag": encoded.etag, "Vary": "Accept-Encoding"}
+    if etag_matches(http_request.headers.get("if-none-match"), encoded.etag):
+        return Response(status_code=304, headers=headers)
+    encoding, body = encoded.negotiate(http_request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
 @app.post("/generate_path")
-async def generate_path(request: PathRequest):
+async def generate_path(request: PathRequest, http_request: Request):
     try:
         # Use simple 2-level hierarchical generation for initial
-        result = path_builder.gemini.process_request(request.text, request.level, "root")
-        return result
+        result = await path_builder.aprocess_request(request.text, request.level, "root")
+        return tree_response(http_request, result)
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/process")
-async def process_engine(request: ProcessRequest):
+async def process_engine(request: ProcessRequest, http_request: Request):
+    try:
+        result = await path_builder.aprocess_request(request.topic, request.level, request.selected_node)
+        return tree_response(http_request, result)
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/process/stream")
+async def process_engine_stream(request: ProcessRequest, http_request: Request):
+    async def lines():
+        events = path_builder.astream_tree_events(request.topic, request.level, request.selected_node)
+        async with aclosing(events):
+            async for event in events:
+                if await http_request.is_disconnected():
+                    return
+                yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class GeneratePathsRequest(BaseModel):
+    items: list[PathRequest]
+    concurrency: Optional[int] = None
+
+# Upper bounds for /generate_paths; a request may ask for less parallelism.
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+
+@app.post("/generate_paths")
+async def generate_paths(request: GeneratePathsRequest, http_request: Request):
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    concurrency = min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+
+    async def lines():
+        # One NDJSON line per distinct input as soon as it is ready, then a
+        # summary line. "indices" maps each result back to the request items.
+        results = path_builder.agenerate_paths(
+            [(item.text, item.level) for item in request.items], concurrency
+        )
+        unique = errors = 0
+        async with aclosing(results):
+            async for indices, topic, level, result in results:
+                if await http_request.is_disconnected():
+                    return
+                unique += 1
+                line = {"indices": indices, "text": topic, "level": level}
+                if isinstance(result, dict) and "error" in result:
+                    errors += 1
+                    line.update(type="error", error=result["error"])
+                else:
+                    line.update(type="result", result=with_tree_id(result))
+                yield json.dumps(line) + "\n"
+        yield json.dumps({"type": "done", "items": len(request.items), "unique": unique, "errors": errors}) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class ExpandRequest(BaseModel):
+    topic: str
+    level: str = "beginner"
+    tree_id: Optional[str] = None
+    tree: Optional[dict] = None
+    path: Optional[list[int]] = None
+    selected_node: Optional[str] = None
+
+@app.post("/expand")
+async def expand_node(request: ExpandRequest):
+    # Expanding the root would regenerate the whole tree; that is /process.
+    if request.path is None and request.selected_node is None:
+        raise HTTPException(status_code=422, detail="Send path or selected_node to expand.")
     try:
-        result = path_builder.gemini.process_request(request.topic, request.level, request.selected_node)
-        return result
+        return await path_builder.aexpand(
+            request.topic,
+            request.level,
+            tree_id=request.tree_id,
+            tree=request.tree,
+            path=request.path,
+            selected_node=request.selected_node,
+        )
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -57,16 +250,131 @@ class ChatRequest(BaseModel):
     topic: str
     level: str = "beginner"
     node_context: str = "root"
+    # Optional conversation memory: the same session_id on every message of
+    # a chat, and the learning tree on the first one.
+    session_id: Optional[str] = None
+    tree: Optional[dict] = None
 
 @app.post("/chat")
 async def chat_tutor(request: ChatRequest):
     try:
-        response = path_builder.gemini.get_tutor_response(
+        response = await path_builder.gemini.aget_tutor_response(
             request.message, 
             request.topic, 
             request.level, 
-            request.node_context
+            request.node_context,
+            session_id=request.session_id,
+            tree=request.tree,
         )
         return {"response": response}
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_tutor_stream(request: ChatRequest, http_request: Request):
+    # Reject before the 200 goes out if the chat queue is already full.
+    path_builder.gemini.admission.check("chat")
+
+    async def events():
+        chunks = path_builder.gemini.astream_tutor_response(
+            request.message,
+            request.topic,
+            request.level,
+            request.node_context,
+            session_id=request.session_id,
+            tree=request.tree,
+        )
+        # aclosing() makes sure the upstream stream is closed as soon as we
+        # stop iterating, including when the client goes away mid-answer.
+        async with aclosing(chunks):
+            try:
+                async for chunk in chunks:
+                    if await http_request.is_disconnected():
+                        return
+                    yield sse_event({"delta": chunk})
+            except Exception as e:
+                yield sse_event({"error": str(e)}, event="error")
+                return
+        yield sse_event({}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class DetectDomainsRequest(BaseModel):
+    texts: list[str]
+    top_k: int = 3
+
+@app.post("/detect_domains")
+async def detect_domains(request: DetectDomainsRequest):
+    try:
+        # One matrix product for the whole batch, off the event loop since
+        # large analytics batches are CPU-bound.
+        results = await run_in_threadpool(
+            path_builder.tfidf_engine.detect_domains, request.texts, request.top_k
+        )
+        return {
+            "results": [
+                [{"domain": domain, "score": score} for domain, score in row]
+                for row in results
+            ]
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/route/stats")
+async def route_stats():
+    stats = path_builder.route_stats()
+    if path_builder.gemini.hedger is not None:
+        stats["hedging"] = path_builder.gemini.hedger.stats()
+    return stats
+
+@app.post("/admin/reload")
+async def reload_data(request: Request):
+    # Disabled unless ADMIN_TOKEN is set; the caller sends it as X-Admin-Token.
+    # Reloads this worker now; other workers follow within the reload poll.
+    token = os.environ.get("ADMIN_TOKEN")
+    # Constant-time compare; bytes, since compare_digest rejects non-ASCII str.
+    sent = request.headers.get("X-Admin-Token", "").encode("utf-8")
+    if not token or not hmac.compare_digest(sent, token.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    try:
+        return await run_in_threadpool(path_builder.reload)
+    except Exception as e:
+        # The previous data stays in service.
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return path_builder.gemini.admission.stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    stats = path_builder.gemini.cache.stats()
+    stats["semantic"] = path_builder.gemini.similar.stats()
+    stats["single_flight"] = path_builder.gemini.flight.stats()
+    stats["encoded"] = encoded_trees.stats()
+    if path_builder.gemini.store is not None:
+        # Counts rows in SQLite, which can wait on another worker's write.
+        stats["store"] = await asyncio.to_thread(path_builder.gemini.store.stats)
+    return stats
+
+@app.get("/chat/sessions/stats")
+async def chat_session_stats():
+    return path_builder.gemini.sessions.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
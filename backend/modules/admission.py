@@ -0,0 +1,188 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+from .metrics import ADMISSIONS, record_stage
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot get an upstream slot in time.
+
+    retry_after is a whole number of seconds suitable for a Retry-After header.
+    """
+
+    def __init__(self, kind, reason, retry_after):
+        super().__init__(f"Server busy ({kind} {reason}), retry in {retry_after}s")
+        self.kind = kind
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RequestClass:
+    def __init__(self, name, max_queue, deadline, max_active=None):
+        self.name = name
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.max_active = max_active
+        self.active = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.queue_full = 0
+        self.expired = 0
+
+
+class _Slot:
+    __slots__ = ("controller", "kind", "started")
+
+    def __init__(self, controller, kind):
+        self.controller = controller
+        self.kind = kind
+
+    async def __aenter__(self):
+        self.started = await self.controller.acquire(self.kind)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.controller.release(self.kind, self.started)
+        return False
+
+
+class AdmissionController:
+    """Shares a fixed number of upstream call slots between request classes.
+
+    Classes are listed in priority order; when a slot frees up, the waiting
+    request of the highest class gets it. Each class has a bounded queue and
+    a deadline on time spent queued. A full queue or a missed deadline raises
+    Overloaded straight away instead of letting requests pile up. max_active
+    caps how many slots a class may hold at once, which keeps some capacity
+    free for the classes above it.
+    """
+
+    def __init__(self, slots, classes, clock=time.perf_counter):
+        self.slots = slots
+        self.classes = {c.name: c for c in classes}
+        self.order = list(classes)
+        self.clock = clock
+        self.active = 0
+        # Running average of how long a slot is held, for Retry-After.
+        self.avg_hold = 1.0
+        self._loop = None
+
+    def slot(self, kind):
+        return _Slot(self, kind)
+
+    def _bind(self):
+        # Waiters are futures of the running loop; start over on a new loop
+        # (tests, worker restarts) rather than keep dead ones around.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.active = 0
+            for c in self.order:
+                c.active = 0
+                c.waiters.clear()
+
+    def _can_run(self, c):
+        return self.active < self.slots and (c.max_active is None or c.active < c.max_active)
+
+    def _retry_after(self, c):
+        queued = sum(len(other.waiters) for other in self.order)
+        return max(1, math.ceil(self.avg_hold * (queued + 1) / max(1, self.slots)))
+
+    def _start(self, c):
+        self.active += 1
+        c.active += 1
+        c.admitted += 1
+        return self.clock()
+
+    def check(self, kind):
+        """Raises Overloaded if a new request of this class would be rejected."""
+        self._bind()
+        c = self.classes[kind]
+        if not self._can_run(c) and len(c.waiters) >= c.max_queue:
+            c.queue_full += 1
+            ADMISSIONS.inc(kind, "queue_full")
+            raise Overloaded(kind, "queue full", self._retry_after(c))
+
+    async def acquire(self, kind):
+        """Waits for a slot and returns the time it was granted."""
+        self._bind()
+        c = self.classes[kind]
+        # Higher classes only queue while every slot is taken, so a free slot
+        # here never jumps ahead of them.
+        if not c.waiters and self._can_run(c):
+            ADMISSIONS.inc(kind, "admitted")
+            return self._start(c)
+        if len(c.waiters) >= c.max_queue:
+            c.queue_full += 1
+            ADMISSIONS.inc(kind, "queue_full")
+            raise Overloaded(kind, "queue full", self._retry_after(c))
+
+        waiter = self._loop.create_future()
+        c.waiters.append(waiter)
+        start = self.clock()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), c.deadline)
+        except asyncio.TimeoutError:
+            # A slot granted just as the deadline passed is still used.
+            if not waiter.done():
+                c.waiters.remove(waiter)
+                c.expired += 1
+                ADMISSIONS.inc(kind, "expired")
+                raise Overloaded(kind, "queue deadline", self._retry_after(c))
+        except asyncio.CancelledError:
+            # The caller went away; pass on a slot it was just given.
+            if waiter.done():
+                self.release(kind, waiter.result())
+            else:
+                c.waiters.remove(waiter)
+            raise
+        finally:
+            record_stage("queue", self.clock() - start)
+        ADMISSIONS.inc(kind, "admitted")
+        return waiter.result()
+
+    def try_acquire(self, kind):
+        """Takes a free slot without queueing; returns its start time, or None."""
+        self._bind()
+        c = self.classes[kind]
+        if c.waiters or not self._can_run(c):
+            return None
+        return self._start(c)
+
+    def release(self, kind, started):
+        c = self.classes[kind]
+        self.active -= 1
+        c.active -= 1
+        self.avg_hold = 0.8 * self.avg_hold + 0.2 * (self.clock() - started)
+        self._dispatch()
+
+    def _dispatch(self):
+        # Strict priority: a lower class only runs once every higher class
+        # queue is empty or capped by its own max_active.
+        for c in self.order:
+            while c.waiters and self._can_run(c):
+                c.waiters.popleft().set_result(self._start(c))
+            if c.waiters and self.active >= self.slots:
+                return
+
+    def stats(self):
+        return {
+            "slots": self.slots,
+            "active": self.active,
+            "avg_hold_ms": round(self.avg_hold * 1000, 1),
+            "classes": {
+                c.name: {
+                    "active": c.active,
+                    "queued": len(c.waiters),
+                    "max_queue": c.max_queue,
+                    "deadline_s": c.deadline,
+                    "max_active": c.max_active,
+                    "admitted": c.admitted,
+                    "queue_full": c.queue_full,
+                    "expired": c.expired,
+                }
+                for c in self.order
+            },
+        }
@@ -0,0 +1,58 @@
+import hashlib
+import json
+
+
+def tree_id(result):
+    """Content hash of a result's tree, so identical trees share an ID (and cached subtrees)."""
+    canonical = json.dumps(result["tree"], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def find_path(root, title):
+    """Index path of the first node (depth-first) whose title matches, or None."""
+    if not title or title == "root":
+        return []
+    wanted = str(title).strip().lower()
+    stack = [(root, [])]
+    while stack:
+        node, path = stack.pop()
+        if str(node.get("title", "")).strip().lower() == wanted:
+            return path
+        children = node.get("children") or []
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], path + [i]))
+    return None
+
+
+def nodes_along(root, path):
+    """The nodes from the root down to path, or None if the path is invalid."""
+    nodes = [root]
+    for i in path:
+        children = nodes[-1].get("children") or []
+        if not isinstance(i, int) or not 0 <= i < len(children):
+            return None
+        nodes.append(children[i])
+    return nodes
+
+
+def splice(result, path, children):
+    """Returns a copy of result with the node at path given new children.
+
+    Only the nodes along the path are copied; every other subtree is shared
+    with the original, which stays untouched (it may be a cached value).
+    """
+    def rebuild(node, depth):
+        node = dict(node)
+        if depth == len(path):
+            node["children"] = children
+            if node.get("role") == "leaf":
+                node["role"] = "parent"
+            return node
+        node["children"] = list(node["children"])
+        i = path[depth]
+        node["children"][i] = rebuild(node["children"][i], depth + 1)
+        return node
+
+    spliced = dict(result)
+    spliced["tree"] = rebuild(result["tree"], 0)
+    return spliced
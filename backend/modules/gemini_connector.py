@@ -1,111 +1,292 @@
+import asyncio
+import logging
 import os
-import google.genai as genai
-from google.genai import types
-from pydantic import BaseModel
+import re
+import json
+from contextlib import aclosing
 from .mock_connector import MockConnector
+from .tree_cache import TreeCache, normalize_key
+from .single_flight import SingleFlight
+from .tree_stream import IncrementalTreeParser, iter_tree_events, astream_json_text
+from .model_router import ModelRouter, QuotaExhausted
+from .semantic_cache import SemanticCache
+from .tree_store import SQLiteTreeStore
+from .metrics import timed, CACHE_LOOKUPS, FALLBACKS, LLM_CALLS, LLM_TOKENS, TREE_PARSES
+from .recorder import annotate
+from .hedging import Hedger
+from .admission import AdmissionController, Overloaded, RequestClass
+from .tree_schema import Expansion, LearningTree, parse_children, parse_tree, tree_prompt_prefix
+from .tutor_sessions import TutorSessions
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+_RETRY_DELAY = re.compile(r"retry_?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE)
 
 class GeminiConnector:
+    # Rough output sizes used to reserve tokens/min budget before a call.
+    TREE_OUTPUT_TOKENS = 2500
+    EXPAND_OUTPUT_TOKENS = 600
+    CHAT_OUTPUT_TOKENS = 500
+
     def __init__(self):
         self.api_key = os.environ.get("GEMINI_API_KEY")
         if not self.api_key:
-            print("Warning: GEMINI_API_KEY not found in environment variables.")
-        if self.api_key:
-            try:
-                self.client = genai.Client(api_key=self.api_key)
-            except Exception as e:
-                print(f"Failed to initialize Gemini Client: {e}")
-                self.client = None
-        else:
-            self.client = None
-        
+            logger.warning("GEMINI_API_KEY not found in environment variables.")
+        # Built on first use (see the client property); google.genai alone
+        # takes about half a second to import.
+        self._client = _UNSET
+
         self.mock = MockConnector()
+        # Optional callable(topic, level) -> tree or None, tried before the
+        # generic mock tree when no model can answer (see PathBuilder).
+        self.fallback = None
         self.use_mock = os.environ.get("MOCK_AI", "false").lower() == "true"
 
-    def process_request(self, topic, level, selected_node="root"):
-        if not self.api_key or not self.client:
-           return {"error": "Ensure API Key is set"}
+        # Quotas and concurrency limits below are for the whole deployment;
+        # each of the WEB_CONCURRENCY worker processes enforces its share.
+        workers = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+        # Picks the model with the most quota left for every call and only
+        # gives up (QuotaExhausted) once all of them are rate limited.
+        self.router = ModelRouter(workers=workers)
+        # Upper bound on concurrent upstream calls made through the async path.
+        # Chat is served before tree generation, and generation may never take
+        # the last ADMISSION_CHAT_RESERVE slots. Requests that would queue
+        # past the limits below fail fast with Overloaded (HTTP 503).
+        slots = max(1, int(os.environ.get("GEMINI_MAX_CONCURRENCY", "8")) // workers)
+        reserve = int(os.environ.get("ADMISSION_CHAT_RESERVE", "2")) // workers
+        self.admission = AdmissionController(slots, [
+            RequestClass(
+                "chat",
+                max_queue=int(os.environ.get("ADMISSION_CHAT_QUEUE", "32")),
+                deadline=float(os.environ.get("ADMISSION_CHAT_DEADLINE_S", "5")),
+            ),
+            RequestClass(
+                "generate",
+                max_queue=int(os.environ.get("ADMISSION_GENERATE_QUEUE", "64")),
+                deadline=float(os.environ.get("ADMISSION_GENERATE_DEADLINE_S", "20")),
+                max_active=max(1, slots - reserve),
+            ),
+        ])
 
-        prompt = f"""
-        Act as an Advanced Educational Architect. 
-        Generate a complete, comprehensive, and strictly hierarchical learning path for the following:
-
-        Student Goal/Topic: "{topic}"
-        Current Proficiency Level: {level}
-
-        ### 1. TREE STRUCTURE RULES
-        - Total Nodes: Generate exactly 10 to 12 nodes in total across the entire hierarchy.
-        - Hierarchical Depth: Create a balanced tree with at least 3 levels (Root -> Modules -> Subtopics).
-        - No Incremental Loading: Provide the ENTIRE tree structure in this single response.
-        - Node Types:
-            - Root Node: The main subject.
-            - Parent Nodes (Modules): Major conceptual pillars (3-4 modules).
-            - Leaf Nodes (Subtopics): Specific actionable concepts branching from modules.
-        
-        ### 2. CONTENT QUALITY
-        - Adaptation: Tailor all explanations, tasks, and quizzes to the "{level}" level.
-        - Strategic Flow: Sequence nodes logically so earlier ones are prerequisites for later ones.
-        - Practicality: Every node (especially leaves) must have a realistic "task" and a "quiz".
-
-        ### 3. OUTPUT FORMAT (STRICT JSON)
-        Return ONLY valid JSON with this recursive structure:
-        {{
-          "tree": {{
-            "title": "{topic}",
-            "role": "root",
-            "explanation": "High-level overview of the goal.",
-            "children": [
-              {{
-                "title": "Module Title",
-                "role": "parent",
-                "explanation": "Module overview.",
-                "children": [
-                  {{
-                    "title": "Subtopic Title",
-                    "role": "leaf",
-                    "explanation": "Specific concept details.",
-                    "task": "Specific actionable step for the student.",
-                    "quiz": "Challenge question for this node."
-                  }}
-                ]
-              }}
-            ]
-          }},
-          "chatbot": {{
-            "message": "Welcome your student to this complete {topic} roadmap. Mention the total node count and encourage them to explore.",
-            "actions": ["Start with first node", "Show path overview", "Explain goal"]
-          }}
-        }}
-
-        ### CRITICAL:
-        - Output MUST be a single nested JSON object.
-        - Total nodes in the "tree" MUST be between 10 and 12.
-        """
+        # Only successful live generations are cached; errors and mock
+        # fallbacks always go back through the normal path.
+        self.cache = TreeCache(
+            max_size=int(os.environ.get("TREE_CACHE_SIZE", "512")),
+            ttl=float(os.environ.get("TREE_CACHE_TTL", "21600")),
+        )
+        # Optional on-disk tier shared by every worker process and kept across
+        # restarts. Enabled by pointing TREE_STORE_PATH at a SQLite file.
+        store_path = os.environ.get("TREE_STORE_PATH")
+        self.store = SQLiteTreeStore(
+            store_path,
+            ttl=float(os.environ.get("TREE_CACHE_TTL", "21600")),
+            max_bytes=int(os.environ.get("TREE_STORE_MAX_MB", "64")) * 1024 * 1024,
+            read_timeout=float(os.environ.get("TREE_STORE_READ_TIMEOUT_MS", "100")) / 1000,
+        ) if store_path else None
+        # Near-duplicate topics ("learn react" / "ReactJS basics") reuse a tree.
+        self.similar = SemanticCache(
+            threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.85")),
+            max_entries=int(os.environ.get("SEMANTIC_CACHE_SIZE", "2048")),
+            ttl=float(os.environ.get("TREE_CACHE_TTL", "21600")),
+        )
+        # Optional backup calls for slow generations (see Hedger).
+        self.hedger = Hedger(
+            quantile=float(os.environ.get("HEDGE_QUANTILE", "0.9")),
+            budget=float(os.environ.get("HEDGE_BUDGET", "0.05")),
+            burst=max(1.0, 5.0 / workers),
+        ) if os.environ.get("GEMINI_HEDGE", "false").lower() == "true" else None
+        # Identical trees requested at the same time share one upstream call.
+        self.flight = SingleFlight()
+        # Chat memory for clients that send a session_id (see TutorSessions),
+        # shared between workers through the tree store when there is one.
+        self.sessions = TutorSessions(
+            max_sessions=int(os.environ.get("TUTOR_SESSIONS", "1000")),
+            max_turns=int(os.environ.get("TUTOR_SESSION_TURNS", "6")),
+            max_chars=int(os.environ.get("TUTOR_SESSION_CHARS", "4000")),
+            ttl=float(os.environ.get("TUTOR_SESSION_TTL", "3600")),
+            store=self.store,
+        )
 
-        if self.use_mock:
-            return self.mock.process_request(topic, level, selected_node)
+    @property
+    def client(self):
+        if self._client is _UNSET:
+            self._client = None
+            if self.api_key:
+                try:
+                    import google.genai as genai
+                    self._client = genai.Client(api_key=self.api_key)
+                except Exception as e:
+                    logger.error("Failed to initialize Gemini Client: %s", e)
+        return self._client
 
-        try:
-            response = self.client.models.generate_content(
-                model="gemini-flash-latest",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
-            import json
-            return json.loads(response.text)
-        except Exception as e:
-            print(f"Gemini Error in process_request: {e}")
-            if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                print("Quota exhausted. Falling back to Mock Mode.")
-                return self.mock.process_request(topic, level, selected_node)
-            return {"error": f"AI Engine Error: {str(e)}"}
+    @client.setter
+    def client(self, value):
+        self._client = value
 
-    def get_tutor_response(self, query, topic, level="beginner", node_context="root"):
-        if self.use_mock or not self.api_key or not self.client:
-           return self.mock.get_tutor_response(query, node_context)
+    def warmup(self):
+        # Imports the SDK and builds the client ahead of the first request.
+        if self.use_mock or not self.api_key:
+            return None
+        from google.genai import types
+        return self.client
 
-        prompt = f"""
+    def _limiter(self, kind="generate"):
+        return self.admission.slot(kind)
+
+    def _try_slot(self, kind):
+        # A hedge needs an admission slot of its own; the caller's slot is
+        # already held by the primary call.
+        started = self.admission.try_acquire(kind)
+        if started is None:
+            return None
+        return lambda: self.admission.release(kind, started)
+
+    @staticmethod
+    def _is_quota_error(e):
+        return isinstance(e, QuotaExhausted) or "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)
+
+    @staticmethod
+    def _retry_after(e):
+        match = _RETRY_DELAY.search(str(e))
+        return float(match.group(1)) if match else None
+
+    @staticmethod
+    def _used_tokens(response):
+        usage = getattr(response, "usage_metadata", None)
+        return getattr(usage, "total_token_count", None)
+
+    def _record_call(self, model, estimate, response):
+        used = self._used_tokens(response)
+        LLM_CALLS.inc(model, "ok")
+        if used:
+            LLM_TOKENS.inc(model, amount=used)
+        self.router.record_success(model, estimate, used)
+
+    def _estimate_tokens(self, prompt, expected_output):
+        return len(prompt) // 4 + expected_output
+
+    def _generate(self, prompt, config=None, expected_output=CHAT_OUTPUT_TOKENS):
+        # Tries models in router order until one accepts the call. A 429 puts
+        # that model on cooldown; QuotaExhausted means every model is limited.
+        estimate = self._estimate_tokens(prompt, expected_output)
+        tried = set()
+        while True:
+            model = self.router.acquire(estimate, exclude=tried)
+            tried.add(model)
+            try:
+                with timed("llm"):
+                    response = self.client.models.generate_content(
+                        model=model,
+                        contents=prompt,
+                        config=config
+                    )
+            except Exception as e:
+                if not self._is_quota_error(e):
+                    LLM_CALLS.inc(model, "error")
+                    raise
+                LLM_CALLS.inc(model, "quota")
+                logger.warning("Quota exhausted on %s, trying the next model.", model)
+                self.router.record_quota_error(model, self._retry_after(e))
+                continue
+            self._record_call(model, estimate, response)
+            return response
+
+    async def _agenerate(self, prompt, config=None, expected_output=CHAT_OUTPUT_TOKENS, kind="chat"):
+        # kind ("tree", "expand" or "chat") keeps a latency baseline per call
+        # type for the hedger and picks the admission class its hedge uses.
+        if self.hedger is None:
+            return await self._agenerate_once(prompt, config, expected_output)
+        # The hedge prefers a model the primary is not using.
+        used = set()
+        slot_kind = "chat" if kind == "chat" else "generate"
+        return await self.hedger.run(
+            lambda hedge: self._agenerate_once(prompt, config, expected_output, used, hedge),
+            kind=kind,
+            try_slot=lambda: self._try_slot(slot_kind),
+        )
+
+    async def _agenerate_once(self, prompt, config, expected_output, used=None, avoid_used=False):
+        estimate = self._estimate_tokens(prompt, expected_output)
+        tried = set()
+        while True:
+            try:
+                model = self.router.acquire(estimate, exclude=(tried | used) if avoid_used else tried)
+            except QuotaExhausted:
+                if not avoid_used:
+                    raise
+                avoid_used = False
+                continue
+            tried.add(model)
+            if used is not None:
+                used.add(model)
+            try:
+                with timed("llm"):
+                    response = await self.client.aio.models.generate_content(
+                        model=model,
+                        contents=prompt,
+                        config=config
+                    )
+            except Exception as e:
+                if not self._is_quota_error(e):
+                    LLM_CALLS.inc(model, "error")
+                    raise
+                LLM_CALLS.inc(model, "quota")
+                logger.warning("Quota exhausted on %s, trying the next model.", model)
+                self.router.record_quota_error(model, self._retry_after(e))
+                continue
+            self._record_call(model, estimate, response)
+            return response
+
+    async def _astream_text(self, prompt, config=None, expected_output=CHAT_OUTPUT_TOKENS):
+        # Streaming counterpart of _agenerate. Failover only happens before the
+        # first chunk; once text has been yielded errors propagate as-is.
+        estimate = self._estimate_tokens(prompt, expected_output)
+        tried = set()
+        while True:
+            model = self.router.acquire(estimate, exclude=tried)
+            tried.add(model)
+            stream = None
+            try:
+                # Time to first chunk; the rest streams straight to the client.
+                with timed("llm_first_chunk"):
+                    stream = await self.client.aio.models.generate_content_stream(
+                        model=model,
+                        contents=prompt,
+                        config=config
+                    )
+                    first = await anext(stream, None)
+            except Exception as e:
+                if stream is not None and hasattr(stream, "aclose"):
+                    await stream.aclose()
+                if not self._is_quota_error(e):
+                    LLM_CALLS.inc(model, "error")
+                    raise
+                LLM_CALLS.inc(model, "quota")
+                logger.warning("Quota exhausted on %s, trying the next model.", model)
+                self.router.record_quota_error(model, self._retry_after(e))
+                continue
+            LLM_CALLS.inc(model, "ok")
+            self.router.record_success(model, estimate)
+            try:
+                if first is not None and first.text:
+                    yield first.text
+                async for chunk in stream:
+                    if chunk.text:
+                        yield chunk.text
+            finally:
+                if hasattr(stream, "aclose"):
+                    await stream.aclose()
+            return
+
+    def _build_tree_prompt(self, topic, level):
+        # The JSON layout is enforced by the response schema (LearningTree),
+        # so the prompt is a short per-level prefix plus the topic.
+        return tree_prompt_prefix(level) + json.dumps(topic)
+
+    def _build_tutor_prompt(self, query, topic, level, node_context):
+        return f"""
         Role: Friendly AI Tutor named LearnyBot.
         Context: The student is learning about "{topic}".
         Current Focus: "{node_context}".
@@ -119,17 +300,371 @@ class GeminiConnector:
         - If the question is about "{node_context}", provide a direct and helpful answer.
         - If the question is unrelated, gently guide them back to the topic.
         """
+
+    def _tutor_prompt(self, session, query, topic, level, node_context):
+        if session is None:
+            return self._build_tutor_prompt(query, topic, level, node_context)
+        return self.sessions.prompt(session, query, node_context)
+
+    async def _aopen_session(self, session_id, topic, level, tree):
+        # With a shared store, opening a session reads SQLite.
+        if not session_id or self.sessions.store is None:
+            return self.sessions.open(session_id, topic, level, tree)
+        return await asyncio.to_thread(self.sessions.open, session_id, topic, level, tree)
+
+    def _remember_turn(self, session, query, answer):
+        if session is not None and answer:
+            self.sessions.record(session, query, answer)
+
+    def store_get(self, key):
+        # The shared store is best-effort: a locked or broken file must never
+        # fail a request, it only costs a regeneration.
+        if self.store is None:
+            return None
+        try:
+            return self.store.get(key)
+        except Exception as e:
+            logger.warning("Tree store read failed: %s", e)
+            return None
+
+    async def astore_get(self, key):
+        # SQLite reads run in a worker thread so a busy file never stalls
+        # the event loop.
+        if self.store is None:
+            return None
+        return await asyncio.to_thread(self.store_get, key)
+
+    def store_set(self, key, value):
+        # Queued; the store's writer thread commits it (see SQLiteTreeStore.put).
+        if self.store is None:
+            return
+        try:
+            self.store.put(key, value)
+        except Exception as e:
+            logger.warning("Tree store write failed: %s", e)
+
+    def _cached_tree(self, cache_key, topic, level):
+        with timed("cache"):
+            cached = self._memory_tree(cache_key)
+            if cached is not None:
+                return cached
+            stored = self.store_get("tree|" + cache_key) if self.store is not None else None
+            return self._lower_tiers(cache_key, topic, level, stored)
+
+    async def _acached_tree(self, cache_key, topic, level):
+        with timed("cache"):
+            cached = self._memory_tree(cache_key)
+            if cached is not None:
+                return cached
+            stored = await self.astore_get("tree|" + cache_key) if self.store is not None else None
+            return self._lower_tiers(cache_key, topic, level, stored)
+
+    def _memory_tree(self, cache_key):
+        cached = self.cache.get(cache_key)
+        CACHE_LOOKUPS.inc("memory", "miss" if cached is None else "hit")
+        if cached is not None:
+            annotate("cache", "memory")
+        return cached
+
+    def _lower_tiers(self, cache_key, topic, level, stored):
+        # After a memory miss: the shared store's result, then the semantic cache.
+        tier, cached = "store", stored
+        if self.store is not None:
+            CACHE_LOOKUPS.inc("store", "miss" if cached is None else "hit")
+        if cached is None:
+            tier = "semantic"
+            cached = self.similar.get(topic, level)
+            CACHE_LOOKUPS.inc("semantic", "miss" if cached is None else "hit")
+        if cached is not None:
+            self.cache.set(cache_key, cached)
+        annotate("cache", tier if cached is not None else "miss")
+        return cached
+
+    def _build_expand_prompt(self, topic, level, ancestors):
+        return f"""
+        Act as an Advanced Educational Architect.
+        A "{level}" student is following a learning path on "{topic}".
+        Selected node: {" > ".join(ancestors)}
+
+        Break "{ancestors[-1]}" into 3 to 4 specific, actionable subtopics tailored to the "{level}" level,
+        each a leaf with a short explanation, a task and a quiz question.
+        """
+
+    async def aexpand_node(self, topic, level, ancestors):
+        # Generates only the children of one node (ancestors ends with its
+        # title). Returns (children, live); live is False for mock fallbacks
+        # so callers know not to cache them. Errors come back as a dict.
+        if self.use_mock:
+            return self.mock.expand_node(topic, level, ancestors[-1]), False
+        if not self.api_key or not self.client:
+            return {"error": "Ensure API Key is set"}, False
+
+        with timed("prompt"):
+            prompt = self._build_expand_prompt(topic, level, ancestors)
+        try:
+            async with self._limiter():
+                response = await self._agenerate(prompt, self._json_config(Expansion), self.EXPAND_OUTPUT_TOKENS, "expand")
+            with timed("parse"):
+                return parse_children(response.text), True
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error("Gemini Error in aexpand_node: %s", e)
+            if self._is_quota_error(e):
+                FALLBACKS.inc("mock")
+                return self.mock.expand_node(topic, level, ancestors[-1]), False
+            return {"error": f"AI Engine Error: {str(e)}"}, False
+
+    def _remember(self, cache_key, topic, level, result):
+        if isinstance(result, dict) and "tree" in result and "error" not in result:
+            self.cache.set(cache_key, result)
+            self.similar.add(topic, level, result)
+            self.store_set("tree|" + cache_key, result)
+
+    def _fallback_tree(self, topic, level, selected_node):
+        tree = self.fallback(topic, level) if self.fallback else None
+        FALLBACKS.inc("mock" if tree is None else "graph")
+        annotate("fallback", "mock" if tree is None else "graph")
+        return tree if tree is not None else self.mock.process_request(topic, level, selected_node)
+
+    def _tree_config(self):
+        return self._json_config(LearningTree)
+
+    @staticmethod
+    def _json_config(schema):
+        from google.genai import types
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+        )
+
+    @staticmethod
+    def _parse_tree(text):
+        # Truncated output is repaired rather than failed (see parse_tree);
+        # callers only cache complete trees.
+        with timed("parse"):
+            try:
+                result, complete = parse_tree(text)
+            except ValueError:
+                TREE_PARSES.inc("failed")
+                raise
+        TREE_PARSES.inc("ok" if complete else "repaired")
+        if not complete:
+            annotate("repaired", True)
+        return result, complete
+
+    def process_request(self, topic, level, selected_node="root"):
+        # Mock mode needs no API key, so MOCK_AI=true runs fully offline.
+        if self.use_mock:
+            return self.mock.process_request(topic, level, selected_node)
+
+        if not self.api_key or not self.client:
+           return {"error": "Ensure API Key is set"}
+
+        cache_key = normalize_key(topic, level)
+        cached = self._cached_tree(cache_key, topic, level)
+        if cached is not None:
+            return cached
+
+        with timed("prompt"):
+            prompt = self._build_tree_prompt(topic, level)
+
+        try:
+            response = self._generate(prompt, self._tree_config(), self.TREE_OUTPUT_TOKENS)
+            result, complete = self._parse_tree(response.text)
+            if complete:
+                self._remember(cache_key, topic, level, result)
+            return result
+        except Exception as e:
+            logger.error("Gemini Error in process_request: %s", e)
+            if self._is_quota_error(e):
+                logger.warning("Quota exhausted. Falling back to Mock Mode.")
+                return self._fallback_tree(topic, level, selected_node)
+            return {"error": f"AI Engine Error: {str(e)}"}
+
+    async def aprocess_request(self, topic, level, selected_node="root"):
+        # Same contract as process_request, but awaits the SDK's async client
+        # so a slow generation never blocks the event loop.
+        # Mock mode needs no API key, so MOCK_AI=true runs fully offline.
+        if self.use_mock:
+            return self.mock.process_request(topic, level, selected_node)
+
+        if not self.api_key or not self.client:
+           return {"error": "Ensure API Key is set"}
+
+        cache_key = normalize_key(topic, level)
+        cached = await self._acached_tree(cache_key, topic, level)
+        if cached is not None:
+            return cached
+
+        return await self.flight.do(
+            cache_key, lambda: self._agenerate_tree(topic, level, selected_node, cache_key)
+        )
+
+    async def agenerate_tree(self, topic, level):
+        # Uncached generation that raises on failure instead of falling back,
+        # so batch callers (utils/precompute_trees.py) can retry. A truncated
+        # tree counts as a failure here; it is not worth storing.
+        result, complete = await self._agenerate_parsed(topic, level)
+        if not complete:
+            raise ValueError("Gemini returned a truncated tree")
+        return result
+
+    async def _agenerate_parsed(self, topic, level):
+        if self.use_mock:
+            return self.mock.process_request(topic, level), True
+        with timed("prompt"):
+            prompt = self._build_tree_prompt(topic, level)
+        async with self._limiter():
+            response = await self._agenerate(prompt, self._tree_config(), self.TREE_OUTPUT_TOKENS, "tree")
+        return self._parse_tree(response.text)
+
+    async def _agenerate_tree(self, topic, level, selected_node, cache_key):
         try:
-            response = self.client.models.generate_content(
-                model="gemini-flash-latest",
-                contents=prompt
-            )
+            result, complete = await self._agenerate_parsed(topic, level)
+            if complete:
+                self._remember(cache_key, topic, level, result)
+            return result
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error("Gemini Error in aprocess_request: %s", e)
+            if self._is_quota_error(e):
+                logger.warning("Quota exhausted. Falling back to Mock Mode.")
+                return self._fallback_tree(topic, level, selected_node)
+            return {"error": f"AI Engine Error: {str(e)}"}
+
+    async def astream_tree_events(self, topic, level, selected_node="root"):
+        # Streams the tree as node events (see IncrementalTreeParser) while the
+        # model is still generating, finishing with a "done" event.
+        if not self.use_mock and (not self.api_key or not self.client):
+            yield {"type": "error", "error": "Ensure API Key is set"}
+            return
+
+        cache_key = normalize_key(topic, level)
+        if not self.use_mock:
+            cached = await self._acached_tree(cache_key, topic, level)
+            if cached is not None:
+                for event in iter_tree_events(cached):
+                    yield event
+                yield {"type": "done", "complete": True, "cached": True}
+                return
+
+        source = {"live": not self.use_mock}
+        if self.use_mock:
+            chunks = self.mock.astream_tree_text(topic, level, selected_node)
+        else:
+            chunks = self._astream_tree_text(topic, level, selected_node, source)
+
+        parser = IncrementalTreeParser()
+        async with aclosing(chunks):
+            try:
+                async for chunk in chunks:
+                    for event in parser.feed(chunk):
+                        yield event
+                    if parser.error is not None:
+                        # Nothing after a syntax error can be placed in the
+                        # tree, so stop the upstream call and say so.
+                        logger.error("Unparseable tree stream: %s", parser.error)
+                        TREE_PARSES.inc("failed")
+                        yield {"type": "error", "error": f"AI Engine Error: unparseable model output: {parser.error}"}
+                        break
+            except Overloaded as e:
+                yield {"type": "error", "error": str(e), "retry_after": e.retry_after}
+            except Exception as e:
+                logger.error("Gemini Error in astream_tree_events: %s", e)
+                yield {"type": "error", "error": f"AI Engine Error: {str(e)}"}
+
+        if source["live"] and parser.complete:
+            self._remember(cache_key, topic, level, parser.result())
+        yield {"type": "done", "complete": parser.complete, "cached": False}
+
+    async def _astream_tree_text(self, topic, level, selected_node, source):
+        prompt = self._build_tree_prompt(topic, level)
+        async with self._limiter():
+            texts = self._astream_text(prompt, self._tree_config(), self.TREE_OUTPUT_TOKENS)
+            async with aclosing(texts):
+                try:
+                    async for text in texts:
+                        yield text
+                except QuotaExhausted:
+                    logger.warning("Quota exhausted. Falling back to Mock Mode.")
+                    source["live"] = False
+                    async for text in astream_json_text(self._fallback_tree(topic, level, selected_node)):
+                        yield text
+
+    # With a session_id the prompt carries the session's earlier turns and
+    # the answer is added to them; tree is only used to start a session.
+    def get_tutor_response(self, query, topic, level="beginner", node_context="root", session_id=None, tree=None):
+        session = self.sessions.open(session_id, topic, level, tree)
+        if self.use_mock or not self.api_key or not self.client:
+            answer = self.mock.get_tutor_response(query, node_context)
+            self._remember_turn(session, query, answer)
+            return answer
+
+        prompt = self._tutor_prompt(session, query, topic, level, node_context)
+        try:
+            response = self._generate(prompt)
+            self._remember_turn(session, query, response.text)
             return response.text
         except Exception as e:
-            if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
+            if self._is_quota_error(e):
+                FALLBACKS.inc("mock")
                 return self.mock.get_tutor_response(query, node_context)
             return str(e)
 
+    async def aget_tutor_response(self, query, topic, level="beginner", node_context="root", session_id=None,
+                                  tree=None):
+        session = await self._aopen_session(session_id, topic, level, tree)
+        if self.use_mock or not self.api_key or not self.client:
+            answer = self.mock.get_tutor_response(query, node_context)
+            self._remember_turn(session, query, answer)
+            return answer
+
+        prompt = self._tutor_prompt(session, query, topic, level, node_context)
+        try:
+            async with self._limiter("chat"):
+                response = await self._agenerate(prompt)
+            self._remember_turn(session, query, response.text)
+            return response.text
+        except Overloaded:
+            raise
+        except Exception as e:
+            if self._is_quota_error(e):
+                FALLBACKS.inc("mock")
+                return self.mock.get_tutor_response(query, node_context)
+            return str(e)
+
+    async def astream_tutor_response(self, query, topic, level="beginner", node_context="root", session_id=None,
+                                     tree=None):
+        # Yields the tutor answer as text chunks as they arrive. Closing this
+        # generator (e.g. on client disconnect) closes the upstream stream too,
+        # and an answer that was cut short is not added to the session.
+        session = await self._aopen_session(session_id, topic, level, tree)
+        if self.use_mock or not self.api_key or not self.client:
+            parts = []
+            async for chunk in self.mock.astream_tutor_response(query, node_context):
+                parts.append(chunk)
+                yield chunk
+            self._remember_turn(session, query, "".join(parts))
+            return
+
+        prompt = self._tutor_prompt(session, query, topic, level, node_context)
+        parts = []
+        async with self._limiter("chat"):
+            texts = self._astream_text(prompt)
+            async with aclosing(texts):
+                try:
+                    async for text in texts:
+                        parts.append(text)
+                        yield text
+                except QuotaExhausted:
+                    FALLBACKS.inc("mock")
+                    async for chunk in self.mock.astream_tutor_response(query, node_context):
+                        yield chunk
+                    return
+        self._remember_turn(session, query, "".join(parts))
+
     def generate_full_path(self, topic, level):
         # Legacy placeholder or for initial full structure if needed
         return self.process_request(topic, level, "root")
@@ -149,15 +684,8 @@ class GeminiConnector:
         """
         
         try:
-            response = self.client.models.generate_content(
-                model="gemini-flash-latest",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
-            import json
+            response = self._generate(prompt, self._json_config(None))
             return json.loads(response.text)
         except Exception as e:
-            print(f"Gemini Error: {e}")
+            logger.error("Gemini Error: %s", e)
             return [f"Error: {str(e)}"]
@@ -0,0 +1,232 @@
+from .semantic_cache import semantic_topic
+
+# Nodes at or below this graph level are assumed known at the given proficiency.
+LEVEL_FLOOR = {"beginner": 0, "intermediate": 1, "advanced": 2}
+
+
+# Words shown in capitals in generated titles; everything else is capitalized.
+ACRONYMS = {"ai", "api", "aws", "cnn", "css", "dom", "gpu", "html", "http", "js", "ml", "nlp", "rnn", "sql", "ui", "ux"}
+
+
+def node_title(node_id):
+    return " ".join(word.upper() if word in ACRONYMS else word.capitalize() for word in node_id.split("_"))
+
+
+class CompiledDomain:
+    """One knowledge-graph domain compiled into index-based structures.
+
+    Nodes are numbered in topological order, so "in order" is simply "by
+    index". prereqs[i] is a bitset of direct prerequisites and closure[i] the
+    bitset of every node that must come before node i.
+    """
+
+    def __init__(self, name, graph):
+        self.name = name
+        nodes = graph.get("nodes", [])
+        edges = graph.get("edges", [])
+
+        ids = [n["id"] for n in nodes]
+        position = {node_id: i for i, node_id in enumerate(ids)}
+        parents = [[] for _ in ids]
+        for edge in edges:
+            if edge["from"] in position and edge["to"] in position:
+                parents[position[edge["to"]]].append(position[edge["from"]])
+
+        order = self._topological_order(parents, [n.get("level", 1) for n in nodes])
+
+        # Renumber everything so index == topological rank.
+        rank = {old: new for new, old in enumerate(order)}
+        self.ids = [ids[i] for i in order]
+        self.levels = [nodes[i].get("level", 1) for i in order]
+        self.types = [nodes[i].get("type", "core") for i in order]
+        # Nodes may set "title" where node_title() would get the casing wrong.
+        self.titles = [nodes[i].get("title") or node_title(nodes[i]["id"]) for i in order]
+        self.descriptions = [nodes[i].get("description") for i in order]
+        self.tasks = [nodes[i].get("task") for i in order]
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.parents = [sorted(rank[p] for p in parents[i]) for i in order]
+
+        self.prereqs = [0] * len(self.ids)
+        self.closure = [0] * len(self.ids)
+        for i, direct in enumerate(self.parents):
+            for p in direct:
+                self.prereqs[i] |= 1 << p
+                self.closure[i] |= self.closure[p] | (1 << p)
+
+        self.all_mask = (1 << len(self.ids)) - 1
+        # Subject words only, so "python_basics" is named by "learn python".
+        self._word_sets = [frozenset(semantic_topic(node_id).split()) for node_id in self.ids]
+        self._name_words = frozenset(semantic_topic(name).split())
+
+    @staticmethod
+    def _topological_order(parents, levels):
+        # Kahn's algorithm; among ready nodes the lowest graph level goes first
+        # so the order also reads as a sensible curriculum.
+        children = [[] for _ in parents]
+        pending = [len(p) for p in parents]
+        for child, direct in enumerate(parents):
+            for p in direct:
+                children[p].append(child)
+        ready = sorted((i for i, n in enumerate(pending) if n == 0), key=lambda i: (levels[i], i))
+        order = []
+        while ready:
+            node = ready.pop(0)
+            order.append(node)
+            for child in children[node]:
+                pending[child] -= 1
+                if pending[child] == 0:
+                    ready.append(child)
+            ready.sort(key=lambda i: (levels[i], i))
+        if len(order) != len(parents):
+            raise ValueError("knowledge graph contains a cycle")
+        return order
+
+    def resolve(self, text):
+        """Returns the index of the node whose id words all appear in text, if any."""
+        words = set(semantic_topic(text).split())
+        best = None
+        for i, node_words in enumerate(self._word_sets):
+            if node_words and node_words <= words and (best is None or len(node_words) > len(self._word_sets[best])):
+                best = i
+        return best
+
+    def match(self, text):
+        """Says how much of text the graph covers.
+
+        Returns "node" when every subject word belongs to nodes named in text
+        (or the domain name alongside them), "domain" when text is just the
+        domain name, and None when any word is left over, as in "machine
+        learning for finance".
+        """
+        words = set(semantic_topic(text).split())
+        known = set(self._name_words) if self._name_words <= words else set()
+        named = False
+        for node_words in self._word_sets:
+            if node_words and node_words <= words:
+                known |= node_words
+                named = True
+        if not words or not words <= known:
+            return None
+        return "node" if named else "domain"
+
+    def path_mask(self, target=None, level="beginner"):
+        floor = LEVEL_FLOOR.get(str(level).lower(), 0)
+        mask = self.all_mask if target is None else self.closure[target] | (1 << target)
+        for i, node_level in enumerate(self.levels):
+            if node_level <= floor and i != target:
+                mask &= ~(1 << i)
+        return mask
+
+
+class KnowledgeGraphEngine:
+    """Builds learning trees straight from knowledge_graph.json, without the LLM.
+
+    Trees use the same {"tree": ..., "chatbot": ...} shape as GeminiConnector:
+    the root is the goal, modules are the graph levels (stages) and leaves are
+    the graph nodes in prerequisite order. Results are memoized per
+    (domain, target, level), so repeated requests cost a dict lookup.
+
+    Passing the engine being replaced as previous reuses its compiled
+    domains and memoized trees for every domain whose graph is unchanged;
+    changed lists the domains that were added, edited or removed.
+    """
+
+    def __init__(self, knowledge_graph, previous=None):
+        old = previous.sources if previous is not None else {}
+        self.sources = knowledge_graph
+        self.domains = {}
+        self.changed = set(old) - set(knowledge_graph)
+        for name, graph in knowledge_graph.items():
+            if name in old and old[name] == graph:
+                self.domains[name] = previous.domains[name]
+            else:
+                self.domains[name] = CompiledDomain(name, graph)
+                self.changed.add(name)
+        self._trees = {}
+        if previous is not None:
+            self._trees = {key: tree for key, tree in previous._trees.items() if key[0] not in self.changed}
+
+    def __contains__(self, domain):
+        return domain in self.domains
+
+    def path(self, domain, target=None, level="beginner"):
+        compiled = self.domains[domain]
+        index = compiled.index[target] if isinstance(target, str) else target
+        mask = compiled.path_mask(index, level)
+        return [compiled.ids[i] for i in range(len(compiled.ids)) if mask >> i & 1]
+
+    def match(self, domain, topic):
+        compiled = self.domains.get(domain)
+        return compiled.match(topic) if compiled is not None else None
+
+    def tree_key(self, domain, topic=None, level="beginner"):
+        compiled = self.domains.get(domain)
+        if compiled is None:
+            return None
+        target = compiled.resolve(topic) if topic else None
+        return (domain, target, str(level).lower())
+
+    def build_tree(self, domain, topic=None, level="beginner"):
+        key = self.tree_key(domain, topic, level)
+        if key is None:
+            return None
+        compiled, target = self.domains[domain], key[1]
+        tree = self._trees.get(key)
+        if tree is None:
+            tree = self._build(compiled, target, level)
+            self._trees[key] = tree
+        return tree
+
+    def _build(self, compiled, target, level):
+        mask = compiled.path_mask(target, level)
+        stages = {}
+        for i in range(len(compiled.ids)):
+            if mask >> i & 1:
+                stages.setdefault(compiled.levels[i], []).append(self._leaf(compiled, i))
+
+        domain_title = node_title(compiled.name)
+        goal = compiled.titles[target] if target is not None else domain_title
+        modules = [
+            {
+                "title": f"Stage {stage}: {stage_nodes[0]['title']}" if len(stage_nodes) == 1
+                         else f"Stage {stage}: {stage_nodes[0]['title']} & more",
+                "role": "parent",
+                "explanation": f"Level {stage} of the {domain_title} curriculum.",
+                "children": stage_nodes,
+            }
+            for stage, stage_nodes in sorted(stages.items())
+        ]
+        count = 1 + len(modules) + sum(len(m["children"]) for m in modules)
+        return {
+            "tree": {
+                "title": goal,
+                "role": "root",
+                "explanation": f"Your {level} path to {goal}, ordered so every topic comes after its prerequisites.",
+                "children": modules,
+            },
+            "chatbot": {
+                "message": f"Here is your {goal} roadmap from the LearnPath knowledge graph, {count} nodes in prerequisite order. Start with the first stage!",
+                "actions": ["Start with first node", "Show path overview", "Explain goal"],
+            },
+        }
+
+    @staticmethod
+    def _leaf(compiled, i):
+        title = compiled.titles[i]
+        prereqs = [compiled.titles[p] for p in compiled.parents[i]]
+        if prereqs:
+            explanation = f"Builds on {', '.join(prereqs)}."
+            quiz = f"How does {title} build on {prereqs[-1]}?"
+        else:
+            explanation = "A starting point with no prerequisites."
+            quiz = f"What problem does {title} solve?"
+        if compiled.descriptions[i]:
+            explanation = f"{compiled.descriptions[i]} {explanation}"
+        return {
+            "id": compiled.ids[i],
+            "title": title,
+            "role": "leaf",
+            "explanation": explanation,
+            "task": compiled.tasks[i] or f"Complete a small hands-on exercise that uses {title}.",
+            "quiz": quiz,
+        }
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from .metrics import LLM_HEDGES
+
+
+class LatencyTracker:
+    """Running quantile over the most recent call latencies."""
+
+    def __init__(self, quantile=0.9, window=200, min_samples=20, refresh_every=10):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+        self._samples = deque(maxlen=window)
+        self._since_refresh = 0
+        self._value = None
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_refresh += 1
+
+    def value(self):
+        # Re-sorting a few hundred samples is cheap, but not on every call.
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            if self._value is None or self._since_refresh >= self.refresh_every:
+                ordered = sorted(self._samples)
+                self._value = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+                self._since_refresh = 0
+            return self._value
+
+
+class Hedger:
+    """Sends a backup call when the first one is slower than usual.
+
+    If a call has not finished after the running `quantile` of recent call
+    latencies, a second call is started and whichever finishes first wins;
+    the other is cancelled. Each primary call earns `budget` hedge credits
+    (capped at `burst`), and a hedge costs one, so hedges never exceed about
+    `budget` x primaries in extra upstream calls.
+
+    Latencies are tracked separately per call kind, since a full tree takes
+    several times longer than a chat answer. try_slot, when given, must
+    return a release callback for a free upstream slot or None; without a
+    free slot the hedge is skipped rather than queued.
+    """
+
+    def __init__(self, quantile=0.9, budget=0.05, burst=5.0, min_delay=0.05, window=200, min_samples=20,
+                 clock=time.perf_counter):
+        self.quantile = quantile
+        self.window = window
+        self.min_samples = min_samples
+        self.trackers = {}
+        self.budget = budget
+        self.burst = burst
+        self.min_delay = min_delay
+        self.clock = clock
+        self._credits = 0.0
+        self.primaries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+        self.no_slot = 0
+
+    def tracker(self, kind="default"):
+        tracker = self.trackers.get(kind)
+        if tracker is None:
+            tracker = self.trackers[kind] = LatencyTracker(self.quantile, self.window, self.min_samples)
+        return tracker
+
+    def _take_credit(self):
+        if self._credits >= 1.0:
+            self._credits -= 1.0
+            return True
+        self.over_budget += 1
+        LLM_HEDGES.inc("over_budget")
+        return False
+
+    async def _timed(self, call, tracker):
+        start = self.clock()
+        result = await call
+        tracker.add(self.clock() - start)
+        return result
+
+    async def run(self, make_call, kind="default", try_slot=None):
+        """Runs make_call(hedge=False), hedging with make_call(hedge=True)."""
+        self.primaries += 1
+        self._credits = min(self.burst, self._credits + self.budget)
+        tracker = self.tracker(kind)
+        primary = asyncio.ensure_future(self._timed(make_call(False), tracker))
+        threshold = tracker.value()
+        if threshold is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(threshold, self.min_delay))
+            if done:
+                return await primary
+            release = try_slot() if try_slot is not None else None
+            if try_slot is not None and release is None:
+                self.no_slot += 1
+                LLM_HEDGES.inc("no_slot")
+                return await primary
+            if not self._take_credit():
+                if release is not None:
+                    release()
+                return await primary
+
+            self.hedges += 1
+            LLM_HEDGES.inc("sent")
+            hedge = asyncio.ensure_future(self._timed(make_call(True), tracker))
+            if release is not None:
+                # A done callback also runs for a task cancelled before it started.
+                hedge.add_done_callback(lambda _: release())
+            tasks.add(hedge)
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                            LLM_HEDGES.inc("won")
+                        return task.result()
+                    if not tasks:
+                        # Both failed; report the primary's error.
+                        return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        thresholds = {kind: tracker.value() for kind, tracker in self.trackers.items()}
+        return {
+            "threshold_ms": {
+                kind: round(value * 1000, 1) if value is not None else None for kind, value in thresholds.items()
+            },
+            "primaries": self.primaries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "over_budget": self.over_budget,
+            "no_slot": self.no_slot,
+            "extra_call_ratio": round(self.hedges / self.primaries, 4) if self.primaries else 0.0,
+        }
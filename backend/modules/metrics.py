@@ -0,0 +1,170 @@
+import contextvars
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Seconds. Covers cache hits (well under 1ms) up to slow LLM generations.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+
+# Stage durations of the request being handled, for the Server-Timing header.
+_timings = contextvars.ContextVar("learnpath_timings", default=None)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *label_values):
+        entry = self._values.get(label_values)
+        return entry[2] if entry else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                labels = _label_text(self.labels + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+HTTP_REQUESTS = Counter("learnpath_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_DURATION = Histogram("learnpath_http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("method", "route"))
+STAGE_DURATION = Histogram("learnpath_stage_duration_seconds", "Time spent in each request stage.", ("stage",))
+CACHE_LOOKUPS = Counter("learnpath_cache_lookups_total", "Tree cache lookups by tier and result.", ("tier", "result"))
+ROUTES = Counter("learnpath_routes_total", "Tree requests by the route that answered them.", ("route",))
+FALLBACKS = Counter("learnpath_fallbacks_total", "Responses served from the graph or mock fallback instead of the LLM.", ("kind",))
+LLM_CALLS = Counter("learnpath_llm_calls_total", "Upstream Gemini calls by model and outcome.", ("model", "outcome"))
+LLM_TOKENS = Counter("learnpath_llm_tokens_total", "Tokens reported used by Gemini.", ("model",))
+TREE_PARSES = Counter("learnpath_tree_parses_total", "Generated trees by parse outcome: ok, repaired or failed.", ("outcome",))
+LLM_HEDGES = Counter("learnpath_llm_hedges_total", "Backup Gemini calls: sent, won, or skipped for budget or a free slot.", ("outcome",))
+ADMISSIONS = Counter("learnpath_admissions_total", "Upstream slot requests: admitted, queue_full or expired.", ("class", "outcome"))
+
+
+def record_stage(name, seconds):
+    STAGE_DURATION.observe(seconds, name)
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class timed:
+    """Context manager that records the duration of one request stage."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, perf_counter() - self.start)
+        return False
+
+
+def server_timing(timings, total):
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times every HTTP request.
+
+    It counts requests per route template and status, records their latency,
+    and adds a Server-Timing header listing the stages timed while handling
+    the request. Streamed bodies are still running when headers go out, so
+    their header only covers the work done before the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = _timings.set(timings)
+        start = perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(timings, perf_counter() - start).encode("latin-1")
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            # The matched route's template keeps label cardinality bounded.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(scope["method"], route, status)
+            HTTP_DURATION.observe(perf_counter() - start, scope["method"], route)
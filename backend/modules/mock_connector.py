@@ -1,4 +1,6 @@
+import asyncio
 import json
+from .tree_stream import astream_json_text
 
 class MockConnector:
     def process_request(self, topic, level, selected_node="root"):
@@ -49,5 +51,26 @@ class MockConnector:
         }
         return mock_data
 
+    def expand_node(self, topic, level, title):
+        """Returns simulated children for one node of an existing tree."""
+        return [
+            {"title": f"{title}: core ideas", "role": "leaf", "explanation": f"The key concepts behind {title}.", "task": "Summarize them in your own words", "quiz": f"What is {title} for?"},
+            {"title": f"{title}: hands-on practice", "role": "leaf", "explanation": f"Applying {title} in a small project.", "task": "Build a tiny example", "quiz": "What did you build?"},
+            {"title": f"{title}: common pitfalls", "role": "leaf", "explanation": "Mistakes to avoid.", "task": "List three pitfalls", "quiz": "Which pitfall is most common?"},
+        ]
+
     def get_tutor_response(self, query, node_context):
         return f"[Mock Mode] I understand you're asking about '{query}' in the context of '{node_context}'. Unfortunately, my brain is taking a break due to quota limits, but you can keep exploring the nodes!"
+
+    async def astream_tutor_response(self, query, node_context, chunk_words=3):
+        """Yields the mock tutor answer a few words at a time, like a token stream."""
+        words = self.get_tutor_response(query, node_context).split(" ")
+        for i in range(0, len(words), chunk_words):
+            piece = " ".join(words[i:i + chunk_words])
+            yield piece if i + chunk_words >= len(words) else piece + " "
+            await asyncio.sleep(0)
+
+    async def astream_tree_text(self, topic, level, selected_node="root", chunk_size=64):
+        """Yields the mock tree as raw JSON text in small chunks, like a model stream."""
+        async for text in astream_json_text(self.process_request(topic, level, selected_node), chunk_size):
+            yield text
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+# name, requests/min, tokens/min. The first entry is the preferred model; the
+# rest are the fallbacks from utils/probe_quota.py. Override with GEMINI_MODELS,
+# e.g. "gemini-2.0-flash:15:1000000,gemini-2.0-flash-lite:30:1000000".
+DEFAULT_MODELS = [
+    ("gemini-flash-latest", 10, 250000),
+    ("gemini-2.0-flash", 15, 1000000),
+    ("gemini-2.0-flash-lite", 30, 1000000),
+    ("gemini-pro-latest", 5, 250000),
+]
+
+
+class QuotaExhausted(Exception):
+    """Raised when no model has budget left or every model is cooling down."""
+
+
+def parse_models(spec):
+    models = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, rpm, tpm = (item.split(":") + [None, None])[:3]
+        models.append((name, int(rpm or 10), int(tpm or 250000)))
+    return models
+
+
+class TokenBucket:
+    def __init__(self, per_minute, clock):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        self._refill()
+        return self.tokens
+
+    def fraction(self):
+        return self.available() / self.capacity if self.capacity else 0.0
+
+    def take(self, amount):
+        # May go negative when the real usage exceeds the estimate; the debt is
+        # paid back by the refill before the model is picked again.
+        self._refill()
+        self.tokens -= amount
+
+
+class _ModelState:
+    def __init__(self, name, rpm, tpm, clock):
+        self.name = name
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.cooldown_until = 0.0
+        self.consecutive_429 = 0
+        self.total_429 = 0
+        self.calls = 0
+
+
+class ModelRouter:
+    """Spreads Gemini calls across several models by remaining quota.
+
+    Each model has a requests/min and a tokens/min token bucket. A 429 puts the
+    model on a cooldown that doubles with every consecutive 429 and resets on
+    the next success. acquire() picks the model with the fewest recent 429s and
+    the most budget left, and raises QuotaExhausted when none can take the call.
+
+    Quotas belong to the API key, not the process: with `workers` processes
+    sharing a key, each router gets an equal share of every limit.
+    """
+
+    def __init__(self, models=None, cooldown=30.0, max_cooldown=600.0, clock=time.monotonic, workers=1):
+        if models is None:
+            spec = os.environ.get("GEMINI_MODELS")
+            models = parse_models(spec) if spec else DEFAULT_MODELS
+        self.clock = clock
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._models = [
+            _ModelState(name, max(1.0, rpm / workers), tpm / workers, clock) for name, rpm, tpm in models
+        ]
+        self._by_name = {m.name: m for m in self._models}
+        self._lock = threading.Lock()
+
+    @property
+    def models(self):
+        return [m.name for m in self._models]
+
+    def acquire(self, estimated_tokens, exclude=()):
+        with self._lock:
+            now = self.clock()
+            best = None
+            best_score = None
+            for m in self._models:
+                if m.name in exclude or m.cooldown_until > now:
+                    continue
+                if m.requests.available() < 1 or m.tokens.available() < estimated_tokens:
+                    continue
+                score = (-m.consecutive_429, min(m.requests.fraction(), m.tokens.fraction()))
+                if best is None or score > best_score:
+                    best, best_score = m, score
+            if best is None:
+                raise QuotaExhausted("RESOURCE_EXHAUSTED: no Gemini model has quota left")
+            best.requests.take(1)
+            best.tokens.take(estimated_tokens)
+            best.calls += 1
+            return best.name
+
+    def record_success(self, model, estimated_tokens, used_tokens=None):
+        with self._lock:
+            m = self._by_name.get(model)
+            if m is None:
+                return
+            m.consecutive_429 = 0
+            if used_tokens is not None:
+                m.tokens.take(used_tokens - estimated_tokens)
+
+    def record_quota_error(self, model, retry_after=None):
+        with self._lock:
+            m = self._by_name.get(model)
+            if m is None:
+                return
+            m.consecutive_429 += 1
+            m.total_429 += 1
+            delay = retry_after or min(self.cooldown * 2 ** (m.consecutive_429 - 1), self.max_cooldown)
+            m.cooldown_until = self.clock() + delay
+
+    def stats(self):
+        with self._lock:
+            now = self.clock()
+            return {
+                m.name: {
+                    "calls": m.calls,
+                    "requests_left": round(m.requests.available(), 2),
+                    "tokens_left": round(m.tokens.available()),
+                    "cooldown_remaining": round(max(0.0, m.cooldown_until - now), 2),
+                    "consecutive_429": m.consecutive_429,
+                    "total_429": m.total_429,
+                }
+                for m in self._models
+            }
@@ -1,28 +1,369 @@
+import asyncio
 import json
+import logging
 import os
+import threading
+import time
 from .tfidf_engine import TFIDFEngine
 from .gemini_connector import GeminiConnector
+from .graph_engine import KnowledgeGraphEngine
+from .tree_stream import iter_tree_events
+from .tree_cache import TreeCache, normalize_key
+from .metrics import timed, ROUTES
+from .recorder import annotate
+from .expansion import tree_id, find_path, nodes_along, splice
+
+logger = logging.getLogger(__name__)
 
 class PathBuilder:
+    # Upper edges of the confidence buckets reported by route_stats().
+    CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0)
+
     def __init__(self, kg_path="backend/data/knowledge_graph.json"):
         self.kg_path = kg_path
+        # The TF-IDF index, knowledge graph and Gemini client all load on
+        # first use, or earlier from warmup() once the server is up.
         self.tfidf_engine = TFIDFEngine()
         self.gemini = GeminiConnector()
-        self.load_kg()
+        self._graph = None
+        self._graph_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._data_signature = None
+        self.gemini.fallback = self.graph_tree
+
+        # Topics that name knowledge-graph nodes are answered from the graph
+        # instead of the LLM; a bare domain name also needs the detected
+        # domain to reach this confidence.
+        self.graph_threshold = float(os.environ.get("GRAPH_ROUTE_THRESHOLD", "0.5"))
+        # Optionally ask the LLM for extra subtopics in the background and
+        # serve the enriched graph tree to later requests.
+        self.graph_enrich = os.environ.get("GRAPH_ENRICH", "false").lower() == "true"
+        self.enriched = {}
+        self._enriching = set()
+        self._background = set()
+
+        # Trees served to clients by content ID, and the children generated
+        # for their nodes. Identical trees share an ID, so one user's
+        # expansion is reused by everyone who got the same tree.
+        cache_ttl = float(os.environ.get("TREE_CACHE_TTL", "21600"))
+        self.trees = TreeCache(max_size=int(os.environ.get("TREE_STORE_SIZE", "2048")), ttl=cache_ttl)
+        self.subtrees = TreeCache(max_size=int(os.environ.get("SUBTREE_CACHE_SIZE", "4096")), ttl=cache_ttl)
+
+        self.route_counts = {"graph": 0, "graph_enriched": 0, "llm": 0}
+        self.confidence_counts = {
+            route: [0] * len(self.CONFIDENCE_BUCKETS) for route in ("graph", "llm")
+        }
 
     def load_kg(self):
         try:
             with open(self.kg_path, 'r', encoding='utf-8') as f:
                 self.knowledge_graph = json.load(f)
         except Exception as e:
-            print(f"Error loading Knowledge Graph: {e}")
+            logger.error("Error loading Knowledge Graph: %s", e)
             self.knowledge_graph = {}
+        self._graph = KnowledgeGraphEngine(self.knowledge_graph)
+
+    def _signature(self):
+        signature = []
+        for path in (self.tfidf_engine.data_path, self.kg_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def reload(self):
+        """Rebuilds the TF-IDF index and knowledge graph from disk and swaps them in.
+
+        The new snapshot is built next to the old one, reusing the work for
+        domains that did not change, and replaces it with plain attribute
+        assignments, so requests already running finish on the old snapshot.
+        If either file fails to load, nothing is swapped and the error is
+        raised. Returns a summary of what changed.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            signature = self._signature()
+            with open(self.kg_path, 'r', encoding='utf-8') as f:
+                knowledge_graph = json.load(f)
+            old_engine = self.tfidf_engine
+            old_engine.warmup()
+            engine = old_engine.reloaded()
+            graph = KnowledgeGraphEngine(knowledge_graph, previous=self.graph)
+
+            self.tfidf_engine = engine
+            self.knowledge_graph = knowledge_graph
+            self._graph = graph
+            self._data_signature = signature
+            # Enriched trees extend the old graph tree, so they go too. This
+            # runs in the threadpool while _enrich tasks may insert, so copy
+            # the items before filtering.
+            self.enriched = {key: tree for key, tree in list(self.enriched.items()) if key[0] not in graph.changed}
+
+            old_domains = old_engine.domains
+            return {
+                "domains": {
+                    "added": sorted(set(engine.domains) - set(old_domains)),
+                    "removed": sorted(set(old_domains) - set(engine.domains)),
+                    "changed": sorted(n for n in engine.domains if n in old_domains and engine.domains[n] != old_domains[n]),
+                    "retokenized": engine.retokenized,
+                    "refit": engine.fitted,
+                },
+                "graph": {"domains": len(graph.domains), "recompiled": sorted(graph.changed)},
+                "seconds": round(time.perf_counter() - start, 4),
+            }
+
+    def reload_if_changed(self):
+        # Polled by the server when DATA_RELOAD_INTERVAL is set; cheap when nothing moved.
+        signature = self._signature()
+        if self._data_signature is None:
+            self._data_signature = signature
+            return None
+        if signature == self._data_signature:
+            return None
+        return self.reload()
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    self.load_kg()
+        return self._graph
+
+    def warmup(self):
+        """Loads everything a first request would otherwise wait for."""
+        self.tfidf_engine.warmup()
+        self.graph
+        self.gemini.warmup()
+
+    def graph_tree(self, topic, level):
+        # Offline tree for topics that belong to a knowledge-graph domain.
+        graph = self.graph
+        rows = self.tfidf_engine.detect_domains([topic], top_k=1)
+        domain, confidence = rows[0][0] if rows and rows[0] else (None, 0.0)
+        if confidence <= 0 or domain not in graph:
+            return None
+        return graph.build_tree(domain, topic, level)
+
+    def route(self, topic, level):
+        """Returns (tree, key) for the graph fast path, or (None, None) for the LLM."""
+        # One snapshot per request, even if reload() swaps in a new one.
+        graph = self.graph
+        with timed("route"):
+            rows = self.tfidf_engine.detect_domains([topic], top_k=1)
+        domain, confidence = rows[0][0] if rows and rows[0] else (None, 0.0)
+
+        # TF-IDF only picks the likeliest domain. Anything the graph does not
+        # fully cover ("reinforcement learning", "deep learning for NLP")
+        # would get a generic tree, so it goes to the LLM instead.
+        match = graph.match(domain, topic)
+        if match == "node" or (match == "domain" and confidence >= self.graph_threshold):
+            self._count("graph", confidence)
+            key = graph.tree_key(domain, topic, level)
+            enriched = self.enriched.get(key)
+            if enriched is not None:
+                self.route_counts["graph_enriched"] += 1
+                ROUTES.inc("graph_enriched")
+                return enriched, key
+            return graph.build_tree(domain, topic, level), key
+
+        self._count("llm", confidence)
+        return None, None
+
+    def _count(self, route, confidence):
+        self.route_counts[route] += 1
+        ROUTES.inc(route)
+        annotate("route", route)
+        annotate("confidence", round(float(confidence), 4))
+        for i, edge in enumerate(self.CONFIDENCE_BUCKETS):
+            if confidence <= edge or i == len(self.CONFIDENCE_BUCKETS) - 1:
+                self.confidence_counts[route][i] += 1
+                break
+
+    def route_stats(self):
+        labels = [f"<={edge}" for edge in self.CONFIDENCE_BUCKETS]
+        return {
+            "threshold": self.graph_threshold,
+            "enrich": self.graph_enrich,
+            "routes": dict(self.route_counts),
+            "confidence": {
+                route: dict(zip(labels, counts)) for route, counts in self.confidence_counts.items()
+            },
+        }
 
     def process_request(self, topic, level, selected_node="root"):
-        print(f"Processing context: Topic={topic}, Level={level}, Node={selected_node}")
+        logger.info("Processing context: Topic=%s, Level=%s, Node=%s", topic, level, selected_node)
+        tree, _ = self.route(topic, level)
+        if tree is not None:
+            return tree
         return self.gemini.process_request(topic, level, selected_node)
 
+    async def aprocess_request(self, topic, level, selected_node="root"):
+        logger.info("Processing context: Topic=%s, Level=%s, Node=%s", topic, level, selected_node)
+        tree, key = self.route(topic, level)
+        if tree is not None:
+            self._schedule_enrichment(key, topic, tree)
+            return tree
+        return await self.gemini.aprocess_request(topic, level, selected_node)
+
+    async def astream_tree_events(self, topic, level, selected_node="root"):
+        tree, key = self.route(topic, level)
+        if tree is None:
+            async for event in self.gemini.astream_tree_events(topic, level, selected_node):
+                yield event
+            return
+        self._schedule_enrichment(key, topic, tree)
+        for event in iter_tree_events(tree):
+            yield event
+        yield {"type": "done", "complete": True, "cached": True}
+
+    async def agenerate_paths(self, items, concurrency=8):
+        """Generates trees for many (topic, level) pairs, yielding as each finishes.
+
+        Inputs that normalize to the same key are generated once and reported
+        together: each yield is (indices, topic, level, result), where indices
+        are the positions of every matching input. A failing item yields an
+        {"error": ...} result and never stops the rest of the batch.
+        """
+        groups = {}
+        for i, (topic, level) in enumerate(items):
+            group = groups.setdefault(normalize_key(topic, level), (topic, level, []))
+            group[2].append(i)
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(topic, level, indices):
+            async with semaphore:
+                try:
+                    result = await self.aprocess_request(topic, level, "root")
+                except Exception as e:
+                    result = {"error": str(e)}
+            return indices, topic, level, result
+
+        tasks = [asyncio.ensure_future(run(*group)) for group in groups.values()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Stop the remaining work if the caller goes away mid-batch.
+            for task in tasks:
+                task.cancel()
+
+    def _schedule_enrichment(self, key, topic, tree):
+        if not self.graph_enrich or key in self.enriched or key in self._enriching:
+            return
+        gemini = self.gemini
+        if gemini.use_mock or not gemini.api_key or not gemini.client:
+            return
+        self._enriching.add(key)
+        task = asyncio.get_running_loop().create_task(self._enrich(key, topic, tree))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _enrich(self, key, topic, tree):
+        try:
+            nodes = [leaf.get("id", leaf["title"]) for module in tree["tree"]["children"] for leaf in module["children"]]
+            suggestions = await asyncio.to_thread(self.gemini.enrich_path, key[0], topic, nodes)
+            # enrich_path reports failures as a one-item list of text.
+            if not isinstance(suggestions, list) or not suggestions:
+                return
+            if any(not isinstance(s, str) or s.startswith("Error") or s == "Ensure API Key is set" for s in suggestions):
+                return
+            self.enriched[key] = self._with_suggestions(tree, suggestions[:5])
+        except Exception as e:
+            logger.warning("Graph enrichment failed: %s", e)
+        finally:
+            self._enriching.discard(key)
+
+    @staticmethod
+    def _with_suggestions(tree, suggestions):
+        root = dict(tree["tree"])
+        root["children"] = root["children"] + [{
+            "title": "Further Exploration",
+            "role": "parent",
+            "explanation": "Complementary topics suggested by LearnyBot.",
+            "children": [
+                {
+                    "title": s,
+                    "role": "leaf",
+                    "explanation": f"An optional deep-dive that complements {root['title']}.",
+                    "task": f"Spend one session exploring {s}.",
+                    "quiz": f"Where would {s} fit in your {root['title']} work?",
+                }
+                for s in suggestions
+            ],
+        }]
+        return {"tree": root, "chatbot": tree["chatbot"]}
+
+    def register_tree(self, result, key=None):
+        """Stores a served tree and returns its ID for later /expand calls."""
+        key = key or tree_id(result)
+        if self.trees.get(key) is None:
+            self.trees.set(key, result)
+            self.gemini.store_set("served|" + key, result)
+        return key
+
+    def _served_tree(self, key):
+        result = self.trees.get(key)
+        if result is None:
+            # The tree may have been served by another worker.
+            result = self.gemini.store_get("served|" + key)
+            if result is not None:
+                self.trees.set(key, result)
+        return result
+
+    async def _aserved_tree(self, key):
+        result = self.trees.get(key)
+        if result is None:
+            result = await self.gemini.astore_get("served|" + key)
+            if result is not None:
+                self.trees.set(key, result)
+        return result
+
+    async def aexpand(self, topic, level, tree_id=None, tree=None, path=None, selected_node=None):
+        # Generates children for one node of an existing tree instead of
+        # regenerating the whole tree, and splices them into a new version.
+        result = await self._aserved_tree(tree_id) if tree_id else None
+        if result is None:
+            if not tree:
+                return {"error": "Unknown tree_id; send the tree to expand."}
+            result = tree if "tree" in tree else {"tree": tree}
+            tree_id = self.register_tree(result)
+
+        if path is None:
+            path = find_path(result["tree"], selected_node)
+        nodes = nodes_along(result["tree"], path) if path is not None else None
+        if not nodes:
+            return {"error": f"Node not found: {selected_node if path is None else path}"}
+
+        # Children are written for the learner's level, so it is part of the key.
+        subtree_key = f"{tree_id}|{str(level).strip().lower()}|{'.'.join(map(str, path))}"
+        children = self.subtrees.get(subtree_key)
+        if children is None:
+            children = await self.gemini.astore_get("subtree|" + subtree_key)
+        if children is None:
+            ancestors = [node.get("title", "") for node in nodes]
+            children, live = await self.gemini.flight.do(
+                "expand|" + subtree_key, lambda: self.gemini.aexpand_node(topic, level, ancestors)
+            )
+            if isinstance(children, dict):
+                return children
+            if live:
+                self.subtrees.set(subtree_key, children)
+                self.gemini.store_set("subtree|" + subtree_key, children)
+
+        expanded = splice(result, path, children)
+        return {
+            "tree_id": self.register_tree(expanded),
+            "parent_tree_id": tree_id,
+            "path": path,
+            "children": children,
+            "tree": expanded["tree"],
+            "chatbot": expanded.get("chatbot"),
+        }
+
     def generate_path(self, text, user_level="beginner"):
         # Backwards compatibility for initial generate call
         return self.process_request(text, user_level, "root")
-
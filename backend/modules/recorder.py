@@ -0,0 +1,162 @@
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Outcome fields (route, cache tier, fallback) noted while handling the
+# request being recorded.
+_notes = contextvars.ContextVar("learnpath_traffic_notes", default=None)
+
+
+def annotate(key, value):
+    notes = _notes.get()
+    if notes is not None:
+        notes[key] = value
+
+
+class TrafficRecorder:
+    """Appends request records to a size-rotated JSONL file off the request path.
+
+    record() only appends to an in-memory queue; a background thread writes
+    the queue out in batches every flush_interval seconds. When the queue is
+    full (the disk cannot keep up) new records are dropped and counted rather
+    than slowing requests down. Rotation keeps `backups` old files as
+    path.1 ... path.N, newest first.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backups=5, flush_interval=1.0, max_queue=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._write_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="traffic-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, entry):
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(entry)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            lines = []
+            while self._queue:
+                lines.append(json.dumps(self._queue.popleft(), separators=(",", ":")))
+            if not lines:
+                return
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                self.written += len(lines)
+            except OSError as e:
+                self.dropped += len(lines)
+                print(f"Traffic log write failed: {e}")
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+        else:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+
+class RecordingMiddleware:
+    """ASGI middleware that records every request for utils/replay_traffic.py.
+
+    Each record holds the arrival time, method, path, JSON body, status,
+    latency and any outcome fields noted with annotate() while handling it.
+    """
+
+    SKIP_PATHS = {"/health", "/metrics"}
+    MAX_BODY = 64 * 1024
+
+    def __init__(self, app, recorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        notes = {}
+        token = _notes.set(notes)
+        body = bytearray()
+        status = 500
+        ts = time.time()
+        start = time.perf_counter()
+
+        async def receive_and_keep():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < self.MAX_BODY:
+                body.extend(message.get("body", b"")[:self.MAX_BODY - len(body)])
+            return message
+
+        async def send_and_watch(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_and_watch)
+        finally:
+            _notes.reset(token)
+            try:
+                payload = json.loads(body) if body else None
+            except ValueError:
+                payload = body.decode("utf-8", "replace")
+            entry = {
+                "ts": round(ts, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "body": payload,
+                "status": status,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+            entry.update(notes)
+            self.recorder.record(entry)
@@ -0,0 +1,255 @@
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[^a-z0-9+#\s]")
+# Words that say how someone wants to learn, not what. Dropping them lets
+# "learn react", "React basics" and "react for beginners" meet on "react".
+_FILLER = {
+    "a", "an", "the", "to", "for", "of", "in", "and", "with", "i", "want", "how",
+    "learn", "basics", "basic", "beginner", "beginners", "intro",
+    "introduction", "fundamentals", "course", "tutorial", "guide", "master",
+    "mastering", "getting", "started", "101",
+}
+
+
+def semantic_topic(text):
+    """Reduces a free-text topic to the words that identify the subject."""
+    text = str(text).lower().replace(".js", "js")
+    words = []
+    for word in _NON_WORD.sub(" ", text).split():
+        if word in _FILLER or (word == "js" and words):
+            continue
+        # "reactjs" / "node js" / "vuejs" -> "react" / "node" / "vue"
+        if word.endswith("js") and len(word) > 4:
+            word = word[:-2]
+        words.append(word)
+    return " ".join(words)
+
+
+def _versions(key):
+    # Tokens with digits ("python 2", "es6", "angular 17") name a specific
+    # release, so a near-duplicate must carry exactly the same ones.
+    return frozenset(word for word in key.split() if any(ch.isdigit() for ch in word))
+
+
+class TopicVectorizer:
+    """Hashed character n-gram vectors, L2-normalized.
+
+    The domain TfidfVectorizer is fitted on domains.json keywords and cannot
+    represent topics it has never seen, so topics are hashed into a fixed
+    feature space instead; nothing has to be refitted as the index grows.
+    """
+
+    def __init__(self, ngram_range=(3, 5), n_features=2 ** 18):
+        self.ngram_range = ngram_range
+        self.n_features = n_features
+
+    def transform(self, text):
+        counts = {}
+        low, high = self.ngram_range
+        for word in text.split():
+            # Whole words add weight so a shared word matters more than a
+            # shared prefix ("java" vs "javascript").
+            h = zlib.crc32(b"w:" + word.encode()) % self.n_features
+            counts[h] = counts.get(h, 0) + 2
+            word = f" {word} "
+            for n in range(low, high + 1):
+                for i in range(len(word) - n + 1):
+                    h = zlib.crc32(word[i:i + n].encode()) % self.n_features
+                    counts[h] = counts.get(h, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        norm = np.sqrt(values @ values)
+        if norm:
+            values /= norm
+        return indices, values
+
+
+class _LevelIndex:
+    """Topic vectors for one level: a merged matrix plus a side list of recent adds.
+
+    Adding a topic only appends to the side list, and removing one only marks
+    its slot dead, so neither touches the merged matrix. The side list is
+    folded into the matrix once it holds an eighth of the entries (at least
+    min_side), which keeps rebuilds rare and each lookup's side scan short.
+    """
+
+    def __init__(self, n_features, min_side=64):
+        self.n_features = n_features
+        self.min_side = min_side
+        self.entries = OrderedDict()  # topic -> (expires_at, indices, values, value)
+        self.slots = {}               # topic -> ("main" | "side", position)
+        self.matrix = None            # features x merged entries, CSR (an inverted index)
+        self.main_keys = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.side_keys = []
+        # The side list's vectors back to back: feature, value, side position.
+        self.side_features = np.zeros(1024, dtype=np.int64)
+        self.side_values = np.zeros(1024)
+        self.side_owners = np.zeros(1024, dtype=np.int64)
+        self.side_size = 0
+        self.side_alive = np.zeros(64, dtype=bool)
+        self._query = np.zeros(n_features)  # scratch dense query, zero between lookups
+        self.merges = 0
+
+    def add(self, key, expires_at, indices, values, value):
+        self.remove(key)
+        self.entries[key] = (expires_at, indices, values, value)
+        position = len(self.side_keys)
+        self.slots[key] = ("side", position)
+        self.side_keys.append(key)
+        end = self.side_size + len(indices)
+        if end > len(self.side_features):
+            grow = max(end, 2 * len(self.side_features))
+            self.side_features = np.resize(self.side_features, grow)
+            self.side_values = np.resize(self.side_values, grow)
+            self.side_owners = np.resize(self.side_owners, grow)
+        self.side_features[self.side_size:end] = indices
+        self.side_values[self.side_size:end] = values
+        self.side_owners[self.side_size:end] = position
+        self.side_size = end
+        if position >= len(self.side_alive):
+            self.side_alive = np.resize(self.side_alive, 2 * len(self.side_alive))
+        self.side_alive[position] = True
+        if len(self.side_keys) > max(self.min_side, len(self.entries) // 8):
+            self.merge()
+
+    def remove(self, key):
+        if self.entries.pop(key, None) is None:
+            return
+        where, position = self.slots.pop(key)
+        if where == "main":
+            self.alive[position] = False
+        else:
+            self.side_keys[position] = None
+            self.side_alive[position] = False
+
+    def merge(self):
+        # Imported here, not at module level: scipy adds about 0.1s to startup.
+        import scipy.sparse as sp
+        self.main_keys = list(self.entries.keys())
+        rows, cols, data = [], [], []
+        for col, key in enumerate(self.main_keys):
+            _, indices, values, _ = self.entries[key]
+            rows.append(indices)
+            cols.append(np.full(len(indices), col, dtype=np.int32))
+            data.append(values)
+            self.slots[key] = ("main", col)
+        if self.main_keys:
+            self.matrix = sp.csr_matrix(
+                (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                shape=(self.n_features, len(self.main_keys)),
+            )
+        else:
+            self.matrix = None
+        self.alive = np.ones(len(self.main_keys), dtype=bool)
+        self.side_keys = []
+        self.side_size = 0
+        self.merges += 1
+
+    def best(self, indices, values):
+        """Returns (topic, score) of the closest live entry."""
+        best_key, best_score = None, -1.0
+        if self.matrix is not None and self.alive.any():
+            scores = self.matrix[indices].T @ values
+            scores[~self.alive] = -1.0
+            col = int(np.argmax(scores))
+            if self.alive[col]:
+                best_key, best_score = self.main_keys[col], float(scores[col])
+        if self.side_keys:
+            # Dot products with every side vector at once: scatter the query
+            # into a dense scratch vector, gather it at the side's features.
+            n = self.side_size
+            self._query[indices] = values
+            products = self._query[self.side_features[:n]] * self.side_values[:n]
+            self._query[indices] = 0.0
+            scores = np.bincount(self.side_owners[:n], weights=products, minlength=len(self.side_keys))
+            scores[~self.side_alive[:len(scores)]] = -1.0
+            position = int(np.argmax(scores))
+            if scores[position] > best_score:
+                best_key, best_score = self.side_keys[position], float(scores[position])
+        return best_key, best_score
+
+
+class SemanticCache:
+    """Serves a cached tree for topics that are near-duplicates of earlier ones.
+
+    Each level keeps its own LRU-bounded index of L2-normalized topic vectors.
+    The index is stored feature-major, so a lookup only touches the rows for
+    the query's n-grams and cosine similarity is a single sparse dot product;
+    recent additions are scored from a short side list until they are merged
+    (see _LevelIndex), so adds never force a rebuild on the next lookup.
+    """
+
+    def __init__(self, threshold=0.85, max_entries=2048, ttl=21600, vectorizer=None, clock=time.monotonic):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.vectorizer = vectorizer or TopicVectorizer()
+        self.clock = clock
+        self._levels = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, topic, level):
+        key = semantic_topic(topic)
+        if not key:
+            return None
+        indices, values = self.vectorizer.transform(key)
+        with self._lock:
+            index = self._levels.get(str(level).lower())
+            if index is None or not index.entries:
+                self.misses += 1
+                return None
+            match, score = index.best(indices, values)
+            if match is None or score < self.threshold:
+                self.misses += 1
+                return None
+            expires_at, _, _, value = index.entries[match]
+            if _versions(match) != _versions(key):
+                self.misses += 1
+                return None
+            if expires_at <= self.clock():
+                index.remove(match)
+                self.misses += 1
+                return None
+            index.entries.move_to_end(match)
+            self.hits += 1
+            return value
+
+    def add(self, topic, level, value):
+        key = semantic_topic(topic)
+        if not key or self.max_entries <= 0:
+            return
+        indices, values = self.vectorizer.transform(key)
+        with self._lock:
+            index = self._levels.get(str(level).lower())
+            if index is None:
+                index = self._levels[str(level).lower()] = _LevelIndex(self.vectorizer.n_features)
+            index.add(key, self.clock() + self.ttl, indices, values, value)
+            while len(index.entries) > self.max_entries:
+                index.remove(next(iter(index.entries)))
+                self.evictions += 1
+
+    def __len__(self):
+        return sum(len(index.entries) for index in self._levels.values())
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "threshold": self.threshold,
+            "max_entries_per_level": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "merges": sum(index.merges for index in self._levels.values()),
+        }
@@ -0,0 +1,41 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key into one execution.
+
+    The first caller starts the work as its own task; callers arriving while it
+    is in flight await the same task and receive the same result or exception.
+    The key is released as soon as the task finishes, so a failure is never
+    replayed to later callers.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.started += 1
+            task.add_done_callback(lambda t, key=key: self._release(key, t))
+        else:
+            self.shared += 1
+        # Shield so one caller disconnecting does not cancel the shared call.
+        return await asyncio.shield(task)
+
+    def _release(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
+
+    def __len__(self):
+        return len(self._inflight)
+
+    def stats(self):
+        return {"in_flight": len(self._inflight), "started": self.started, "shared": self.shared}
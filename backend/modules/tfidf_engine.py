@@ -1,50 +1,231 @@
+import hashlib
 import json
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import re
+import tempfile
+import threading
 import numpy as np
 
+# TfidfVectorizer's default tokens: lowercased runs of 2+ word characters.
+_TOKEN = re.compile(r"(?u)\b\w\w+\b")
+ARTIFACT_VERSION = 2
+
 class TFIDFEngine:
-    def __init__(self, data_path="backend/data/domains.json"):
+    """Matches free text to the domains in domains.json by TF-IDF similarity.
+
+    Nothing is loaded until the first lookup (or warmup()). The vocabulary,
+    idf weights and raw per-domain token counts are kept in a precompiled
+    .npz artifact keyed by a hash of domains.json, so a normal start does not
+    refit (see utils/compile_tfidf.py). An engine is never modified once
+    loaded: reloaded() builds a new one, retokenizing only the domains whose
+    keywords changed, so lookups already running keep a consistent index.
+    """
+
+    def __init__(self, data_path="backend/data/domains.json", artifact_path=None):
         self.data_path = data_path
-        self.domains = {}
-        self.vectorizer = TfidfVectorizer()
-        self.load_data()
-        self.train_vectorizer()
+        self.artifact_path = artifact_path or os.path.splitext(data_path)[0] + ".tfidf.npz"
+        self._domains = {}
+        self._names = []
+        self._vocabulary = {}
+        self._idf = None
+        self._counts = None  # raw token counts, one row per domain
+        self.domain_matrix_t = None
+        self.fitted = False  # True when this process had to refit
+        self.retokenized = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def domains(self):
+        self.warmup()
+        return self._domains
+
+    @property
+    def domain_names(self):
+        self.warmup()
+        return self._names
+
+    def warmup(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self.load_data()
+                self._loaded = True
 
     def load_data(self):
         try:
-            with open(self.data_path, 'r') as f:
-                self.domains = json.load(f)
+            with open(self.data_path, 'rb') as f:
+                raw = f.read()
+            domains = json.loads(raw)
         except Exception as e:
             print(f"Error loading domain data: {e}")
-            self.domains = {}
+            self._domains = {}
+            return
+        self._build(raw, domains)
+
+    def reloaded(self):
+        """Returns a new engine for the current domains.json.
 
-    def train_vectorizer(self):
-        if not self.domains:
+        Token counts of domains whose keywords did not change are reused.
+        Unlike load_data(), an unreadable file raises instead of producing
+        an empty engine.
+        """
+        with open(self.data_path, 'rb') as f:
+            raw = f.read()
+        engine = TFIDFEngine(self.data_path, self.artifact_path)
+        engine._build(raw, json.loads(raw), previous=self)
+        engine._loaded = True
+        return engine
+
+    def _build(self, raw, domains, previous=None):
+        self._domains = domains
+        if not domains:
             return
-        
-        # Create a corpus where each document corresponds to a domain
-        self.domain_names = list(self.domains.keys())
-        self.corpus = [" ".join(keywords) for keywords in self.domains.values()]
-        
-        # Fit the vectorizer on the domain corpus
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.corpus)
+        digest = hashlib.sha256(raw).hexdigest()
+        if not self._load_artifact(digest):
+            self.train_vectorizer(previous)
+            self.save_artifact(digest)
+
+    def _load_artifact(self, digest):
+        # scipy takes about 0.1s to import, so it loads with the index, not the module.
+        import scipy.sparse as sp
+        try:
+            with np.load(self.artifact_path, allow_pickle=False) as data:
+                if int(data["version"]) != ARTIFACT_VERSION or str(data["digest"]) != digest:
+                    return False
+                self._names = data["names"].tolist()
+                self._vocabulary = {term: i for i, term in enumerate(data["terms"].tolist())}
+                self._idf = data["idf"]
+                self._counts = sp.csr_matrix(
+                    (data["counts"], data["indices"], data["indptr"]), shape=tuple(data["shape"])
+                )
+            self.domain_matrix_t = self._weigh(self._counts.astype(np.float64)).T.tocsr()
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Ignoring TF-IDF artifact {self.artifact_path}: {e}")
+            return False
+
+    def train_vectorizer(self, previous=None):
+        # Same weighting as scikit-learn's TfidfVectorizer defaults (smooth
+        # idf, L2-normalized rows), done directly so a refit needs neither
+        # scikit-learn nor a pass over domains that did not change.
+        import scipy.sparse as sp
+        self._names = list(self._domains.keys())
+        reusable = previous is not None and previous._counts is not None
+        if reusable:
+            old_terms = sorted(previous._vocabulary, key=previous._vocabulary.get)
+            old_rows = {name: i for i, name in enumerate(previous._names)}
+        per_domain = []
+        self.retokenized = []
+        for name, keywords in self._domains.items():
+            if reusable and name in old_rows and previous._domains.get(name) == keywords:
+                row = previous._counts[old_rows[name]]
+                counts = {old_terms[i]: int(c) for i, c in zip(row.indices, row.data)}
+            else:
+                counts = {}
+                for token in _TOKEN.findall(" ".join(keywords).lower()):
+                    counts[token] = counts.get(token, 0) + 1
+                self.retokenized.append(name)
+            per_domain.append(counts)
+
+        terms = sorted({term for counts in per_domain for term in counts})
+        self._vocabulary = {term: i for i, term in enumerate(terms)}
+        rows, cols, values = [], [], []
+        for row, counts in enumerate(per_domain):
+            for term, count in counts.items():
+                rows.append(row)
+                cols.append(self._vocabulary[term])
+                values.append(count)
+        n = len(self._names)
+        self._counts = sp.csr_matrix((values, (rows, cols)), shape=(n, len(terms)), dtype=np.int32)
+        df = np.bincount(self._counts.indices, minlength=len(terms))
+        self._idf = np.log((1 + n) / (1 + df)) + 1
+        # Rows are L2-normalized up front, so cosine similarity against a
+        # batch of (also normalized) inputs is a single sparse matrix product.
+        self.domain_matrix_t = self._weigh(self._counts.astype(np.float64)).T.tocsr()
+        self.fitted = True
+
+    def save_artifact(self, digest):
+        terms = sorted(self._vocabulary, key=self._vocabulary.get)
+        matrix = self._counts
+        # A private temp file per writer: several workers starting at once
+        # each write their own and the last os.replace wins.
+        directory = os.path.dirname(os.path.abspath(self.artifact_path))
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+                tmp = f.name
+                np.savez(
+                    f, version=ARTIFACT_VERSION, digest=digest, names=np.array(self._names),
+                    terms=np.array(terms), idf=self._idf, counts=matrix.data, indices=matrix.indices,
+                    indptr=matrix.indptr, shape=np.array(matrix.shape),
+                )
+            os.replace(tmp, self.artifact_path)
+        except OSError as e:
+            # A read-only deploy still works; it just refits on every start.
+            print(f"Could not save TF-IDF artifact: {e}")
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def transform(self, texts):
+        """L2-normalized TF-IDF rows for texts, like TfidfVectorizer.transform."""
+        import scipy.sparse as sp
+        vocabulary = self._vocabulary
+        indptr, indices, values = [0], [], []
+        for text in texts:
+            counts = {}
+            for token in _TOKEN.findall(text.lower()):
+                column = vocabulary.get(token)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+            indices.extend(counts)
+            values.extend(counts.values())
+            indptr.append(len(indices))
+        matrix = sp.csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(texts), len(vocabulary)),
+        )
+        return self._weigh(matrix)
+
+    def _weigh(self, counts):
+        # tf * idf, then each row scaled to unit length.
+        counts.data *= self._idf[counts.indices]
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        counts.data /= np.repeat(norms, np.diff(counts.indptr))
+        return counts
 
     def detect_domain(self, text):
-        if not self.domains:
+        rows = self.detect_domains([text], top_k=1)
+        if not rows or not rows[0]:
             return None, 0.0
+        return rows[0][0]
+
+    def detect_domains(self, texts, top_k=3):
+        """Returns the top_k (domain, score) pairs for each text, best first."""
+        self.warmup()
+        if not self._domains or not texts:
+            return [[] for _ in texts]
+
+        top_k = max(1, min(top_k, len(self._names)))
+        input_matrix = self.transform(texts)
+        scores = np.asarray((input_matrix @ self.domain_matrix_t).todense())
+
+        if top_k < scores.shape[1]:
+            candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        # Highest score first; ties go to the lower domain index like argmax.
+        order = np.lexsort((candidates, -candidate_scores), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
 
-        # Transform user input
-        input_vector = self.vectorizer.transform([text])
-        
-        # Calculate cosine similarity
-        similarities = cosine_similarity(input_vector, self.tfidf_matrix)
-        
-        # Get the index of the highest score
-        best_match_idx = np.argmax(similarities)
-        best_score = similarities[0, best_match_idx]
-        
-        return self.domain_names[best_match_idx], float(best_score)
-
-# Singleton instance or helper function could be used
+        names = self._names
+        return [
+            [(names[i], float(score)) for i, score in zip(row_idx, row_scores)]
+            for row_idx, row_scores in zip(candidates.tolist(), candidate_scores.tolist())
+        ]
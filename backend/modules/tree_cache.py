@@ -0,0 +1,80 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# "+" and "#" carry meaning in names like C++ and C#, and a leading dot in
+# .NET, so they stay in the key; every other mark folds into a space.
+_PUNCTUATION = re.compile(r"[^\w\s+#.]|\.(?!\w)|(?<=\S)\.")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_key(topic, level):
+    """Collapses case, punctuation and whitespace so equivalent requests share a key."""
+    topic = _PUNCTUATION.sub(" ", str(topic).lower())
+    topic = _WHITESPACE.sub(" ", topic).strip()
+    return f"{str(level).strip().lower()}|{topic}"
+
+
+class TreeCache:
+    """In-memory LRU cache with a per-entry TTL for generated learning trees.
+
+    Values are shared between callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, max_size=512, ttl=21600, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from pydantic import ValidationError
+
+from .expansion import tree_id
+from .tree_schema import LearningTree
+
+# orjson and brotli are optional: without them bodies are encoded with the
+# standard json module and only gzip is offered.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def dumps(value):
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def accepted_encodings(header):
+    # "gzip, deflate, br;q=0" -> {"gzip", "deflate"}
+    accepted = set()
+    for part in (header or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if name:
+            accepted.add(name.strip())
+    return accepted
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x" (RFC 9110, If-None-Match).
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+class EncodedTree:
+    """A validated tree response, serialized and compressed once.
+
+    body is the response JSON (the result plus its tree_id), gzip and br
+    its compressed forms and etag a hash of body. result is the dict it was
+    built from, still used by /expand and the caches.
+    """
+
+    __slots__ = ("result", "tree_id", "etag", "body", "gzip", "br")
+
+    def __init__(self, result):
+        self.result = result
+        self.tree_id = tree_id(result)
+        self.body = dumps({**result, "tree_id": self.tree_id})
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=10).hexdigest() + '"'
+        self.gzip = gzip.compress(self.body, compresslevel=6, mtime=0)
+        self.br = brotli.compress(self.body, quality=5) if brotli is not None else None
+
+    def negotiate(self, accept_encoding):
+        """Returns (content_encoding or None, bytes) for an Accept-Encoding header."""
+        accepted = accepted_encodings(accept_encoding)
+        if self.br is not None and "br" in accepted:
+            return "br", self.br
+        if "gzip" in accepted or "*" in accepted:
+            return "gzip", self.gzip
+        return None, self.body
+
+    def size(self):
+        return len(self.body) + len(self.gzip) + len(self.br or b"")
+
+
+class EncodedTrees:
+    """LRU of EncodedTree by result object.
+
+    Cached and graph trees are handed out as the same dict on every hit, so
+    keying by identity serializes each of them once. Each entry holds its
+    result, which keeps the id() from being reused while the entry lives.
+    Results must be treated as read-only, as in the caches they come from.
+    """
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalid = 0
+
+    def get(self, result):
+        """Returns the EncodedTree for a tree result, or None if it is not a valid tree."""
+        if not isinstance(result, dict) or "tree" not in result or "error" in result:
+            return None
+        key = id(result)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.result is result:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        try:
+            LearningTree.model_validate(result)
+        except ValidationError as e:
+            self.invalid += 1
+            print(f"Serving unvalidated tree: {e.error_count()} schema errors")
+            return None
+        encoded = EncodedTree(result)
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = encoded
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return encoded
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        body = sum(len(e.body) for e in entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": len(entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalid": self.invalid,
+            "bytes": sum(e.size() for e in entries),
+            "gzip_ratio": round(sum(len(e.gzip) for e in entries) / body, 4) if body else 0.0,
+            "encoders": {"json": "orjson" if orjson is not None else "json", "brotli": brotli is not None},
+        }
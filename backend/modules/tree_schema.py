@@ -0,0 +1,128 @@
+import json
+import re
+from functools import lru_cache
+
+from pydantic import BaseModel
+
+from .tree_stream import IncrementalTreeParser
+
+# Gemini's response schema does not allow recursion, so the three levels of
+# a learning tree (root -> modules -> leaves) are spelled out.
+
+
+class LeafNode(BaseModel):
+    title: str
+    role: str
+    explanation: str
+    task: str
+    quiz: str
+
+
+class ModuleNode(BaseModel):
+    title: str
+    role: str
+    explanation: str
+    children: list[LeafNode]
+
+
+class RootNode(BaseModel):
+    title: str
+    role: str
+    explanation: str
+    children: list[ModuleNode]
+
+
+class Chatbot(BaseModel):
+    message: str
+    actions: list[str]
+
+
+class LearningTree(BaseModel):
+    tree: RootNode
+    chatbot: Chatbot
+
+
+class Expansion(BaseModel):
+    children: list[LeafNode]
+
+
+# The structure lives in the response schema, so the prompt only carries the
+# content rules. The topic goes last so every prompt for a level shares the
+# same prefix.
+TREE_PROMPT = """You are an educational architect. Build a complete learning path for a {level} student.
+- 10 to 12 nodes in total: the root (role "root", title = the topic), 3-4 modules (role "parent") and their leaves (role "leaf").
+- Order nodes so earlier ones are prerequisites for later ones.
+- Tailor every explanation, task and quiz to the {level} level; keep explanations to one or two sentences.
+- Every leaf needs a realistic, actionable task and a challenge quiz question.
+- chatbot.message welcomes the student to the roadmap and mentions the node count; chatbot.actions gives 3 short next steps.
+Topic: """
+
+LEAF_FIELDS = ("title", "explanation", "task", "quiz")
+# Next steps offered when the chatbot block was cut off with the output.
+DEFAULT_ACTIONS = ["Start with first node", "Show path overview", "Explain goal"]
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+@lru_cache(maxsize=16)
+def tree_prompt_prefix(level):
+    return TREE_PROMPT.format(level=level)
+
+
+def _load(text):
+    # Returns (data, complete). Truncated or slightly malformed text is
+    # repaired by IncrementalTreeParser: open brackets are closed and the
+    # node that was still being written is dropped.
+    text = _FENCE.sub("", text)
+    try:
+        return json.loads(text), True
+    except ValueError:
+        parser = IncrementalTreeParser()
+        parser.feed(text)
+        if parser.error is not None:
+            raise ValueError(f"unparseable model output: {parser.error}")
+        return parser.result(), False
+
+
+def parse_tree(text):
+    """Parses a generated tree, repairing truncated output.
+
+    Returns (result, complete). A repaired tree keeps only finished leaves and
+    the modules that have at least one, and gets a default chatbot block if
+    its own was cut off; ValueError means nothing usable came back.
+    """
+    result, complete = _load(text)
+    tree = result.get("tree") if isinstance(result, dict) else None
+    if not isinstance(tree, dict) or not tree.get("title"):
+        raise ValueError("model output has no tree")
+    if not complete:
+        modules = []
+        for module in tree.get("children") or []:
+            leaves = [leaf for leaf in module.get("children") or [] if all(leaf.get(f) for f in LEAF_FIELDS)]
+            if leaves:
+                modules.append({**module, "children": leaves})
+        tree = result["tree"] = {**tree, "children": modules}
+    if not tree.get("children"):
+        raise ValueError("model output has no modules")
+    chatbot = result.get("chatbot")
+    if not isinstance(chatbot, dict) or not chatbot.get("message") or not isinstance(chatbot.get("actions"), list):
+        # The chatbot block comes last, so truncation loses it first.
+        count = 1 + sum(1 + len(module.get("children") or []) for module in tree["children"])
+        result["chatbot"] = {
+            "message": f"Here is your {tree['title']} roadmap, {count} nodes to work through. Start with the first module!",
+            "actions": list(DEFAULT_ACTIONS),
+        }
+    return result, complete
+
+
+def parse_children(text):
+    """Parses a node expansion, dropping a leaf cut off mid-way."""
+    data, complete = _load(text)
+    children = data.get("children") if isinstance(data, dict) else data
+    if not isinstance(children, list):
+        raise ValueError("expansion did not return a children list")
+    return [
+        {**child, "role": child.get("role") or "leaf"}
+        for child in children
+        if isinstance(child, dict) and child.get("title") and (complete or all(child.get(f) for f in LEAF_FIELDS))
+    ]
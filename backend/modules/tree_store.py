@@ -0,0 +1,258 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trees (
+    key TEXT PRIMARY KEY,
+    blob BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trees_accessed ON trees (accessed_at);
+CREATE INDEX IF NOT EXISTS trees_expires ON trees (expires_at);
+"""
+
+
+class SQLiteTreeStore:
+    """Process-shared, persistent store for generated trees.
+
+    Backed by one SQLite file in WAL mode, so any number of uvicorn workers
+    (or instances on a shared disk) read each other's results concurrently
+    while one writes, and the cache survives restarts. Values are stored as
+    zlib-compressed compact JSON. Expired rows read as misses; every
+    `evict_every` writes the writer deletes them, then removes the least
+    recently read rows until the file's payload fits in `max_bytes`.
+
+    Serving code writes with put(), which only queues the value; a background
+    thread commits the queue in batches, so a request never waits on another
+    worker's write lock. get() never writes (recency updates are queued too),
+    sees values still waiting in the queue, and if the file stays busy for
+    read_timeout seconds reports a miss.
+    """
+
+    def __init__(self, path, ttl=21600, max_bytes=64 * 1024 * 1024, evict_every=64,
+                 touch_interval=60.0, clock=time.time, timeout=10.0, read_timeout=0.1, max_queue=1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.touch_interval = touch_interval
+        self.clock = clock
+        self.timeout = timeout
+        self.read_timeout = read_timeout
+        self.max_queue = max_queue
+        self._local = threading.local()
+        self._writes = 0
+        self._pending = {}  # key -> (value, ttl), waiting for the writer thread
+        self._touches = set()  # keys read since the writer last ran
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer = None
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.timeouts = 0
+        self.dropped = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self, timeout=None):
+        # sqlite3 connections must stay on the thread that opened them.
+        timeout = self.timeout if timeout is None else timeout
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.timeout = None
+        if self._local.timeout != timeout:
+            conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+            self._local.timeout = timeout
+        return conn
+
+    @staticmethod
+    def encode(value):
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 6)
+
+    @staticmethod
+    def decode(blob):
+        return json.loads(zlib.decompress(blob))
+
+    def get(self, key):
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return pending[0]
+        try:
+            return self._get(key)
+        except sqlite3.OperationalError as e:
+            # Locked by another worker for longer than read_timeout: a miss
+            # is cheaper than holding up the request.
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            self.timeouts += 1
+            self.misses += 1
+            return None
+
+    def _get(self, key):
+        conn = self._connection(self.read_timeout)
+        row = conn.execute(
+            "SELECT blob, expires_at, accessed_at FROM trees WHERE key = ?", (key,)
+        ).fetchone()
+        now = self.clock()
+        if row is None:
+            self.misses += 1
+            return None
+        blob, expires_at, accessed_at = row
+        if expires_at <= now:
+            # Left for evict() to delete.
+            self.misses += 1
+            return None
+        # Recency only feeds eviction, so it is refreshed at most once per
+        # touch_interval, by the writer thread.
+        if now - accessed_at >= self.touch_interval:
+            with self._pending_lock:
+                self._touches.add(key)
+            self._start_writer()
+        self.hits += 1
+        return self.decode(blob)
+
+    def set(self, key, value, ttl=None):
+        # Synchronous write, for scripts; the API uses put().
+        self._write([(key, value, ttl)])
+
+    def _write(self, items):
+        now = self.clock()
+        rows = []
+        for key, value, ttl in items:
+            blob = self.encode(value)
+            rows.append((key, blob, len(blob), now + (self.ttl if ttl is None else ttl), now))
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO trees (key, blob, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        before = self._writes
+        self._writes += len(rows)
+        if self._writes // self.evict_every != before // self.evict_every:
+            self.evict()
+
+    def put(self, key, value, ttl=None):
+        """Queues a write for the background writer thread and returns at once."""
+        with self._pending_lock:
+            if len(self._pending) >= self.max_queue and key not in self._pending:
+                self.dropped += 1
+                return
+            self._pending[key] = (value, ttl)
+        self._start_writer()
+        self._wake.set()
+
+    def _start_writer(self):
+        if self._writer is not None:
+            return
+        with self._pending_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="tree-store-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(1.0)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Commits every queued write and recency update."""
+        with self._flush_lock:
+            with self._pending_lock:
+                items = [(key, value, ttl) for key, (value, ttl) in self._pending.items()]
+                touches, self._touches = self._touches, set()
+            if touches:
+                try:
+                    self._connection().executemany(
+                        "UPDATE trees SET accessed_at = ? WHERE key = ?", [(self.clock(), k) for k in touches]
+                    )
+                except sqlite3.Error as e:
+                    print(f"Tree store recency update failed: {e}")
+            if not items:
+                return
+            try:
+                self._write(items)
+            except Exception as e:
+                print(f"Tree store write failed: {e}")
+                self.dropped += len(items)
+            with self._pending_lock:
+                # Keep keys that were put again while this batch was written.
+                for key, value, ttl in items:
+                    if self._pending.get(key, (None,))[0] is value:
+                        del self._pending[key]
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        self.flush()
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM trees WHERE key = ?", (key,))
+
+    def evict(self):
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM trees WHERE expires_at <= ?", (self.clock(),)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM trees").fetchone()[0]
+        if total > self.max_bytes:
+            # Trim to 90% so the next few writes do not trigger another pass.
+            excess = total - int(self.max_bytes * 0.9)
+            keys = []
+            for key, size in conn.execute("SELECT key, size FROM trees ORDER BY accessed_at"):
+                keys.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM trees WHERE key = ?", keys)
+            removed += len(keys)
+        self.evictions += removed
+        return removed
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM trees").fetchone()[0]
+
+    def stats(self):
+        count, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM trees"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "queued": len(self._pending),
+            "read_timeouts": self.timeouts,
+            "dropped_writes": self.dropped,
+        }
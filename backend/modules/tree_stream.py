@@ -0,0 +1,220 @@
+import asyncio
+import json
+
+_WHITESPACE = " \t\r\n"
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_MISSING = object()
+
+
+class _Frame:
+    __slots__ = ("value", "key", "expect_key", "node_path", "emitted", "children_of")
+
+    def __init__(self, value):
+        self.value = value
+        self.key = None
+        self.expect_key = isinstance(value, dict)
+        self.node_path = None
+        self.emitted = False
+        self.children_of = None
+
+
+class IncrementalTreeParser:
+    """Parses a learning-tree JSON document as it streams in, chunk by chunk.
+
+    feed() returns the events completed by that chunk:
+
+    - {"type": "node", "path": [...], "node": {...}} once a node's own fields
+      are known, i.e. when its "children" array opens or its object closes.
+      The root has path [], modules [i], leaves [i, j], so nodes arrive in
+      document order: root, first module, its leaves, next module, ...
+    - {"type": "chatbot", "chatbot": {...}} when the chatbot object closes.
+
+    result() returns the document parsed so far. If the stream was cut off,
+    open brackets are closed and any node whose fields were still arriving is
+    dropped, so the result is always a well-formed (possibly smaller) tree.
+    """
+
+    def __init__(self):
+        self._stack = []
+        self._document = _MISSING
+        self._events = []
+        self._in_string = False
+        self._escape = None
+        self._string = []
+        self._scalar = []
+        self.error = None
+
+    @property
+    def complete(self):
+        return self._document is not _MISSING and not self._stack
+
+    def feed(self, text):
+        if self.error is None:
+            try:
+                for ch in text:
+                    self._consume(ch)
+            except ValueError as e:
+                self.error = str(e)
+        events, self._events = self._events, []
+        return events
+
+    def result(self):
+        if self.complete:
+            return self._document
+        return self._repair()
+
+    # --- tokenizer -------------------------------------------------------
+
+    def _consume(self, ch):
+        if self._in_string:
+            self._consume_string(ch)
+        elif ch == '"':
+            self._flush_scalar()
+            self._in_string = True
+            self._string = []
+        elif ch in _WHITESPACE:
+            self._flush_scalar()
+        elif ch == "{" or ch == "[":
+            self._flush_scalar()
+            self._open({} if ch == "{" else [])
+        elif ch == "}" or ch == "]":
+            self._flush_scalar()
+            self._close()
+        elif ch == ":":
+            self._flush_scalar()
+            if not self._stack or not isinstance(self._stack[-1].value, dict):
+                raise ValueError("unexpected ':'")
+        elif ch == ",":
+            self._flush_scalar()
+            if self._stack and isinstance(self._stack[-1].value, dict):
+                self._stack[-1].expect_key = True
+        else:
+            self._scalar.append(ch)
+
+    def _consume_string(self, ch):
+        if self._escape is not None:
+            if self._escape == "":
+                if ch == "u":
+                    self._escape = "u"
+                    return
+                self._string.append(_ESCAPES.get(ch, ch))
+                self._escape = None
+                return
+            self._escape += ch
+            if len(self._escape) == 5:
+                self._string.append(chr(int(self._escape[1:], 16)))
+                self._escape = None
+            return
+        if ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            self._in_string = False
+            self._finish_string("".join(self._string))
+        else:
+            self._string.append(ch)
+
+    def _finish_string(self, text):
+        frame = self._stack[-1] if self._stack else None
+        if frame is not None and isinstance(frame.value, dict) and frame.expect_key:
+            frame.key = text
+            frame.expect_key = False
+        else:
+            self._add_value(text)
+
+    def _flush_scalar(self):
+        if not self._scalar:
+            return
+        token = "".join(self._scalar)
+        self._scalar = []
+        self._add_value(json.loads(token))
+
+    # --- structure -------------------------------------------------------
+
+    def _open(self, container):
+        parent = self._stack[-1] if self._stack else None
+        frame = _Frame(container)
+        if isinstance(container, dict) and parent is not None:
+            if isinstance(parent.value, dict) and parent.key == "tree" and len(self._stack) == 1:
+                frame.node_path = ()
+            elif isinstance(parent.value, list) and parent.children_of is not None:
+                frame.node_path = parent.children_of + (len(parent.value),)
+        elif isinstance(container, list) and parent is not None:
+            if parent.node_path is not None and parent.key == "children":
+                frame.children_of = parent.node_path
+                self._emit_node(parent)
+        self._stack.append(frame)
+
+    def _close(self):
+        if not self._stack:
+            raise ValueError("unbalanced closing bracket")
+        frame = self._stack.pop()
+        if frame.node_path is not None:
+            self._emit_node(frame)
+        elif self._stack and self._stack[-1].key == "chatbot" and len(self._stack) == 1:
+            self._events.append({"type": "chatbot", "chatbot": frame.value})
+        self._add_value(frame.value)
+
+    def _add_value(self, value):
+        if not self._stack:
+            if self._document is not _MISSING:
+                raise ValueError("extra data after document")
+            self._document = value
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.value, list):
+            frame.value.append(value)
+        elif frame.key is not None:
+            frame.value[frame.key] = value
+            frame.key = None
+        else:
+            raise ValueError("value without a key")
+
+    def _emit_node(self, frame):
+        if frame.emitted:
+            return
+        frame.emitted = True
+        node = {k: v for k, v in frame.value.items() if k != "children"}
+        self._events.append({"type": "node", "path": list(frame.node_path), "node": node})
+
+    def _repair(self):
+        # Unwind the open frames from the innermost outwards. Partial strings,
+        # dangling keys and nodes that never got their header are discarded.
+        # Each open container only holds already-closed values, so a shallow
+        # copy per frame keeps the parser itself untouched.
+        value = _MISSING
+        for frame in reversed(self._stack):
+            container = list(frame.value) if isinstance(frame.value, list) else dict(frame.value)
+            if value is not _MISSING:
+                if isinstance(container, list):
+                    container.append(value)
+                elif frame.key is not None:
+                    container[frame.key] = value
+            value = container
+            if frame.node_path is not None and not frame.emitted:
+                value = _MISSING
+            if frame.node_path is not None and frame.emitted:
+                value.setdefault("children", [])
+        if self._document is not _MISSING:
+            return self._document
+        return value if isinstance(value, dict) else {}
+
+
+def iter_tree_events(result):
+    """Replays a finished result as the same events IncrementalTreeParser emits."""
+    def walk(node, path):
+        yield {"type": "node", "path": list(path), "node": {k: v for k, v in node.items() if k != "children"}}
+        for i, child in enumerate(node.get("children") or []):
+            yield from walk(child, path + (i,))
+
+    if isinstance(result.get("tree"), dict):
+        yield from walk(result["tree"], ())
+    if "chatbot" in result:
+        yield {"type": "chatbot", "chatbot": result["chatbot"]}
+
+
+async def astream_json_text(result, chunk_size=64):
+    """Yields a finished result as pretty-printed JSON text in small chunks."""
+    text = json.dumps(result, indent=2)
+    for i in range(0, len(text), chunk_size):
+        yield text[i:i + chunk_size]
+        await asyncio.sleep(0)
@@ -0,0 +1,226 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+_WHITESPACE = re.compile(r"\s+")
+
+# Shared by every session, then the per-session context, then the history,
+# then the new turn: each prompt extends the previous one, so the model's
+# prefix cache covers everything but the latest exchange.
+TUTOR_PROMPT = """Role: Friendly AI Tutor named LearnyBot.
+- Match the student's level: simpler for beginners, technically deep for advanced.
+- Be encouraging and concise.
+- Answer questions about the current focus directly; gently steer unrelated questions back to the topic.
+- Use the conversation so far; do not repeat earlier answers unless asked.
+"""
+
+SESSION_PROMPT = """Topic: "{topic}"
+Student level: {level}
+{tree}"""
+
+
+def compact(text, limit):
+    """First sentence of text on one line, cut to at most limit characters."""
+    text = _WHITESPACE.sub(" ", str(text)).strip()
+    text = _SENTENCE_END.split(text, 1)[0]
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def summarize_tree(tree, limit=800):
+    # "Learning path: Module (Leaf, Leaf); Module (...)" from a tree or its root node.
+    root = tree.get("tree", tree) if isinstance(tree, dict) else None
+    if not root or not root.get("children"):
+        return ""
+    modules = []
+    for module in root["children"]:
+        leaves = ", ".join(str(leaf.get("title", "")) for leaf in module.get("children", []))
+        modules.append(f"{module.get('title', '')} ({leaves})" if leaves else str(module.get("title", "")))
+    text = "Learning path: " + "; ".join(modules)
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class TutorSession:
+    """Conversation state for one chat: a fixed prefix, a rolling summary and recent turns."""
+
+    def __init__(self, session_id, topic, level, tree_summary=""):
+        self.session_id = session_id
+        self.topic = topic
+        self.level = level
+        self.prefix = TUTOR_PROMPT + SESSION_PROMPT.format(topic=topic, level=level, tree=tree_summary)
+        self.summary = []  # one compact line per folded turn, oldest first
+        self.turns = []  # (question, answer), oldest first
+        self.chars = 0
+        self.expires_at = 0.0
+        self.revision = ""  # changes on every save to the shared store
+
+    def to_record(self):
+        return {
+            "topic": self.topic, "level": self.level, "prefix": self.prefix, "summary": list(self.summary),
+            "turns": list(self.turns), "chars": self.chars, "revision": self.revision,
+        }
+
+    @classmethod
+    def from_record(cls, session_id, record):
+        session = cls(session_id, record["topic"], record["level"])
+        session.prefix = record["prefix"]
+        session.summary = list(record["summary"])
+        session.turns = [tuple(turn) for turn in record["turns"]]
+        session.chars = record["chars"]
+        session.revision = record["revision"]
+        return session
+
+    def size(self):
+        return len(self.prefix) + sum(len(line) + 1 for line in self.summary) + self.chars
+
+    def prompt(self, query, node_context):
+        parts = [self.prefix]
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + "\n".join(self.summary) + "\n")
+        for question, answer in self.turns:
+            parts.append(f"Student: {question}\nTutor: {answer}\n")
+        parts.append(f"Current focus: \"{node_context}\"\nStudent: {query}\nTutor:")
+        return "\n".join(parts)
+
+
+class TutorSessions:
+    """LRU store of tutor sessions keyed by a client-chosen session ID.
+
+    Each session keeps at most max_turns recent exchanges and max_chars of
+    their text; older exchanges are folded into a one-line-per-turn summary
+    capped at summary_chars. Sessions idle for ttl seconds expire, and the
+    least recently used go first once there are more than max_sessions, so
+    memory is bounded by roughly max_sessions * (max_chars + summary_chars)
+    plus the per-session prefix.
+
+    With a store (a SQLiteTreeStore shared by every worker), each session is
+    also saved under "session|<id>" whenever it starts or gains a turn, and
+    open() reads it back, so a follow-up that lands on another worker keeps
+    its history and tree outline. The in-memory copy is reused only while
+    its revision matches the stored one. open() then reads SQLite, so async
+    callers should run it in a thread.
+    """
+
+    def __init__(self, max_sessions=1000, max_turns=6, max_chars=4000, summary_chars=1200, ttl=3600,
+                 clock=time.monotonic, store=None):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self.summary_chars = summary_chars
+        self.ttl = ttl
+        self.clock = clock
+        self.store = store
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.resumed = 0
+        self.restored = 0
+        self.folded = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.prompts = 0
+        self.prompt_chars = 0
+
+    def open(self, session_id, topic, level, tree=None):
+        """Returns the session for session_id, starting a new one if needed.
+
+        A missing or oversized ID gives None (stateless chat). A session whose
+        topic or level changed starts over.
+        """
+        if not session_id or len(session_id) > 64 or self.max_sessions <= 0:
+            return None
+        record = self._load(session_id)
+        now = self.clock()
+        created = False
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.expires_at <= now:
+                del self._sessions[session_id]
+                self.expirations += 1
+                session = None
+            if record is not None and (session is None or session.revision != record["revision"]):
+                # Started or continued by another worker.
+                session = TutorSession.from_record(session_id, record)
+                self._sessions[session_id] = session
+                self.restored += 1
+            if session is not None and (session.topic, session.level) == (topic, level):
+                self.resumed += 1
+            else:
+                session = TutorSession(session_id, topic, level, summarize_tree(tree) if tree else "")
+                self._sessions[session_id] = session
+                self.created += 1
+                created = True
+            session.expires_at = now + self.ttl
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        if created:
+            self._save(session)
+        return session
+
+    def prompt(self, session, query, node_context):
+        with self._lock:
+            text = session.prompt(query, node_context)
+            self.prompts += 1
+            self.prompt_chars += len(text)
+        return text
+
+    def record(self, session, query, answer):
+        """Appends an exchange, folding the oldest ones into the summary past the limits."""
+        question, answer = _WHITESPACE.sub(" ", query).strip(), answer.strip()
+        with self._lock:
+            session.turns.append((question, answer))
+            session.chars += len(question) + len(answer)
+            while session.turns and (len(session.turns) > self.max_turns or session.chars > self.max_chars):
+                question, answer = session.turns.pop(0)
+                session.chars -= len(question) + len(answer)
+                session.summary.append(f"- Student asked: {compact(question, 120)} Tutor: {compact(answer, 160)}")
+                self.folded += 1
+            while session.summary and sum(len(line) + 1 for line in session.summary) > self.summary_chars:
+                session.summary.pop(0)
+        self._save(session)
+
+    def _load(self, session_id):
+        if self.store is None:
+            return None
+        try:
+            return self.store.get("session|" + session_id)
+        except Exception as e:
+            print(f"Session store read failed: {e}")
+            return None
+
+    def _save(self, session):
+        # Queued; the store's writer thread commits it (see SQLiteTreeStore.put).
+        if self.store is None:
+            return
+        with self._lock:
+            session.revision = os.urandom(8).hex()
+            record = session.to_record()
+        try:
+            self.store.put("session|" + session.session_id, record, ttl=self.ttl)
+        except Exception as e:
+            print(f"Session store write failed: {e}")
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            sizes = [session.size() for session in self._sessions.values()]
+        return {
+            "sessions": len(sizes),
+            "max_sessions": self.max_sessions,
+            "ttl": self.ttl,
+            "chars": sum(sizes),
+            "largest_session_chars": max(sizes, default=0),
+            "created": self.created,
+            "resumed": self.resumed,
+            "restored": self.restored,
+            "turns_folded": self.folded,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "avg_prompt_chars": round(self.prompt_chars / self.prompts) if self.prompts else 0,
+        }
@@ -4,5 +4,8 @@ export const CONFIG = {
     // If you know your backend URL, put it here.
     API_URL: window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1' || window.location.hostname === ''
         ? 'http://127.0.0.1:8000'
-        : 'https://learnpath-h0m1.onrender.com' // TODO: Replace with your actual Render Backend URL after deployment
+        : 'https://learnpath-h0m1.onrender.com', // TODO: Replace with your actual Render Backend URL after deployment
+    // Static trees written by utils/precompute_trees.py --static-dir frontend/precomputed.
+    // Off by default, since a fresh deploy has no index.json; set to 'precomputed' once it does.
+    PRECOMPUTED_URL: null
 };
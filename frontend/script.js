@@ -352,7 +352,8 @@ const state = {
     isInfoPanelOpen: false,
     isAssistantOpen: false,
     view: "dashboard", // dashboard, paths, nodes, progress
-    visualizer: null
+    visualizer: null,
+    chatSession: null // { id, started } for the tutor's server-side memory
 };
 
 // --- DOM References ---
@@ -552,10 +553,30 @@ async function handleGenerate() {
     if (!topic) return;
 
     state.currentTopic = topic;
+    state.chatSession = null;
     setLoading(true);
 
     try {
-        const response = await fetch(`${CONFIG.API_URL}/process`, {
+        const precomputed = await loadPrecomputedTree(topic, dom.userLevel.value);
+        if (precomputed) {
+            state.pathData = precomputed.tree;
+            switchView('paths');
+            state.visualizer.render(precomputed.tree);
+            updateChatbot(precomputed.chatbot);
+            return;
+        }
+
+        const treeKey = `${dom.userLevel.value}|${topic.toLowerCase()}`;
+        if (knownTrees.has(treeKey)) {
+            const known = await loadKnownTree(treeKey, topic, dom.userLevel.value);
+            state.pathData = known.tree;
+            switchView('paths');
+            state.visualizer.render(known.tree);
+            updateChatbot(known.chatbot);
+            return;
+        }
+
+        const response = await fetch(`${CONFIG.API_URL}/process/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -564,14 +585,44 @@ async function handleGenerate() {
                 selected_node: "root"
             })
         });
+        if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+        // Nodes arrive root first, then each module followed by its leaves,
+        // so the tree is drawn and grown while the model is still generating.
+        let tree = null;
+        let chatbot = null;
+        let renderQueued = false;
+        const scheduleRender = () => {
+            if (renderQueued) return;
+            renderQueued = true;
+            requestAnimationFrame(() => {
+                renderQueued = false;
+                state.visualizer.render(tree);
+            });
+        };
+
+        await readJsonLines(response, (event) => {
+            if (event.type === 'error') throw new Error(event.error);
+            if (event.type === 'chatbot') chatbot = event.chatbot;
+            if (event.type !== 'node') return;
+
+            const node = { ...event.node, children: [] };
+            if (event.path.length === 0) {
+                tree = node;
+                state.pathData = tree;
+                switchView('paths');
+            } else if (tree) {
+                let parent = tree;
+                event.path.slice(0, -1).forEach(i => { parent = parent.children[i]; });
+                if (parent) parent.children[event.path[event.path.length - 1]] = node;
+            }
+            if (tree) scheduleRender();
+        });
 
-        const data = await response.json();
-        if (data.error) throw new Error(data.error);
-
-        state.pathData = data.tree;
-        state.visualizer.render(data.tree);
-        updateChatbot(data.chatbot);
-        switchView('paths');
+        if (!tree) throw new Error("Empty learning path");
+        state.visualizer.render(tree);
+        updateChatbot(chatbot);
+        knownTrees.set(treeKey, null);
     } catch (err) {
         console.error(err);
         appendChatMessage('ai', "I encountered an error. Please try again.");
@@ -580,6 +631,75 @@ async function handleGenerate() {
     }
 }
 
+// Topics already generated in this session. The first time a topic streams;
+// after that it comes from /process, which the server answers from its cache,
+// and once we hold its ETag an unchanged tree costs a 304.
+const knownTrees = new Map(); // key -> { etag, data } or null
+
+async function loadKnownTree(key, topic, level) {
+    const known = knownTrees.get(key);
+    const headers = { 'Content-Type': 'application/json' };
+    if (known) headers['If-None-Match'] = known.etag;
+    const response = await fetch(`${CONFIG.API_URL}/process`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ topic, level, selected_node: "root" })
+    });
+    if (response.status === 304 && known) return known.data;
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const data = await response.json();
+    if (data.error || !data.tree) throw new Error(data.error || "Empty learning path");
+    const etag = response.headers.get('ETag');
+    knownTrees.set(key, etag ? { etag, data } : null);
+    return data;
+}
+
+let precomputedIndex = null;
+
+// Popular topics are pre-generated as static files next to the frontend, so
+// they render without a backend round trip. Keys match the backend's
+// normalize_key: "level|topic" with case, punctuation and spacing collapsed.
+async function loadPrecomputedTree(topic, level) {
+    if (!CONFIG.PRECOMPUTED_URL) return null;
+    if (!precomputedIndex) {
+        precomputedIndex = fetch(`${CONFIG.PRECOMPUTED_URL}/index.json`)
+            .then(response => (response.ok ? response.json() : {}))
+            .catch(() => ({}));
+    }
+    const index = await precomputedIndex;
+    const topicKey = topic.toLowerCase()
+        .replace(/[^\p{L}\p{N}_\s+#.]|\.(?![\p{L}\p{N}_])|(?<=\S)\./gu, ' ')
+        .replace(/\s+/g, ' ')
+        .trim();
+    const file = index[`${level.trim().toLowerCase()}|${topicKey}`];
+    if (!file) return null;
+    try {
+        const response = await fetch(`${CONFIG.PRECOMPUTED_URL}/${file}`);
+        return response.ok ? await response.json() : null;
+    } catch (err) {
+        return null;
+    }
+}
+
+async function readJsonLines(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (value) buffer += decoder.decode(value, { stream: !done });
+
+        let newline;
+        while ((newline = buffer.indexOf('\n')) !== -1) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onEvent(JSON.parse(line));
+        }
+        if (done) break;
+    }
+}
+
 function setLoading(isLoading) {
     dom.generateBtn.classList.toggle('loading', isLoading);
     dom.generateBtn.disabled = isLoading;
@@ -631,23 +751,73 @@ async function sendChatMessage() {
     appendChatMessage('user', message);
     dom.chatInput.value = '';
 
+    const reply = appendChatMessage('ai', '');
+
+    // The server keeps the conversation per session; the tree goes along
+    // with the first message only.
+    if (!state.chatSession) {
+        const id = window.crypto && crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        state.chatSession = { id, started: false };
+    }
+    const session = state.chatSession;
+
     try {
-        const response = await fetch(`${CONFIG.API_URL}/chat`, {
+        const response = await fetch(`${CONFIG.API_URL}/chat/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 message: message,
                 topic: state.currentTopic,
                 level: dom.userLevel.value,
-                node_context: state.selectedNode ? state.selectedNode.title : "root"
+                node_context: state.selectedNode ? state.selectedNode.title : "root",
+                session_id: session.id,
+                tree: session.started ? undefined : state.pathData
             })
         });
-
-        const data = await response.json();
-        if (data.error) throw new Error(data.error);
-        appendChatMessage('ai', data.response);
+        if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+        session.started = true;
+
+        // Render tokens as the Server-Sent Events arrive.
+        await readEventStream(response, (event, data) => {
+            if (event === 'error') throw new Error(data.error);
+            if (data.delta) {
+                reply.textContent += data.delta;
+                dom.chatMessages.scrollTop = dom.chatMessages.scrollHeight;
+            }
+        });
+        if (!reply.textContent) throw new Error("Empty response");
     } catch (err) {
-        appendChatMessage('ai', "I'm having trouble connecting to my neural core. Please try again.");
+        reply.textContent = "I'm having trouble connecting to my neural core. Please try again.";
+    }
+}
+
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (event === 'done') {
+                await reader.cancel();
+                return;
+            }
+            if (data) onEvent(event, JSON.parse(data));
+        }
     }
 }
 
@@ -657,6 +827,7 @@ function appendChatMessage(type, text) {
     div.textContent = text;
     dom.chatMessages.appendChild(div);
     dom.chatMessages.scrollTop = dom.chatMessages.scrollHeight;
+    return div;
 }
 
 function updateChatbot(cb) {
@@ -0,0 +1,75 @@
+"""Mock-latency benchmark for the async Gemini path.
+
+Replaces the Gemini client with a fake that sleeps for a fixed latency and
+drives /process through the ASGI app at increasing concurrency. With the async
+connector the slow calls overlap, so throughput should scale with concurrency
+up to GEMINI_MAX_CONCURRENCY. The "blocking" column runs the old synchronous
+call inside the handler for comparison.
+
+Usage: python tests/bench_concurrency.py [latency_seconds] [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+os.environ.setdefault("GEMINI_MAX_CONCURRENCY", "16")
+os.environ.setdefault("ADMISSION_CHAT_RESERVE", "0")
+# Every request should reach the fake upstream call.
+os.environ.setdefault("TREE_CACHE_SIZE", "0")
+os.environ.setdefault("SEMANTIC_CACHE_SIZE", "0")
+
+import httpx
+from backend.main import app, path_builder
+from fake_gemini import FakeClient
+
+
+async def run_async(client, concurrency, total):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            r = await client.post("/process", json={"topic": f"topic {i}", "level": "beginner"})
+            r.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def run_blocking(concurrency, total):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            # What the handlers did before: a sync SDK call on the event loop.
+            path_builder.gemini.process_request(f"topic {i}", "beginner")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def main(latency, total):
+    path_builder.gemini.client = FakeClient(latency=latency)
+    path_builder.gemini.use_mock = False
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"latency={latency:.2f}s requests={total} max_concurrency={path_builder.gemini.admission.slots}")
+        print(f"{'concurrency':>11} | {'async req/s':>11} | {'blocking req/s':>14}")
+        for concurrency in (1, 2, 4, 8, 16):
+            async_wall = await run_async(client, concurrency, total)
+            blocking_wall = await run_blocking(concurrency, total)
+            print(f"{concurrency:>11} | {total / async_wall:>11.1f} | {total / blocking_wall:>14.1f}")
+
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    asyncio.run(main(latency, total))
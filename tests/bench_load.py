@@ -0,0 +1,189 @@
+"""Offline load test: drives the API against a fake Gemini backend.
+
+The fake upstream (utils/fake_client.py) samples each call's latency from a
+lognormal distribution and fails a configurable share of calls with 429s or
+500s. Streamed answers arrive in chunks of --chunk-size characters. Each
+endpoint gets --requests requests at --concurrency in flight, through the ASGI
+app in-process, so no network or API key is needed.
+
+The report is JSON with throughput, p50/p95/p99 latency, error rate and
+fallback rate per endpoint (time to first chunk as well for /chat/stream).
+--max-p99-ms and --min-rps turn it into a gate: the exit code is 1 when any
+endpoint misses them.
+
+Usage: python tests/bench_load.py --concurrency 32 --requests 400 --latency-ms 300 --p99-ms 1500 \\
+           --quota-rate 0.05 --error-rate 0.01 --output load.json --max-p99-ms 2500
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+ENDPOINTS = {
+    "generate_path": ("/generate_path", lambda topic, level: {"text": topic, "level": level}),
+    "process": ("/process", lambda topic, level: {"topic": topic, "level": level}),
+    "chat": ("/chat", lambda topic, level: {"message": "Where do I start?", "topic": topic, "level": level}),
+    "chat_stream": ("/chat/stream", lambda topic, level: {"message": "Where do I start?", "topic": topic, "level": level}),
+}
+LEVELS = ("beginner", "intermediate", "advanced")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test against a fake Gemini backend.")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint")
+    parser.add_argument("--distinct", type=int, help="distinct topics per endpoint (default: all unique)")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="median upstream latency")
+    parser.add_argument("--p99-ms", type=float, default=800.0, help="99th percentile upstream latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream calls failing with 500")
+    parser.add_argument("--quota-rate", type=float, default=0.0, help="share of upstream calls failing with 429")
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--chunk-delay-ms", type=float, default=5.0)
+    parser.add_argument("--cooldown-s", type=float, default=1.0, help="router cooldown after a 429")
+    parser.add_argument("--upstream-concurrency", type=int, default=32, help="GEMINI_MAX_CONCURRENCY")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--min-rps", type=float)
+    return parser.parse_args(argv)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+def summarize(latencies, wall, errors, fallbacks, first_chunks=None):
+    latencies = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 1)
+    report = {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "fallback_rate": round(fallbacks / len(latencies), 4) if latencies else 0.0,
+    }
+    if first_chunks:
+        first_chunks = sorted(first_chunks)
+        report["first_chunk_p50_ms"] = ms(percentile(first_chunks, 50))
+        report["first_chunk_p99_ms"] = ms(percentile(first_chunks, 99))
+    return report
+
+
+async def drive(http, name, args, fallback_count):
+    route, payload = ENDPOINTS[name]
+    distinct = args.distinct or args.requests
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, first_chunks = [], []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        body = payload(f"{name} load topic {i % distinct}", LEVELS[i % len(LEVELS)])
+        async with semaphore:
+            start = time.perf_counter()
+            if name == "chat_stream":
+                failed, first = False, None
+                async with http.stream("POST", route, json=body) as response:
+                    async for line in response.aiter_lines():
+                        if first is None and line.startswith("data:"):
+                            first = time.perf_counter() - start
+                        failed = failed or line.startswith("event: error")
+                failed = failed or response.status_code != 200
+                if first is not None:
+                    first_chunks.append(first)
+            else:
+                response = await http.post(route, json=body)
+                data = response.json() if response.status_code == 200 else {}
+                failed = response.status_code != 200 or (isinstance(data, dict) and "error" in data)
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    before = fallback_count()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    wall = time.perf_counter() - start
+    return summarize(latencies, wall, errors, fallback_count() - before, first_chunks)
+
+
+async def run(args):
+    import httpx
+    from backend.main import app, path_builder
+    from backend.modules import metrics
+    from utils.fake_client import FakeClient, lognormal_latency
+
+    path_builder.gemini.api_key = "offline-load-test"
+    path_builder.gemini.use_mock = False
+    path_builder.gemini.router.cooldown = args.cooldown_s
+    path_builder.gemini.client = FakeClient(
+        latency=lognormal_latency(args.latency_ms / 1000, args.p99_ms / 1000, seed=args.seed),
+        chunk_size=args.chunk_size,
+        chunk_delay=args.chunk_delay_ms / 1000,
+        error_rate=args.error_rate,
+        quota_rate=args.quota_rate,
+        seed=args.seed,
+    )
+
+    def fallback_count():
+        return sum(metrics.FALLBACKS.value(kind) for kind in ("graph", "mock"))
+
+    report = {"config": vars(args).copy(), "endpoints": {}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=120) as http:
+        for name in args.endpoints.split(","):
+            report["endpoints"][name] = await drive(http, name.strip(), args, fallback_count)
+    report["upstream"] = {
+        "calls": path_builder.gemini.client.calls,
+        "simulated_429s": path_builder.gemini.client.random_429s,
+        "simulated_errors": path_builder.gemini.client.random_errors,
+    }
+    return report
+
+
+def gate(report, args):
+    failures = []
+    for name, stats in report["endpoints"].items():
+        if args.max_p99_ms is not None and stats["p99_ms"] > args.max_p99_ms:
+            failures.append(f"{name}: p99 {stats['p99_ms']}ms > {args.max_p99_ms}ms")
+        if args.min_rps is not None and stats["throughput_rps"] < args.min_rps:
+            failures.append(f"{name}: {stats['throughput_rps']} req/s < {args.min_rps} req/s")
+    return failures
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Configure the app before it is imported: an upstream concurrency limit
+    # and fake models with quota to spare, so only simulated 429s occur.
+    os.environ.setdefault("GEMINI_API_KEY", "offline-load-test")
+    os.environ["GEMINI_MAX_CONCURRENCY"] = str(args.upstream_concurrency)
+    os.environ.setdefault("GEMINI_MODELS", ",".join(f"fake-model-{i}:1000000:1000000000" for i in range(4)))
+
+    # The app logs a line per request; keep only its warnings.
+    logging.getLogger("backend").setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+
+    failures = gate(report, args)
+    report["gate_failures"] = failures
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Per-request cost of the metrics instrumentation.
+
+A cache-hit /process request records about six metric events: two stage
+timers (route, cache), a route counter, a cache-lookup counter, and the
+middleware's request counter and latency histogram. This times those calls
+directly, then times a cached /process request with and without the
+middleware.
+
+Usage: python tests/bench_metrics.py
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.modules import metrics
+
+N = 200_000
+
+
+def per_call(fn):
+    start = time.perf_counter()
+    for _ in range(N):
+        fn()
+    return (time.perf_counter() - start) / N * 1e6
+
+
+def timer():
+    with metrics.timed("bench"):
+        pass
+
+
+def request_events():
+    with metrics.timed("route"):
+        pass
+    with metrics.timed("cache"):
+        pass
+    metrics.ROUTES.inc("bench")
+    metrics.CACHE_LOOKUPS.inc("bench", "hit")
+    metrics.HTTP_REQUESTS.inc("POST", "/bench", 200)
+    metrics.HTTP_DURATION.observe(0.001, "POST", "/bench")
+
+
+def bench_asgi():
+    # Raw ASGI calls, so the numbers are not dominated by an HTTP client.
+    from backend.main import app, path_builder
+    from fake_gemini import FakeClient
+    path_builder.gemini.api_key = "offline"
+    path_builder.gemini.client = FakeClient()
+    path_builder.gemini.use_mock = False
+
+    body = b'{"topic": "medieval poetry", "level": "beginner"}'
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/process", "raw_path": b"/process", "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1), "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def run(target, n):
+        await target(dict(scope), receive, send)  # warm the cache
+        start = time.perf_counter()
+        for _ in range(n):
+            await target(dict(scope), receive, send)
+        return (time.perf_counter() - start) / n * 1e6
+
+    # Compare MetricsMiddleware with the app it wraps. Rounds alternate and
+    # the best of each is kept to reduce noise.
+    logging.getLogger("backend").setLevel(logging.WARNING)
+    layer = app.build_middleware_stack()
+    while not isinstance(layer, metrics.MetricsMiddleware):
+        layer = layer.app
+    with_metrics, without_metrics = [], []
+    for _ in range(5):
+        with_metrics.append(asyncio.run(run(layer, 1000)))
+        without_metrics.append(asyncio.run(run(layer.app, 1000)))
+    return min(with_metrics), min(without_metrics)
+
+
+if __name__ == "__main__":
+    print(f"timed() stage timer:        {per_call(timer):.2f} us")
+    print(f"Counter.inc:                {per_call(lambda: metrics.ROUTES.inc('bench')):.2f} us")
+    print(f"Histogram.observe:          {per_call(lambda: metrics.STAGE_DURATION.observe(0.01, 'bench')):.2f} us")
+    print(f"all events of one request:  {per_call(request_events):.2f} us")
+    with_metrics, without_metrics = bench_asgi()
+    print(f"cached /process, with metrics:    {with_metrics:.1f} us")
+    print(f"cached /process, without metrics: {without_metrics:.1f} us")
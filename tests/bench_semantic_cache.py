@@ -0,0 +1,94 @@
+"""Hit ratio of the exact-key cache vs. exact + semantic cache on a sample topic set.
+
+Each group below is one subject phrased several ways, the way users type it.
+The first phrasing of a group is a miss that fills the caches; later ones
+should be served from cache. Also reports lookup latency on a large index,
+read-only and with an add before every lookup (as a busy server does).
+
+Usage: python tests/bench_semantic_cache.py
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.modules.semantic_cache import SemanticCache
+from backend.modules.tree_cache import TreeCache, normalize_key
+
+TOPIC_GROUPS = [
+    ["learn react", "React.js for beginners", "ReactJS basics", "React", "intro to react"],
+    ["python", "Python for beginners", "learn python", "python basics", "Python 101"],
+    ["machine learning", "Machine Learning basics", "intro to machine learning", "learn machine learning"],
+    ["node.js", "NodeJS", "learn node js", "node basics"],
+    ["SQL", "sql basics", "Intro to SQL", "learn sql"],
+    ["data structures and algorithms", "algorithms and data structures", "learn data structures and algorithms"],
+    ["docker", "Docker tutorial", "getting started with docker", "docker basics"],
+    ["kubernetes", "Kubernetes fundamentals", "learn kubernetes"],
+    ["rust", "Rust programming", "learn rust"],
+    ["deep learning", "deep learning with pytorch", "Deep Learning 101"],
+]
+# Different subjects that look alike; every one of these must be a miss.
+DISTINCT_TOPICS = ["javascript", "java", "python 2", "python 3", "redux", "react native"]
+
+
+def run(use_semantic):
+    exact = TreeCache(max_size=1024)
+    similar = SemanticCache()
+    hits = lookups = 0
+    for group in TOPIC_GROUPS + [[t] for t in DISTINCT_TOPICS]:
+        for topic in group:
+            lookups += 1
+            key = normalize_key(topic, "beginner")
+            tree = exact.get(key)
+            if tree is None and use_semantic:
+                tree = similar.get(topic, "beginner")
+            if tree is not None:
+                hits += 1
+                if topic in DISTINCT_TOPICS:
+                    print(f"  false hit: {topic!r} served {tree['tree']['title']!r}")
+                continue
+            generated = {"tree": {"title": topic}}
+            exact.set(key, generated)
+            similar.add(topic, "beginner", generated)
+    return hits, lookups
+
+
+def lookup_latency(entries):
+    cache = SemanticCache(max_entries=entries)
+    for i in range(entries):
+        cache.add(f"subject{i} area{i * 7}", "beginner", i)
+    cache.get("warm up", "beginner")
+    start = time.perf_counter()
+    for i in range(1000):
+        cache.get(f"subject{i} area{i * 7}", "beginner")
+    return (time.perf_counter() - start) / 1000
+
+
+def interleaved_latency(entries, rounds=1000):
+    # add() then get(): every lookup sees a freshly inserted entry.
+    cache = SemanticCache(max_entries=entries)
+    for i in range(entries):
+        cache.add(f"subject{i} area{i * 7}", "beginner", i)
+    cache.get("warm up", "beginner")
+    times = []
+    for i in range(rounds):
+        cache.add(f"fresh{i} field{i * 3}", "beginner", i)
+        start = time.perf_counter()
+        cache.get(f"subject{i} area{i * 7}", "beginner")
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.mean(times), times[int(len(times) * 0.99)], cache.stats()["merges"]
+
+
+if __name__ == "__main__":
+    best_case = sum(len(g) - 1 for g in TOPIC_GROUPS)
+    for label, use_semantic in (("exact only", False), ("exact + semantic", True)):
+        hits, lookups = run(use_semantic)
+        print(f"{label:>17}: {hits}/{lookups} hits (ratio {hits / lookups:.2f}, ideal {best_case / lookups:.2f})")
+    for entries in (1000, 5000):
+        print(f"lookup with {entries} entries: {lookup_latency(entries) * 1e6:.0f}us")
+    for entries in (2048, 5000):
+        mean, p99, merges = interleaved_latency(entries)
+        print(f"add + lookup with {entries} entries: mean {mean * 1e6:.0f}us, p99 {p99 * 1e6:.0f}us ({merges} merges)")
@@ -0,0 +1,104 @@
+"""Cold-start cost of the API: import time and time to first response.
+
+Import time is measured in fresh interpreters (python -c "import
+backend.main"). Time to first response starts a real uvicorn process and
+measures, from the moment it is spawned, when /health first answers and when
+the first /process request (a knowledge-graph topic, so no LLM call) comes
+back. Runs in mock mode, so no API key is needed.
+
+Usage: python tests/bench_startup.py [--runs 5] [--no-warmup]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import backend.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def env(warmup):
+    values = dict(os.environ, MOCK_AI="true", WARMUP="true" if warmup else "false")
+    values.pop("TRAFFIC_LOG", None)
+    return values
+
+
+def import_seconds(warmup):
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env(warmup),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return response.status
+
+
+def first_response_seconds(warmup):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env(warmup), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                request(base + "/health")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.perf_counter() - start > 60:
+                    raise RuntimeError("server did not start")
+                time.sleep(0.005)
+        health = time.perf_counter() - start
+        request(base + "/process", {"topic": "learn html css and javascript", "level": "beginner"})
+        return health, time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-warmup", action="store_true", help="start with WARMUP=false")
+    args = parser.parse_args(argv)
+    warmup = not args.no_warmup
+
+    imports = [import_seconds(warmup) for _ in range(args.runs)]
+    firsts = [first_response_seconds(warmup) for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "warmup": warmup,
+        "import_ms": round(statistics.median(imports) * 1000, 1),
+        "first_health_ms": round(statistics.median(h for h, _ in firsts) * 1000, 1),
+        "first_process_ms": round(statistics.median(p for _, p in firsts) * 1000, 1),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Cost of answering a cached tree: generic JSON encoding vs. pre-encoded bytes.
+
+"before" is the previous response path for every cache hit: hash the tree
+for its tree_id, copy the dict, run FastAPI's jsonable_encoder and render
+a JSONResponse. "after" looks the tree up in EncodedTrees and picks the
+gzip body. Also reports the one-off cost of encoding a new tree, bytes per
+response, and end-to-end /process latency for 200s and 304s.
+
+Usage: python tests/bench_tree_encoding.py [iterations]
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from backend.main import app, path_builder
+from backend.modules.expansion import tree_id
+from backend.modules.tree_codec import EncodedTree, EncodedTrees
+from fake_gemini import LIVE_TREE
+
+
+def before(result):
+    body = {**result, "tree_id": tree_id(result)}
+    return JSONResponse(jsonable_encoder(body)).body
+
+
+def per_call_us(fn, arg, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(arg)
+    return (time.perf_counter() - start) * 1e6 / n
+
+
+async def process_latency(n, headers):
+    body = {"topic": "learn react and node", "level": "beginner"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        first = await http.post("/process", json=body)
+        if headers.get("If-None-Match") == "":
+            headers = {**headers, "If-None-Match": first.headers["etag"]}
+        start = time.perf_counter()
+        for _ in range(n):
+            response = await http.post("/process", json=body, headers=headers)
+        return (time.perf_counter() - start) * 1e3 / n, response.status_code
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    path_builder.gemini.use_mock = True
+    trees = {
+        "llm (mock)": LIVE_TREE,
+        "graph": path_builder.graph.build_tree("web_development", "learn react and node", "beginner"),
+    }
+    for name, tree in trees.items():
+        encoded = EncodedTrees()
+        encoded.get(tree)
+        old_us = per_call_us(before, tree, n)
+        new_us = per_call_us(lambda t: encoded.get(t).negotiate("gzip, br"), tree, n)
+        first_us = per_call_us(EncodedTree, tree, max(1, n // 10))
+        e = encoded.get(tree)
+        print(f"{name} tree")
+        print(f"  before (encode per hit) : {old_us:8.1f}us per response, {len(before(tree))} bytes")
+        print(f"  after  (cached bytes)   : {new_us:8.1f}us per response, {len(e.gzip)} bytes gzip"
+              + (f", {len(e.br)} bytes br" if e.br else ""))
+        print(f"  first encode of a tree  : {first_us:8.1f}us (validate + serialize + compress)")
+        print(f"  speedup per hit {old_us / new_us:.0f}x, wire bytes -{1 - len(e.gzip) / len(e.body):.0%}")
+
+    requests = max(1, n // 10)
+    for label, headers in (("200 identity", {"Accept-Encoding": "identity"}), ("200 gzip", {"Accept-Encoding": "gzip"}),
+                           ("304", {"If-None-Match": ""})):
+        ms, status = asyncio.run(process_latency(requests, headers))
+        print(f"/process {label:<12}: {ms:6.3f}ms per request (status {status})")
@@ -0,0 +1,93 @@
+"""Helpers shared by the verify and bench scripts.
+
+The fake Gemini client itself lives in utils/fake_client.py, so the utils
+scripts can use it too; it is re-exported here. Also holds a fake clock,
+helpers that point the app at a FakeClient and send it requests, and the
+run_checks() runner.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.fake_client import FakeClient, LIVE_TREE, TREE_TEXT, lognormal_latency
+
+
+class FakeClock:
+    """Stand-in for time.monotonic: returns now, which the test moves by hand."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+# Helpers for the scripts that drive a connector or backend.main's app
+# in-process. Backend modules are imported lazily so scripts that only need
+# FakeClient do not load the app; callers that use the app chdir to the repo
+# root first, as backend.main expects.
+
+def offline(connector, client, **fields):
+    """Points connector at client, offline, with the fake model and a fresh 8-entry cache.
+
+    Keyword arguments are set on the connector afterwards (router, cache,
+    store, similar, sessions, ...). Returns the connector.
+    """
+    from backend.modules.model_router import ModelRouter
+    from backend.modules.tree_cache import TreeCache
+
+    connector.api_key = "offline"
+    connector.client = client
+    connector.use_mock = False
+    connector.router = ModelRouter([("fake-model", 100000, 10 ** 9)])
+    connector.cache = TreeCache(max_size=8, ttl=60)
+    for name, value in fields.items():
+        setattr(connector, name, value)
+    return connector
+
+
+def make_connector(client, **fields):
+    """A new GeminiConnector set up by offline()."""
+    from backend.modules.gemini_connector import GeminiConnector
+
+    return offline(GeminiConnector(), client, **fields)
+
+
+def use_client(client, **fields):
+    """Sets up the app's own connector with offline() and returns it."""
+    from backend.main import path_builder
+
+    return offline(path_builder.gemini, client, **fields)
+
+
+def request(method, route, payload=None, headers=None, timeout=5.0):
+    """Sends one request to the app over ASGI and returns the httpx response."""
+    import httpx
+    from backend.main import app
+
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=timeout) as http:
+            return await http.request(method, route, json=payload, headers=headers)
+
+    return asyncio.run(send())
+
+
+def post(route, payload=None, headers=None, timeout=5.0):
+    return request("POST", route, payload, headers, timeout)
+
+
+def run_checks(namespace):
+    """Runs every test_* function in namespace (a script's globals()) and exits non-zero on failure."""
+    failed = False
+    for name, check in list(namespace.items()):
+        if name.startswith("test_") and callable(check):
+            try:
+                check()
+                print(f"PASS {name}")
+            except Exception as e:
+                failed = True
+                print(f"FAIL {name}: {e!r}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import httpx
+from backend.main import app, path_builder
+from backend.modules.admission import AdmissionController, Overloaded, RequestClass
+from backend.modules.tree_cache import TreeCache
+from fake_gemini import FakeClient, run_checks, use_client
+
+
+def controller(slots=1, chat_queue=8, generate_queue=8, deadline=1.0, generate_active=None):
+    return AdmissionController(slots, [
+        RequestClass("chat", max_queue=chat_queue, deadline=deadline),
+        RequestClass("generate", max_queue=generate_queue, deadline=deadline, max_active=generate_active),
+    ])
+
+
+def test_chat_is_served_before_queued_generation():
+    admission = controller(slots=1)
+    order = []
+
+    async def call(kind, name, hold=0.02):
+        async with admission.slot(kind):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def run():
+        first = asyncio.ensure_future(call("generate", "g0"))
+        await asyncio.sleep(0)
+        waiting = [asyncio.ensure_future(call("generate", "g1")), asyncio.ensure_future(call("generate", "g2"))]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.ensure_future(call("chat", "c1")))
+        await asyncio.gather(first, *waiting)
+
+    asyncio.run(run())
+    assert order == ["g0", "c1", "g1", "g2"]
+    assert admission.active == 0
+
+
+def test_full_queue_fails_fast_with_retry_after():
+    admission = controller(slots=1, generate_queue=2)
+
+    async def run():
+        holder = asyncio.ensure_future(admission.acquire("generate"))
+        started = await holder
+        queued = [asyncio.ensure_future(admission.acquire("generate")) for _ in range(2)]
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        try:
+            await admission.acquire("generate")
+            raise AssertionError("expected Overloaded")
+        except Overloaded as e:
+            assert e.reason == "queue full" and e.retry_after >= 1
+        assert time.perf_counter() - start < 0.01
+        admission.release("generate", started)
+        for waiter in queued:
+            admission.release("generate", await waiter)
+
+    asyncio.run(run())
+    assert admission.classes["generate"].queue_full == 1
+
+
+def test_queue_deadline_expires():
+    admission = controller(slots=1, deadline=0.05)
+
+    async def run():
+        await admission.acquire("generate")
+        start = time.perf_counter()
+        try:
+            await admission.acquire("chat")
+            raise AssertionError("expected Overloaded")
+        except Overloaded as e:
+            assert e.reason == "queue deadline"
+        assert 0.04 < time.perf_counter() - start < 0.5
+        # The expired waiter is gone, so nobody is left queued.
+        assert len(admission.classes["chat"].waiters) == 0
+
+    asyncio.run(run())
+    assert admission.classes["chat"].expired == 1
+
+
+def test_reserved_slots_stay_free_for_chat():
+    admission = controller(slots=3, generate_active=2)
+
+    async def run():
+        for _ in range(2):
+            await admission.acquire("generate")
+        third = asyncio.ensure_future(admission.acquire("generate"))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        start = time.perf_counter()
+        await admission.acquire("chat")
+        assert time.perf_counter() - start < 0.01
+        third.cancel()
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    admission = controller(slots=1)
+
+    async def run():
+        started = await admission.acquire("generate")
+        waiter = asyncio.ensure_future(admission.acquire("generate"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        admission.release("generate", started)
+        await asyncio.gather(waiter, return_exceptions=True)
+        # Handed the freed slot as it was cancelled, the waiter passes it on.
+        assert admission.active == 0
+        await asyncio.wait_for(admission.acquire("chat"), 0.1)
+
+    asyncio.run(run())
+
+
+def use_uncached_client(client, admission):
+    # Every request reaches the model, so the load is real.
+    use_client(client, cache=TreeCache(max_size=0, ttl=60), admission=admission)
+    path_builder.gemini.similar.max_entries = 0
+
+
+def p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(0.95 * len(values)))]
+
+
+def test_chat_latency_holds_while_generation_saturates():
+    latency = 0.1
+    use_uncached_client(FakeClient(latency=latency), controller(slots=5, generate_queue=8, deadline=2.0, generate_active=3))
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as http:
+            chat_body = {"message": "What is a closure?", "topic": "python", "level": "beginner"}
+
+            async def chat():
+                start = time.perf_counter()
+                response = await http.post("/chat", json=chat_body)
+                assert response.status_code == 200
+                return time.perf_counter() - start
+
+            idle = [await chat() for _ in range(5)]
+
+            # Far more tree generations than the 3 generation slots and the
+            # queue of 8 can hold, arriving for the whole measurement.
+            generations = []
+            done = asyncio.Event()
+
+            async def generate(i):
+                start = time.perf_counter()
+                response = await http.post("/process", json={"topic": f"overload topic {i}", "level": "beginner"})
+                generations.append((response, time.perf_counter() - start))
+
+            async def flood():
+                tasks, i = [], 0
+                while not done.is_set():
+                    tasks.extend(asyncio.ensure_future(generate(i + j)) for j in range(2))
+                    i += 2
+                    await asyncio.sleep(0.01)
+                await asyncio.gather(*tasks)
+
+            flooding = asyncio.ensure_future(flood())
+            await asyncio.sleep(0.05)
+            loaded = []
+            for _ in range(10):
+                loaded.extend(await asyncio.gather(chat(), chat()))
+            done.set()
+            await flooding
+            stats = (await http.get("/admission/stats")).json()
+            return idle, loaded, generations, stats
+
+    idle, loaded, generations, stats = asyncio.run(run())
+    statuses = [response.status_code for response, _ in generations]
+    shed = [(response, seconds) for response, seconds in generations if response.status_code == 503]
+    assert set(statuses) <= {200, 503} and statuses.count(200) >= 3 and shed
+    # Shed requests are answered straight away, with a hint when to retry.
+    assert all(int(response.headers["Retry-After"]) >= 1 for response, _ in shed)
+    assert max(seconds for _, seconds in shed) < 0.05
+    # Chat keeps its reserved slot: close to an idle call, never a queue wait.
+    assert p95(loaded) < max(p95(idle) * 2, latency + 0.1), (p95(idle), p95(loaded))
+    assert stats["classes"]["generate"]["queue_full"] == len(shed)
+    assert stats["classes"]["chat"]["queue_full"] == 0
+
+
+def test_chat_stream_rejects_before_streaming():
+    admission = controller(slots=1, chat_queue=0)
+    use_uncached_client(FakeClient(latency=0.2), admission)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            await admission.acquire("generate")
+            body = {"message": "hi", "topic": "python"}
+            return await http.post("/chat/stream", json=body), await http.post("/chat", json=body)
+
+    streamed, plain = asyncio.run(run())
+    assert streamed.status_code == 503 and "Retry-After" in streamed.headers
+    assert plain.status_code == 503 and plain.json()["retry_after"] >= 1
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -3,35 +3,42 @@ import sys
 
 BASE_URL = "http://127.0.0.1:8000"
 
-def test_ai_enrichment():
-    print("\n--- Testing Live AI Enrichment ---")
+def test_ai_generation():
+    print("\n--- Testing Live AI Generation ---")
+    # A topic outside the knowledge graph, so the tree has to come from Gemini.
     payload = {
-        "text": "I want to master machine learning",
+        "topic": "I want to master medieval Japanese poetry",
         "level": "intermediate"
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/generate_path", json=payload)
+        response = requests.post(f"{BASE_URL}/process", json=payload)
         response.raise_for_status()
         data = response.json()
         
-        domain = data.get("domain")
-        suggestions = data.get("ai_suggestions", [])
+        if "error" in data:
+            print(f"FAILED: {data['error']}")
+            sys.exit(1)
+
+        tree = data.get("tree", {})
+        modules = tree.get("children", [])
+        message = data.get("chatbot", {}).get("message", "")
         
-        print(f"Domain Detected: {domain}")
-        print(f"AI Suggestions Received: {len(suggestions)}")
+        print(f"Root: {tree.get('title')}")
+        print(f"Modules Received: {len(modules)}")
+        print(f"Server-Timing: {response.headers.get('server-timing')}")
         
-        if not suggestions:
-            print("FAILED: No suggestions received.")
+        if not modules:
+            print("FAILED: No modules received.")
             sys.exit(1)
             
-        print("Suggestions:")
-        for s in suggestions:
-            print(f"- {s}")
+        print("Modules:")
+        for m in modules:
+            print(f"- {m.get('title')}")
             
-        # Basic validation that it's not a dummy error list
-        if len(suggestions) == 1 and "Error" in suggestions[0]:
-            print("FAILED: API returned error message.")
+        # The mock fallback marks its messages, so a live answer never has it
+        if "[Mock Mode]" in message:
+            print("FAILED: Served the mock fallback (no API key or quota exhausted).")
             sys.exit(1)
             
         print("SUCCESS: Live AI data received.")
@@ -41,4 +48,4 @@ def test_ai_enrichment():
         sys.exit(1)
 
 if __name__ == "__main__":
-    test_ai_enrichment()
+    test_ai_generation()
@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.main import path_builder
+from backend.modules.semantic_cache import SemanticCache
+from backend.modules.tree_cache import TreeCache
+from fake_gemini import FakeClient, LIVE_TREE, post, run_checks, use_client
+
+LATENCY = 0.02
+
+
+def reset(client):
+    # Room for a whole 200-item batch; no near-duplicate reuse across items.
+    use_client(client, cache=TreeCache(max_size=1024, ttl=60), similar=SemanticCache(max_entries=0))
+    path_builder.trees = TreeCache(max_size=1024, ttl=60)
+
+
+def post_lines(payload):
+    response = post("/generate_paths", payload, timeout=60)
+    return response.status_code, [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_deduplicates_and_maps_results_back():
+    client = FakeClient()
+    reset(client)
+    items = [
+        {"text": "Medieval Poetry", "level": "beginner"},
+        {"text": "medieval poetry!", "level": "Beginner"},
+        {"text": "medieval poetry", "level": "advanced"},
+    ]
+    status, lines = post_lines({"items": items})
+    assert status == 200
+    assert lines[-1] == {"type": "done", "items": 3, "unique": 2, "errors": 0}
+    results = {tuple(line["indices"]): line for line in lines[:-1]}
+    assert set(results) == {(0, 1), (2,)}
+    assert results[(0, 1)]["result"]["tree"] == LIVE_TREE["tree"]
+    assert results[(0, 1)]["result"]["tree_id"]
+    assert client.calls == 2
+
+
+def test_item_errors_do_not_fail_the_batch():
+    reset(FakeClient())
+    original = path_builder.aprocess_request
+
+    async def flaky(topic, level, selected_node="root"):
+        if topic == "boom":
+            raise RuntimeError("upstream exploded")
+        return await original(topic, level, selected_node)
+
+    path_builder.aprocess_request = flaky
+    try:
+        status, lines = post_lines({"items": [{"text": "boom"}, {"text": "medieval poetry"}]})
+    finally:
+        del path_builder.aprocess_request
+    assert status == 200
+    errors = [line for line in lines if line["type"] == "error"]
+    assert len(errors) == 1 and errors[0]["indices"] == [0] and "exploded" in errors[0]["error"]
+    assert lines[-1]["errors"] == 1 and lines[-1]["unique"] == 2
+
+
+def test_wall_time_scales_with_concurrency():
+    client = FakeClient(latency=LATENCY)
+    reset(client)
+    items = [{"text": f"obscure topic {i}", "level": "beginner"} for i in range(200)]
+    start = time.perf_counter()
+    status, lines = post_lines({"items": items, "concurrency": 8})
+    elapsed = time.perf_counter() - start
+    ideal = len(items) / 8 * LATENCY
+    print(f"200 items at concurrency 8: {elapsed:.2f}s (ideal {ideal:.2f}s, serial {len(items) * LATENCY:.2f}s)")
+    assert status == 200 and lines[-1]["unique"] == 200 and client.calls == 200
+    assert elapsed < ideal * 3
+
+
+def test_rejects_oversized_batches():
+    status, _ = post_lines({"items": [{"text": "x"}] * 10_000})
+    assert status == 413
+
+
+if __name__ == "__main__":
+    run_checks(globals())
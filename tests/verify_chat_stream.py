@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.main import path_builder
+from fake_gemini import FakeClient, post, run_checks, use_client
+
+ANSWER = "Recursion is when a function calls itself on a smaller input. " * 4
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.split("\n"):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[5:].strip())
+        events.append((event, data))
+    return events
+
+
+def test_stream_forwards_chunks_as_sse():
+    client = FakeClient(text=ANSWER, chunk_size=16)
+    use_client(client)
+    response = post("/chat/stream", {"message": "What is recursion?", "topic": "Algorithms"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    deltas = [data["delta"] for event, data in events if event == "message"]
+    assert len(deltas) == client.chunks_sent > 1
+    assert "".join(deltas) == ANSWER
+    assert events[-1][0] == "done"
+
+
+def test_mock_mode_streams_in_chunks():
+    path_builder.gemini.use_mock = True
+
+    async def collect():
+        return [c async for c in path_builder.gemini.astream_tutor_response("loops?", "Python", "beginner", "Control flow")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks) == path_builder.gemini.mock.get_tutor_response("loops?", "Control flow")
+
+
+def test_closing_stream_cancels_upstream():
+    client = FakeClient(text=ANSWER, chunk_size=8, chunk_delay=0.01)
+    use_client(client)
+
+    async def read_one_then_leave():
+        chunks = path_builder.gemini.astream_tutor_response("What is recursion?", "Algorithms")
+        first = await chunks.__anext__()
+        await chunks.aclose()
+        return first
+
+    assert asyncio.run(read_one_then_leave()) == ANSWER[:8]
+    assert client.streams_closed == 1
+    assert client.chunks_sent == 1
+
+
+def test_quota_error_falls_back_to_mock():
+    use_client(FakeClient(error=Exception("429 RESOURCE_EXHAUSTED")))
+
+    async def collect():
+        return "".join([c async for c in path_builder.gemini.astream_tutor_response("hi", "Python")])
+
+    assert asyncio.run(collect()).startswith("[Mock Mode]")
+
+
+if __name__ == "__main__":
+    run_checks(globals())
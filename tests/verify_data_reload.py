@@ -0,0 +1,198 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import numpy as np
+from backend.main import path_builder, reload_interval
+from backend.modules.path_builder import PathBuilder
+from backend.modules.tfidf_engine import TFIDFEngine
+from fake_gemini import post, run_checks
+
+DATA = ROOT / "backend" / "data"
+
+
+def builder(tmp):
+    # A PathBuilder over temporary copies of the data files.
+    for name in ("domains.json", "knowledge_graph.json"):
+        shutil.copy(DATA / name, Path(tmp) / name)
+    pb = PathBuilder(kg_path=str(Path(tmp) / "knowledge_graph.json"))
+    pb.tfidf_engine = TFIDFEngine(str(Path(tmp) / "domains.json"))
+    pb.warmup()
+    return pb
+
+
+def edit(path, change):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    change(data)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_reload_picks_up_new_domain_and_keyword():
+    with tempfile.TemporaryDirectory() as tmp:
+        pb = builder(tmp)
+        assert pb.tfidf_engine.detect_domain("sourdough baking")[1] == 0.0
+
+        def change(domains):
+            domains["baking"] = ["sourdough", "bread baking", "pastry"]
+            domains["algorithms"].append("dijkstra")
+        edit(Path(tmp) / "domains.json", change)
+        summary = pb.reload()
+
+        assert summary["domains"]["added"] == ["baking"]
+        assert summary["domains"]["changed"] == ["algorithms"]
+        assert sorted(summary["domains"]["retokenized"]) == ["algorithms", "baking"]
+        assert summary["graph"]["recompiled"] == []
+        assert pb.tfidf_engine.detect_domain("sourdough baking")[0] == "baking"
+        assert pb.tfidf_engine.detect_domain("dijkstra")[0] == "algorithms"
+
+
+def test_reload_after_artifact_load_is_incremental():
+    with tempfile.TemporaryDirectory() as tmp:
+        builder(tmp)  # writes the artifact
+        pb = builder(tmp)
+        assert not pb.tfidf_engine.fitted
+        edit(Path(tmp) / "domains.json", lambda domains: domains["algorithms"].append("dijkstra"))
+        summary = pb.reload()
+        assert summary["domains"]["refit"] and summary["domains"]["retokenized"] == ["algorithms"]
+        fresh = TFIDFEngine(str(Path(tmp) / "domains.json"), str(Path(tmp) / "fresh.npz"))
+        texts = ["dijkstra shortest paths", "learn react and node"]
+        assert fresh.detect_domains(texts) == pb.tfidf_engine.detect_domains(texts)
+
+
+def test_concurrent_artifact_saves_do_not_collide():
+    # Workers starting together each write through their own temp file.
+    with tempfile.TemporaryDirectory() as tmp:
+        pb = builder(tmp)
+        engine, digest = pb.tfidf_engine, str(np.load(pb.tfidf_engine.artifact_path)["digest"])
+        with open(Path(tmp) / "domains.tfidf.npz.tmp", "wb") as f:
+            f.write(b"another writer's half-written file")
+        threads = [threading.Thread(target=engine.save_artifact, args=(digest,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(p.name for p in Path(tmp).glob("*.tmp")) == ["domains.tfidf.npz.tmp"]
+        fresh = TFIDFEngine(str(Path(tmp) / "domains.json"))
+        assert fresh.detect_domain("dijkstra graphs") and not fresh.fitted
+
+
+def test_only_changed_graph_domains_are_recompiled():
+    with tempfile.TemporaryDirectory() as tmp:
+        pb = builder(tmp)
+        old = pb.graph
+        ml_tree = old.build_tree("machine_learning")
+        old.build_tree("web_development")
+
+        def change(kg):
+            kg["web_development"]["nodes"].append({"id": "web_security", "level": 5, "type": "core"})
+        edit(Path(tmp) / "knowledge_graph.json", change)
+        summary = pb.reload()
+
+        assert summary["graph"]["recompiled"] == ["web_development"]
+        assert summary["domains"]["retokenized"] == []
+        new = pb.graph
+        assert new is not old
+        assert new.domains["machine_learning"] is old.domains["machine_learning"]
+        assert new.domains["web_development"] is not old.domains["web_development"]
+        # Memoized trees survive for the untouched domain only.
+        assert new.build_tree("machine_learning") is ml_tree
+        assert "web_security" in new.domains["web_development"].ids
+        assert "web_security" not in old.domains["web_development"].ids
+
+
+def test_enriched_trees_of_changed_domains_are_dropped():
+    with tempfile.TemporaryDirectory() as tmp:
+        pb = builder(tmp)
+        ml_key = pb.graph.tree_key("machine_learning")
+        web_key = pb.graph.tree_key("web_development")
+        pb.enriched = {ml_key: {"tree": "ml"}, web_key: {"tree": "web"}}
+        edit(Path(tmp) / "knowledge_graph.json", lambda kg: kg.pop("web_development"))
+        summary = pb.reload()
+        assert summary["graph"]["recompiled"] == ["web_development"]
+        assert list(pb.enriched) == [ml_key]
+        assert "web_development" not in pb.graph
+
+
+def test_bad_file_keeps_the_old_snapshot():
+    with tempfile.TemporaryDirectory() as tmp:
+        pb = builder(tmp)
+        engine, graph = pb.tfidf_engine, pb.graph
+        for name in ("domains.json", "knowledge_graph.json"):
+            path = Path(tmp) / name
+            good = path.read_text(encoding="utf-8")
+            path.write_text(good[: len(good) // 2], encoding="utf-8")
+            try:
+                pb.reload()
+                assert False, "reload should fail"
+            except ValueError:
+                pass
+            assert pb.tfidf_engine is engine and pb.graph is graph
+            assert pb.tfidf_engine.detect_domain("neural networks")[0] == "machine_learning"
+            path.write_text(good, encoding="utf-8")
+
+
+def test_old_engine_still_answers_after_swap():
+    with tempfile.TemporaryDirectory() as tmp:
+        pb = builder(tmp)
+        old = pb.tfidf_engine
+        edit(Path(tmp) / "domains.json", lambda domains: domains.pop("data_science"))
+        pb.reload()
+        # A request that read the old engine before the swap finishes on it.
+        assert old.detect_domain("pandas dataframes")[0] == "data_science"
+        assert pb.tfidf_engine.detect_domain("pandas dataframes")[0] != "data_science"
+
+
+def test_reload_if_changed_only_reloads_on_edits():
+    with tempfile.TemporaryDirectory() as tmp:
+        pb = builder(tmp)
+        assert pb.reload_if_changed() is None  # records the baseline
+        assert pb.reload_if_changed() is None
+        edit(Path(tmp) / "domains.json", lambda domains: domains["algorithms"].append("a star search"))
+        summary = pb.reload_if_changed()
+        assert summary is not None and summary["domains"]["changed"] == ["algorithms"]
+        assert pb.reload_if_changed() is None
+
+
+def test_several_workers_poll_for_edits_by_default():
+    saved = {name: os.environ.pop(name, None) for name in ("WEB_CONCURRENCY", "DATA_RELOAD_INTERVAL")}
+    try:
+        assert reload_interval() == 0
+        os.environ["WEB_CONCURRENCY"] = "2"
+        assert reload_interval() > 0
+        os.environ["DATA_RELOAD_INTERVAL"] = "0"
+        assert reload_interval() == 0
+    finally:
+        for name, value in saved.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+
+def test_endpoint_requires_admin_token():
+    os.environ.pop("ADMIN_TOKEN", None)
+    assert post("/admin/reload", headers={"X-Admin-Token": ""}).status_code == 403
+    os.environ["ADMIN_TOKEN"] = "secret"
+    try:
+        assert post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert post("/admin/reload", headers={}).status_code == 403
+        assert post("/admin/reload", headers={"X-Admin-Token": "sécret".encode("latin-1")}).status_code == 403
+        response = post("/admin/reload", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert response.json()["domains"]["retokenized"] == []
+        assert path_builder.tfidf_engine.detect_domain("neural networks")[0] == "machine_learning"
+    finally:
+        os.environ.pop("ADMIN_TOKEN", None)
+
+
+if __name__ == "__main__":
+    run_checks(globals())
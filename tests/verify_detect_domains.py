@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import numpy as np
+from backend.main import path_builder
+from backend.modules.tfidf_engine import TFIDFEngine
+from fake_gemini import post, run_checks
+
+TEXTS = ["I want to learn react and node", "deep learning with pytorch", "sorting algorithms", "cooking pasta"]
+
+
+def test_batch_matches_single_detection():
+    engine = path_builder.tfidf_engine
+    for text, row in zip(TEXTS, engine.detect_domains(TEXTS, top_k=1)):
+        domain, score = engine.detect_domain(text)
+        assert row[0][0] == domain and abs(row[0][1] - score) < 1e-9
+
+
+def test_top_k_sorted_and_bounded():
+    rows = path_builder.tfidf_engine.detect_domains(TEXTS, top_k=10)
+    for row in rows:
+        assert len(row) == len(path_builder.tfidf_engine.domain_names)
+        scores = [score for _, score in row]
+        assert scores == sorted(scores, reverse=True)
+    assert path_builder.tfidf_engine.detect_domains([], top_k=3) == []
+
+
+def test_endpoint():
+    results = post("/detect_domains", {"texts": TEXTS, "top_k": 2}).json()["results"]
+    assert len(results) == len(TEXTS) and all(len(r) == 2 for r in results)
+    assert results[1][0]["domain"] == "machine_learning"
+
+
+def test_fit_matches_scikit_learn():
+    try:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+    except ImportError:
+        return
+    data = ROOT / "backend" / "data" / "domains.json"
+    engine = TFIDFEngine(str(data))
+    engine._domains = json.loads(data.read_text(encoding="utf-8"))
+    engine.train_vectorizer()
+    texts = ["learn react and node", "neural networks with python", "graph algorithms"]
+    vectorizer = TfidfVectorizer()
+    domain_matrix = vectorizer.fit_transform([" ".join(k) for k in engine._domains.values()])
+    assert vectorizer.vocabulary_ == engine._vocabulary
+    expected = (vectorizer.transform(texts) @ domain_matrix.T).toarray()
+    actual = (engine.transform(texts) @ engine.domain_matrix_t).toarray()
+    assert np.abs(expected - actual).max() < 1e-12
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,85 @@
+import copy
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.main import path_builder
+from backend.modules.expansion import find_path, splice
+from backend.modules.tree_cache import TreeCache
+from fake_gemini import FakeClient, LIVE_TREE, post, run_checks, use_client
+
+CHILDREN = {"children": [
+    {"title": "List comprehensions", "explanation": "Compact loops.", "task": "Rewrite a loop", "quiz": "Syntax?"},
+    {"title": "Generators", "role": "leaf", "explanation": "Lazy sequences.", "task": "Write one", "quiz": "yield?"},
+]}
+
+
+def reset(client):
+    use_client(client)
+    # /expand resolves tree IDs and caches subtrees in the path builder.
+    path_builder.trees = TreeCache(max_size=8, ttl=60)
+    path_builder.subtrees = TreeCache(max_size=8, ttl=60)
+
+
+def test_splice_copies_only_the_path():
+    original = copy.deepcopy(LIVE_TREE)
+    spliced = splice(LIVE_TREE, [1, 0], CHILDREN["children"])
+    assert LIVE_TREE == original
+    assert spliced["tree"]["children"][1]["children"][0]["children"] == CHILDREN["children"]
+    assert spliced["tree"]["children"][1]["children"][0]["role"] == "parent"
+    assert spliced["tree"]["children"][0] is LIVE_TREE["tree"]["children"][0]
+    assert find_path(LIVE_TREE["tree"], "control flow") == [1, 1]
+
+
+def test_expand_by_tree_id_generates_only_children():
+    client = FakeClient()
+    reset(client)
+    served = post("/process", {"topic": "medieval poetry", "level": "beginner"}).json()
+    assert served["tree_id"] and client.calls == 1
+
+    client.text = json.dumps(CHILDREN)
+    body = {"topic": "medieval poetry", "tree_id": served["tree_id"], "selected_node": "Control flow"}
+    expanded = post("/expand", body).json()
+    assert expanded["path"] == [1, 1] and expanded["parent_tree_id"] == served["tree_id"]
+    assert [c["title"] for c in expanded["children"]] == ["List comprehensions", "Generators"]
+    assert expanded["tree"]["children"][1]["children"][1]["children"] == expanded["children"]
+    assert client.calls == 2
+
+    # The expansion prompt and output budget are a fraction of a full tree's.
+    gemini = path_builder.gemini
+    full = len(gemini._build_tree_prompt("medieval poetry", "beginner"))
+    small = len(gemini._build_expand_prompt("medieval poetry", "beginner", ["Python", "Intermediate", "Control flow"]))
+    assert small < full and gemini.EXPAND_OUTPUT_TOKENS * 4 <= gemini.TREE_OUTPUT_TOKENS
+
+
+def test_subtree_reused_across_users_with_same_tree():
+    client = FakeClient(text=json.dumps(CHILDREN))
+    reset(client)
+    first = post("/expand", {"topic": "Python", "tree": LIVE_TREE, "path": [0, 2]}).json()
+    second = post("/expand", {"topic": "Python", "tree": copy.deepcopy(LIVE_TREE), "path": [0, 2]}).json()
+    assert first["parent_tree_id"] == second["parent_tree_id"]
+    assert first["tree_id"] == second["tree_id"]
+    assert client.calls == 1
+    # Another level gets children written for it.
+    post("/expand", {"topic": "Python", "level": "advanced", "tree": LIVE_TREE, "path": [0, 2]})
+    assert client.calls == 2
+
+
+def test_errors_and_offline_mock():
+    reset(FakeClient())
+    assert "error" in post("/expand", {"topic": "Python", "tree_id": "missing", "path": [0]}).json()
+    assert post("/expand", {"topic": "Python", "tree": LIVE_TREE}).status_code == 422
+    assert "error" in post("/expand", {"topic": "Python", "tree": LIVE_TREE, "path": [9]}).json()
+    path_builder.gemini.use_mock = True
+    mocked = post("/expand", {"topic": "Python", "tree": LIVE_TREE, "selected_node": "Functions"}).json()
+    assert len(mocked["children"]) == 3
+    assert len(path_builder.subtrees) == 0
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.modules.graph_engine import CompiledDomain, KnowledgeGraphEngine, node_title
+from backend.modules.path_builder import PathBuilder
+from backend.modules.tree_cache import TreeCache
+from fake_gemini import FakeClient, run_checks
+
+with open("backend/data/knowledge_graph.json", encoding="utf-8") as f:
+    GRAPH = json.load(f)
+
+
+def test_order_respects_every_edge():
+    for name, graph in GRAPH.items():
+        compiled = CompiledDomain(name, graph)
+        for edge in graph["edges"]:
+            assert compiled.index[edge["from"]] < compiled.index[edge["to"]]
+
+
+def test_closure_contains_transitive_prerequisites():
+    engine = KnowledgeGraphEngine(GRAPH)
+    assert engine.path("machine_learning", "deep_learning") == [
+        "python_basics", "linear_algebra", "statistics", "data_preprocessing",
+        "supervised_learning", "neural_networks", "deep_learning",
+    ]
+    assert engine.path("web_development", "deployment", "advanced") == ["backend_basics", "databases", "deployment"]
+
+
+def test_cycles_are_rejected():
+    graph = {"nodes": [{"id": "a"}, {"id": "b"}], "edges": [{"from": "a", "to": "b"}, {"from": "b", "to": "a"}]}
+    try:
+        CompiledDomain("loop", graph)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_titles_and_leaves_read_naturally():
+    assert node_title("web_development") == "Web Development"
+    assert node_title("rest_api_design") == "Rest API Design"
+    assert node_title("nlp_with_ml") == "NLP With ML"
+    tree = KnowledgeGraphEngine(GRAPH).build_tree("web_development")
+    assert tree["tree"]["title"] == "Web Development"
+    leaves = [leaf for stage in tree["tree"]["children"] for leaf in stage["children"]]
+    assert [leaf["title"] for leaf in leaves[:3]] == ["HTML & CSS", "JavaScript Basics", "DOM Manipulation"]
+    tasks = [leaf["task"] for leaf in leaves]
+    assert len(set(tasks)) == len(tasks) and not any("hands-on exercise" in task for task in tasks)
+
+
+def test_tree_has_frontend_shape_and_is_fast():
+    engine = KnowledgeGraphEngine(GRAPH)
+    result = engine.build_tree("web_development", "learn backend basics", "beginner")
+    root = result["tree"]
+    assert root["role"] == "root" and root["title"] == "Backend Basics"
+    for module in root["children"]:
+        assert module["role"] == "parent" and module["children"]
+        for leaf in module["children"]:
+            assert {"title", "role", "explanation", "task", "quiz"} <= set(leaf)
+    assert result["chatbot"]["actions"]
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        engine.build_tree("web_development", "learn backend basics", "beginner")
+    per_call = (time.perf_counter() - start) / 10000
+    print(f"  memoized tree in {per_call * 1e6:.1f}us")
+    assert per_call < 50e-6
+
+
+def test_quota_fallback_prefers_graph_over_mock():
+    builder = PathBuilder()
+    builder.gemini.api_key = "offline"
+    builder.gemini.client = FakeClient(error=Exception("429 RESOURCE_EXHAUSTED"))
+    builder.gemini.use_mock = False
+    builder.gemini.cache = TreeCache(max_size=0)
+
+    known = builder.gemini.process_request("deep learning with neural networks", "beginner")
+    assert known["tree"]["title"] == "Neural Networks"
+    unknown = builder.gemini.process_request("medieval poetry", "beginner")
+    assert unknown["chatbot"]["message"].startswith("[Mock Mode]")
+
+
+if __name__ == "__main__":
+    run_checks(globals())
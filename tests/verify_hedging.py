@@ -0,0 +1,152 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.modules.admission import AdmissionController, RequestClass
+from backend.modules.hedging import Hedger, LatencyTracker
+from backend.modules.model_router import ModelRouter
+from fake_gemini import FakeClient, LIVE_TREE, make_connector, run_checks
+
+
+def warmed_hedger(latency=0.01, kind="default", **kwargs):
+    hedger = Hedger(min_samples=5, **kwargs)
+    for _ in range(5):
+        hedger.tracker(kind).add(latency)
+    return hedger
+
+
+def test_tracker_reports_running_quantile():
+    tracker = LatencyTracker(quantile=0.9, window=100, min_samples=10)
+    assert tracker.value() is None
+    for ms in range(1, 101):
+        tracker.add(ms / 1000)
+    assert abs(tracker.value() - 0.091) < 1e-9
+    # Only the most recent window counts.
+    for _ in range(100):
+        tracker.add(0.5)
+    assert tracker.value() >= 0.091 and tracker.value() <= 0.5
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    hedger = warmed_hedger(budget=1.0, min_delay=0.0)
+    cancelled = []
+
+    async def call(hedge):
+        try:
+            await asyncio.sleep(0.01 if hedge else 2.0)
+            return "hedge" if hedge else "primary"
+        except asyncio.CancelledError:
+            cancelled.append(hedge)
+            raise
+
+    start = time.perf_counter()
+    result = asyncio.run(hedger.run(call))
+    assert result == "hedge"
+    assert time.perf_counter() - start < 0.5
+    assert cancelled == [False]
+    assert hedger.hedges == 1 and hedger.hedge_wins == 1
+
+
+def test_fast_calls_are_not_hedged():
+    hedger = warmed_hedger(latency=0.05, budget=1.0, min_delay=0.0)
+
+    async def call(hedge):
+        await asyncio.sleep(0.001)
+        return hedge
+
+    assert asyncio.run(hedger.run(call)) is False
+    assert hedger.hedges == 0
+
+
+def test_budget_caps_extra_calls():
+    hedger = warmed_hedger(budget=0.1, min_delay=0.0)
+
+    async def call(hedge):
+        await asyncio.sleep(0.001 if hedge else 0.03)
+        return hedge
+
+    async def many():
+        return await asyncio.gather(*(hedger.run(call) for _ in range(50)))
+
+    asyncio.run(many())
+    assert 1 <= hedger.hedges <= 5
+    assert hedger.over_budget == 50 - hedger.hedges
+
+
+def test_failed_hedge_falls_back_to_primary():
+    hedger = warmed_hedger(budget=1.0, min_delay=0.0)
+
+    async def call(hedge):
+        if hedge:
+            raise RuntimeError("hedge failed")
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    assert asyncio.run(hedger.run(call)) == "primary"
+
+
+def test_latency_is_tracked_per_call_kind():
+    hedger = warmed_hedger(kind="chat", budget=1.0, min_delay=0.0)
+
+    async def call(hedge):
+        await asyncio.sleep(0.05)
+        return hedge
+
+    # Chat answers are fast, but that says nothing about how long a tree takes.
+    assert asyncio.run(hedger.run(call, kind="tree")) is False
+    assert hedger.hedges == 0
+    assert asyncio.run(hedger.run(call, kind="chat")) is False
+    assert hedger.hedges == 1
+    assert set(hedger.stats()["threshold_ms"]) == {"chat", "tree"}
+
+
+def test_hedge_is_skipped_without_a_free_slot():
+    hedger = warmed_hedger(budget=1.0, min_delay=0.0)
+    released = []
+
+    async def call(hedge):
+        await asyncio.sleep(0.01 if hedge else 0.05)
+        return hedge
+
+    assert asyncio.run(hedger.run(call, try_slot=lambda: None)) is False
+    assert hedger.hedges == 0 and hedger.no_slot == 1
+    assert asyncio.run(hedger.run(call, try_slot=lambda: lambda: released.append(1))) is True
+    assert hedger.hedges == 1 and released == [1]
+
+
+def test_connector_hedge_needs_its_own_admission_slot():
+    client = FakeClient(latency=0.1)
+    admission = AdmissionController(1, [RequestClass("chat", 8, 5.0), RequestClass("generate", 8, 5.0)])
+    connector = make_connector(
+        client, admission=admission, hedger=warmed_hedger(kind="tree", budget=1.0, min_delay=0.0),
+    )
+    connector.warmup()
+
+    assert asyncio.run(connector.agenerate_tree("medieval poetry", "beginner")) == LIVE_TREE
+    assert client.calls == 1
+    assert connector.hedger.no_slot == 1
+    assert admission.active == 0
+
+
+def test_connector_hedges_on_another_model():
+    latencies = iter([1.0] + [0.01] * 10)
+    client = FakeClient(latency=lambda: next(latencies))
+    router = ModelRouter([("primary-model", 1000, 10 ** 9), ("backup-model", 10, 10 ** 9)])
+    connector = make_connector(client, router=router, hedger=warmed_hedger(kind="tree", budget=1.0, min_delay=0.0))
+    connector.warmup()
+
+    start = time.perf_counter()
+    result = asyncio.run(connector.agenerate_tree("medieval poetry", "beginner"))
+    assert result == LIVE_TREE
+    assert time.perf_counter() - start < 0.5
+    # The primary (on primary-model) was cancelled before it answered.
+    assert client.calls_by_model == {"backup-model": 1}
+    assert connector.hedger.hedge_wins == 1
+    assert connector.admission.active == 0
+
+
+if __name__ == "__main__":
+    run_checks(globals())
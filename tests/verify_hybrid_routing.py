@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.modules.path_builder import PathBuilder
+from backend.modules.tree_cache import TreeCache
+from fake_gemini import FakeClient, run_checks
+
+
+def make_builder(client, threshold=None, enrich=False):
+    builder = PathBuilder()
+    builder.gemini.api_key = "offline"
+    builder.gemini.client = client
+    builder.gemini.use_mock = False
+    builder.gemini.cache = TreeCache(max_size=0)
+    if threshold is not None:
+        builder.graph_threshold = threshold
+    builder.graph_enrich = enrich
+    return builder
+
+
+def test_confident_domain_skips_llm():
+    client = FakeClient(latency=0.05)
+    builder = make_builder(client)
+    result = asyncio.run(builder.aprocess_request("deep learning and neural networks", "beginner"))
+    assert result["tree"]["title"] == "Neural Networks"
+    assert client.calls == 0
+    assert builder.route_counts == {"graph": 1, "graph_enriched": 0, "llm": 0}
+
+
+def test_low_confidence_goes_to_llm_and_is_bucketed():
+    client = FakeClient()
+    builder = make_builder(client)
+    asyncio.run(builder.aprocess_request("medieval poetry", "beginner"))
+    assert client.calls == 1
+    stats = builder.route_stats()
+    assert stats["routes"]["llm"] == 1 and stats["confidence"]["llm"]["<=0.1"] == 1
+
+
+def test_topics_the_graph_does_not_cover_go_to_llm():
+    client = FakeClient()
+    builder = make_builder(client)
+    topics = [
+        "reinforcement learning",
+        "machine learning for finance",
+        "deep learning for NLP",
+        "machine learning model deployment",
+        "backend api with node and express",
+    ]
+    for topic in topics:
+        asyncio.run(builder.aprocess_request(topic, "beginner"))
+    assert client.calls == len(topics)
+    assert builder.route_counts["graph"] == 0
+
+
+def test_domain_name_and_node_names_use_graph():
+    client = FakeClient()
+    builder = make_builder(client)
+    whole = builder.process_request("Machine Learning", "beginner")
+    assert whole["tree"]["title"] == "Machine Learning"
+    assert builder.process_request("learn python", "beginner")["tree"]["title"] == "Python Basics"
+    assert client.calls == 0
+    # A bare domain name still needs a confident domain match.
+    builder.graph_threshold = 0.9
+    builder.process_request("Machine Learning", "beginner")
+    assert client.calls == 1
+
+
+def test_graph_route_latency_is_milliseconds():
+    builder = make_builder(FakeClient(latency=1.0))
+    samples = []
+    for _ in range(200):
+        start = time.perf_counter()
+        builder.process_request("javascript basics and dom manipulation", "beginner")
+        samples.append(time.perf_counter() - start)
+    p50 = statistics.median(samples)
+    print(f"  graph route p50 {p50 * 1e3:.2f}ms")
+    assert p50 < 0.01
+
+
+def test_background_enrichment_fills_cache():
+    client = FakeClient(text=json.dumps(["PyTorch Lightning", "Transformers"]))
+    builder = make_builder(client, enrich=True)
+
+    async def scenario():
+        first = await builder.aprocess_request("deep learning and neural networks", "beginner")
+        await asyncio.gather(*builder._background)
+        second = await builder.aprocess_request("neural networks deep learning", "beginner")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(second["tree"]["children"]) == len(first["tree"]["children"]) + 1
+    assert second["tree"]["children"][-1]["children"][0]["title"] == "PyTorch Lightning"
+    assert builder.route_counts["graph_enriched"] == 1
+    assert client.calls == 1
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,66 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.modules import metrics
+from fake_gemini import FakeClient, request, run_checks, use_client
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    metrics.REGISTRY.remove(histogram)
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "x")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="x",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="x",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="x",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{stage="x"} 4' in lines
+
+
+def test_server_timing_lists_request_stages():
+    use_client(FakeClient())
+    response = request("POST", "/process", {"topic": "medieval poetry", "level": "beginner"})
+    assert response.status_code == 200
+    header = response.headers["server-timing"]
+    for stage in ("route", "cache", "prompt", "llm", "parse", "total"):
+        assert f"{stage};dur=" in header, header
+
+    cached = request("POST", "/process", {"topic": "medieval poetry", "level": "beginner"})
+    assert "llm;dur=" not in cached.headers["server-timing"]
+
+
+def test_metrics_endpoint_exposes_counters():
+    use_client(FakeClient())
+    hits = metrics.CACHE_LOOKUPS.value("memory", "hit")
+    calls = metrics.LLM_CALLS.value("fake-model", "ok")
+    request("POST", "/process", {"topic": "baroque architecture", "level": "beginner"})
+    request("POST", "/process", {"topic": "baroque architecture", "level": "beginner"})
+    assert metrics.CACHE_LOOKUPS.value("memory", "hit") == hits + 1
+    assert metrics.LLM_CALLS.value("fake-model", "ok") == calls + 1
+
+    body = request("GET", "/metrics").text
+    assert 'learnpath_http_requests_total{method="POST",route="/process",status="200"}' in body
+    assert 'learnpath_stage_duration_seconds_bucket{stage="llm",le="+Inf"}' in body
+    assert 'learnpath_routes_total{route="llm"}' in body
+
+
+def test_quota_fallbacks_are_counted():
+    use_client(FakeClient(quota={}))
+    before = metrics.FALLBACKS.value("mock") + metrics.FALLBACKS.value("graph")
+    request("POST", "/process", {"topic": "gothic cathedrals", "level": "beginner"})
+    assert metrics.FALLBACKS.value("mock") + metrics.FALLBACKS.value("graph") == before + 1
+    assert metrics.LLM_CALLS.value("fake-model", "quota") >= 1
+
+
+def test_unknown_routes_share_one_label():
+    request("GET", "/no/such/page/123")
+    assert metrics.HTTP_REQUESTS.value("GET", "unmatched", 404) >= 1
+
+
+if __name__ == "__main__":
+    run_checks(globals())
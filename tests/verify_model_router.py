@@ -0,0 +1,99 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.modules.model_router import ModelRouter, QuotaExhausted, parse_models
+from backend.modules.tree_cache import TreeCache
+from fake_gemini import FakeClient, FakeClock, make_connector, run_checks
+
+MODELS = [("primary", 2, 100000), ("secondary", 4, 100000), ("tertiary", 4, 100000)]
+
+
+def routed_connector(client):
+    router = ModelRouter(MODELS, cooldown=30, clock=FakeClock())
+    return make_connector(client, cache=TreeCache(max_size=0), router=router)
+
+
+def test_parse_models():
+    assert parse_models("a:1:100, b") == [("a", 1, 100), ("b", 10, 250000)]
+
+
+def test_buckets_spread_load_and_refill():
+    clock = FakeClock()
+    router = ModelRouter([("a", 2, 1000), ("b", 1, 1000)], clock=clock)
+    picked = [router.acquire(10) for _ in range(3)]
+    assert sorted(picked) == ["a", "a", "b"]
+    try:
+        router.acquire(10)
+        assert False, "expected QuotaExhausted"
+    except QuotaExhausted:
+        pass
+    clock.now = 60
+    assert router.acquire(10) in ("a", "b")
+
+
+def test_workers_split_the_quota():
+    router = ModelRouter([("a", 10, 1000), ("b", 1, 1000)], clock=FakeClock(), workers=4)
+    stats = router.stats()
+    assert stats["a"]["requests_left"] == 2.5 and stats["a"]["tokens_left"] == 250
+    # Every worker can still make at least one call per minute.
+    assert stats["b"]["requests_left"] == 1.0
+
+
+def test_token_budget_is_respected():
+    router = ModelRouter([("small", 100, 500), ("large", 100, 10000)], clock=FakeClock())
+    assert router.acquire(800) == "large"
+
+
+def test_cooldown_doubles_and_resets():
+    clock = FakeClock()
+    router = ModelRouter([("a", 100, 100000)], cooldown=10, clock=clock)
+    router.record_quota_error("a")
+    assert router.stats()["a"]["cooldown_remaining"] == 10
+    clock.now = 10
+    router.record_quota_error("a")
+    assert router.stats()["a"]["cooldown_remaining"] == 20
+    clock.now = 30
+    router.record_success(router.acquire(1), 1)
+    assert router.stats()["a"]["consecutive_429"] == 0
+
+
+def test_fails_over_when_primary_is_rate_limited():
+    client = FakeClient(quota={"primary": 0, "secondary": 10, "tertiary": 10})
+    connector = routed_connector(client)
+    for topic in ("Python", "Rust", "Go", "Java"):
+        result = connector.process_request(topic, "beginner")
+        assert "[Mock Mode]" not in result["chatbot"]["message"]
+    # The 429 put primary on cooldown, so later calls skip it entirely.
+    assert client.calls_by_model["primary"] == 1
+    assert client.calls_by_model["secondary"] + client.calls_by_model["tertiary"] == 4
+
+
+def test_mock_only_when_every_model_is_exhausted():
+    client = FakeClient(quota={"primary": 2, "secondary": 1, "tertiary": 1})
+    connector = routed_connector(client)
+
+    async def burst():
+        return await asyncio.gather(*(connector.aprocess_request(f"topic {i}", "beginner") for i in range(6)))
+
+    results = asyncio.run(burst())
+    live = [r for r in results if "[Mock Mode]" not in r["chatbot"]["message"]]
+    assert len(live) == 4
+    assert set(client.calls_by_model) == {"primary", "secondary", "tertiary"}
+
+
+def test_stream_fails_over_before_first_chunk():
+    client = FakeClient(text="streamed answer", quota={"primary": 0, "secondary": 5}, chunk_size=4)
+    connector = routed_connector(client)
+
+    async def collect():
+        return "".join([c async for c in connector.astream_tutor_response("hi", "Python")])
+
+    assert asyncio.run(collect()) == "streamed answer"
+    assert client.calls_by_model == {"primary": 1, "secondary": 1}
+
+
+if __name__ == "__main__":
+    run_checks(globals())
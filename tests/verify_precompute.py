@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "utils"))
+
+from backend.modules.gemini_connector import GeminiConnector
+from backend.modules.tree_cache import normalize_key
+from backend.modules.tree_store import SQLiteTreeStore
+from fake_gemini import FakeClient, LIVE_TREE, make_connector, run_checks
+import precompute_trees
+
+DOMAINS = str(ROOT / "backend/data/domains.json")
+
+
+def mock_connector(store):
+    connector = GeminiConnector()
+    connector.use_mock = True
+    connector.store = store
+    return connector
+
+
+def test_jobs_cover_every_keyword_and_level_once():
+    jobs = precompute_trees.load_jobs(DOMAINS)
+    with open(DOMAINS, "r", encoding="utf-8") as f:
+        keywords = {k.lower() for words in json.load(f).values() for k in words}
+    assert len(jobs) == 3 * len(keywords)
+    assert jobs[normalize_key("pandas", "advanced")] == ("pandas", "advanced")
+
+
+def test_offline_run_fills_store_and_static_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteTreeStore(os.path.join(tmp, "trees.sqlite3"))
+        static_dir = os.path.join(tmp, "static")
+        jobs = precompute_trees.load_jobs(DOMAINS)
+        summary = asyncio.run(precompute_trees.precompute(
+            mock_connector(store), jobs, checkpoint=os.path.join(tmp, "ckpt.jsonl"), static_dir=static_dir,
+        ))
+        assert summary["generated"] == len(jobs) and summary["failed"] == 0
+        assert len(store) == len(jobs)
+
+        with open(os.path.join(static_dir, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        assert len(index) == len(jobs)
+        with open(os.path.join(static_dir, index["beginner|big o"]), "r", encoding="utf-8") as f:
+            assert f.read().count('"title"') > 5
+
+        # A serving connector with an empty memory cache reads the store.
+        client = FakeClient()
+        serving = make_connector(client, store=store)
+        result = asyncio.run(serving.aprocess_request("Big O", "beginner"))
+        assert result["tree"]["title"] == "Big O"
+        assert client.calls == 0
+
+
+def test_resumes_from_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteTreeStore(os.path.join(tmp, "trees.sqlite3"))
+        checkpoint = os.path.join(tmp, "ckpt.jsonl")
+        jobs = precompute_trees.load_jobs(DOMAINS)
+        first = asyncio.run(precompute_trees.precompute(mock_connector(store), jobs, checkpoint=checkpoint, limit=10))
+        assert first["generated"] == 10
+        second = asyncio.run(precompute_trees.precompute(mock_connector(store), jobs, checkpoint=checkpoint))
+        assert second["skipped"] == 10
+        assert second["generated"] == len(jobs) - 10
+        third = asyncio.run(precompute_trees.precompute(mock_connector(store), jobs, checkpoint=checkpoint))
+        assert third["generated"] == 0 and third["skipped"] == len(jobs)
+
+
+def test_waits_out_rate_limits_instead_of_storing_fallbacks():
+    with tempfile.TemporaryDirectory() as tmp:
+        connector = GeminiConnector()
+        connector.api_key = "offline"
+        # Every model answers 429 until the quota "resets" 50ms in.
+        connector.client = FakeClient(quota={})
+        connector.use_mock = False
+        connector.router.cooldown = 0.01
+        connector.store = SQLiteTreeStore(os.path.join(tmp, "trees.sqlite3"))
+        # Import the SDK now so it does not eat into the 50ms window.
+        connector.warmup()
+
+        def recover():
+            connector.client.quota = None
+
+        jobs = dict(list(precompute_trees.load_jobs(DOMAINS).items())[:2])
+        loop = asyncio.new_event_loop()
+        loop.call_later(0.05, recover)
+        summary = loop.run_until_complete(precompute_trees.precompute(connector, jobs, backoff=0.02, retries=8))
+        loop.close()
+        assert summary["generated"] == 2 and summary["failed"] == 0
+        assert summary["retries"] > 0
+        assert connector.store.get("tree|" + next(iter(jobs))) == LIVE_TREE
+
+
+def test_cli_runs_offline():
+    with tempfile.TemporaryDirectory() as tmp:
+        code = precompute_trees.main([
+            "--mock", "--store", os.path.join(tmp, "trees.sqlite3"),
+            "--checkpoint", os.path.join(tmp, "ckpt.jsonl"), "--levels", "beginner", "--limit", "5",
+        ])
+        assert code == 0
+        assert len(SQLiteTreeStore(os.path.join(tmp, "trees.sqlite3"))) == 5
+
+
+def test_mock_run_leaves_serving_store_untouched():
+    with tempfile.TemporaryDirectory() as tmp:
+        serving = os.path.join(tmp, "serving.sqlite3")
+        seed = SQLiteTreeStore(serving)
+        seed.set("tree|beginner|python", LIVE_TREE)
+        seed.close()  # no background write may land after the snapshot below
+        before = os.path.getmtime(serving), os.path.getsize(serving)
+        cwd, env = os.getcwd(), os.environ.get("TREE_STORE_PATH")
+        os.chdir(tmp)  # the default checkpoint is relative
+        os.environ["TREE_STORE_PATH"] = serving
+        try:
+            for argv in (
+                ["--mock"],
+                ["--mock", "--checkpoint", "ckpt.jsonl"],
+                ["--mock", "--store", serving, "--checkpoint", "ckpt.jsonl"],
+                ["--mock", "--store", "other.sqlite3", "--checkpoint", ".cache/precompute_checkpoint.jsonl"],
+                ["--mock", "--store", "other.sqlite3", "--checkpoint", "ckpt.jsonl",
+                 "--static-dir", str(ROOT / "frontend" / "precomputed")],
+            ):
+                try:
+                    precompute_trees.main(argv + ["--limit", "2"])
+                    assert False, f"{argv} should be refused"
+                except SystemExit as e:
+                    assert e.code == 2
+        finally:
+            os.chdir(cwd)
+            if env is None:
+                os.environ.pop("TREE_STORE_PATH", None)
+            else:
+                os.environ["TREE_STORE_PATH"] = env
+        assert (os.path.getmtime(serving), os.path.getsize(serving)) == before
+        assert len(SQLiteTreeStore(serving)) == 1
+        assert not os.path.exists(os.path.join(tmp, "ckpt.jsonl"))
+        assert not os.path.exists(os.path.join(tmp, ".cache"))
+        assert not os.path.exists(ROOT / "frontend" / "precomputed")
+
+
+def test_store_errors_leave_key_out_of_checkpoint():
+    class LockedStore(SQLiteTreeStore):
+        def set(self, key, value, ttl=None):
+            if key.endswith("|python"):
+                raise sqlite3.OperationalError("database is locked")
+            return super().set(key, value, ttl=ttl)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LockedStore(os.path.join(tmp, "trees.sqlite3"))
+        checkpoint = os.path.join(tmp, "ckpt.jsonl")
+        jobs = {normalize_key(t, "beginner"): (t, "beginner") for t in ("python", "sql", "css")}
+        summary = asyncio.run(precompute_trees.precompute(mock_connector(store), jobs, checkpoint=checkpoint))
+        assert summary["generated"] == 2 and summary["failed"] == 1
+        assert precompute_trees.load_checkpoint(checkpoint) == {"beginner|sql", "beginner|css"}
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,74 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.modules.semantic_cache import SemanticCache, semantic_topic
+from fake_gemini import FakeClient, make_connector, run_checks
+
+
+def test_semantic_topic_drops_filler():
+    assert semantic_topic("learn react") == "react"
+    assert semantic_topic("React.js for beginners") == "react"
+    assert semantic_topic("ReactJS basics") == "react"
+    assert semantic_topic("Machine Learning") == "machine learning"
+
+
+def test_near_duplicates_hit_and_distinct_topics_miss():
+    cache = SemanticCache(threshold=0.85)
+    tree = {"tree": {"title": "React"}}
+    cache.add("learn react", "beginner", tree)
+    assert cache.get("React.js for beginners", "beginner") is tree
+    assert cache.get("ReactJS basics", "beginner") is tree
+    assert cache.get("ReactJS basics", "advanced") is None
+    assert cache.get("Redux", "beginner") is None
+    cache.add("python 3", "beginner", {"tree": {}})
+    assert cache.get("python 2", "beginner") is None
+
+
+def test_bounded_and_fast_with_thousands_of_entries():
+    cache = SemanticCache(max_entries=3000)
+    for i in range(4000):
+        cache.add(f"subject{i} area{i * 7}", "beginner", i)
+    assert len(cache) == 3000 and cache.evictions == 1000
+    assert cache.get("subject3999 area27993", "beginner") == 3999
+    assert cache.get("subject10 area70", "beginner") is None
+    start = time.perf_counter()
+    for i in range(1000, 2000):
+        cache.get(f"subject{i} area{i * 7}", "beginner")
+    per_lookup = (time.perf_counter() - start) / 1000
+    print(f"  lookup with 3000 entries: {per_lookup * 1e6:.0f}us")
+    assert per_lookup < 0.001
+
+
+def test_adds_between_lookups_do_not_rebuild():
+    cache = SemanticCache(max_entries=2000)
+    for i in range(2000):
+        cache.add(f"subject{i} area{i * 7}", "beginner", i)
+    merges = cache.stats()["merges"]
+    start = time.perf_counter()
+    for i in range(500):
+        cache.add(f"fresh{i} field{i * 3}", "beginner", -i)
+        assert cache.get(f"fresh{i} field{i * 3}", "beginner") == -i
+    per_round = (time.perf_counter() - start) / 500
+    print(f"  add + lookup with 2000 entries: {per_round * 1e6:.0f}us")
+    assert per_round < 0.002
+    assert cache.stats()["merges"] - merges < 10
+    # Replaced and evicted entries are never served, merged or not.
+    cache.add("fresh3 field9", "beginner", "new")
+    assert cache.get("fresh3 field9", "beginner") == "new"
+    assert cache.get("subject100 area700", "beginner") is None
+    assert len(cache) == 2000
+
+
+def test_connector_reuses_tree_for_similar_topic():
+    client = FakeClient()
+    connector = make_connector(client)
+    first = connector.process_request("learn react", "beginner")
+    assert connector.process_request("ReactJS basics", "beginner") is first
+    assert client.calls == 1
+
+
+if __name__ == "__main__":
+    run_checks(globals())
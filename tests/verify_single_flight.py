@@ -0,0 +1,67 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.modules.single_flight import SingleFlight
+from fake_gemini import FakeClient, make_connector, run_checks
+
+
+def test_hundred_identical_requests_share_one_call():
+    client = FakeClient(latency=0.05)
+    connector = make_connector(client)
+
+    async def burst():
+        topics = ["Python", " python ", "PYTHON!", "python."] * 25
+        return await asyncio.gather(*(connector.aprocess_request(t, "beginner") for t in topics))
+
+    results = asyncio.run(burst())
+    assert len(results) == 100
+    assert client.calls == 1
+    assert all(r is results[0] for r in results)
+    assert connector.flight.stats() == {"in_flight": 0, "started": 1, "shared": 99}
+
+
+def test_failure_reaches_all_waiters_then_clears():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def succeeding():
+        calls.append(1)
+        return "ok"
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("k", failing) for _ in range(10)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert len(calls) == 1 and len(flight) == 0
+        assert await flight.do("k", succeeding) == "ok"
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "done"
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "utils"))
+os.chdir(ROOT)
+
+import httpx
+from backend.main import app
+from backend.modules.recorder import RecordingMiddleware, TrafficRecorder
+from backend.modules.tree_cache import TreeCache
+from fake_gemini import FakeClient, run_checks, use_client
+import replay_traffic
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_records_requests_with_outcomes():
+    use_client(FakeClient(), cache=TreeCache(max_size=64, ttl=60))
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = TrafficRecorder(os.path.join(tmp, "traffic.jsonl"), flush_interval=60)
+        recorded_app = RecordingMiddleware(app, recorder)
+
+        async def send():
+            transport = httpx.ASGITransport(app=recorded_app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                await http.post("/process", json={"topic": "medieval poetry", "level": "beginner"})
+                await http.post("/process", json={"topic": "medieval poetry", "level": "beginner"})
+                await http.get("/health")
+
+        asyncio.run(send())
+        # Nothing is written on the request path; the writer flushes later.
+        assert not os.path.exists(recorder.path)
+        recorder.close()
+
+        first, second = read_lines(recorder.path)
+        assert first["path"] == "/process" and first["status"] == 200
+        assert first["body"] == {"topic": "medieval poetry", "level": "beginner"}
+        assert first["route"] == "llm" and first["cache"] == "miss"
+        assert second["cache"] == "memory"
+        assert first["ts"] <= second["ts"] and first["latency_ms"] >= 0
+
+
+def test_rotates_by_size():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traffic.jsonl")
+        recorder = TrafficRecorder(path, max_bytes=2000, backups=2, flush_interval=60)
+        for batch in range(6):
+            for i in range(10):
+                recorder.record({"ts": batch * 10 + i, "path": "/process", "body": {"topic": "x" * 20}})
+            recorder.flush()
+        recorder.close()
+        assert recorder.rotations >= 2
+        assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+        assert not os.path.exists(path + ".3")
+        # Newest records live in the main file.
+        assert read_lines(path)[-1]["ts"] == 59
+
+
+def test_recording_drops_instead_of_blocking():
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = TrafficRecorder(os.path.join(tmp, "traffic.jsonl"), max_queue=5, flush_interval=60)
+        start = time.perf_counter()
+        for i in range(10000):
+            recorder.record({"ts": i})
+        per_record = (time.perf_counter() - start) / 10000
+        recorder.close()
+        assert recorder.written == 5 and recorder.dropped == 9995
+        assert per_record < 50e-6
+
+
+def write_log(path, offsets):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, offset in enumerate(offsets):
+            body = {"topic": f"replayed topic {i % 3}", "level": "beginner"}
+            f.write(json.dumps({"ts": 1000 + offset, "method": "POST", "path": "/process", "body": body,
+                                "status": 200, "latency_ms": 5.0}) + "\n")
+
+
+def test_replay_keeps_recorded_timing():
+    use_client(FakeClient(latency=0.01), cache=TreeCache(max_size=64, ttl=60))
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "traffic.jsonl")
+        write_log(log, [0.0, 0.1, 0.2, 0.4, 0.6, 0.8])
+        records = replay_traffic.load_records([log])
+
+        async def run(speed):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay") as http:
+                return await replay_traffic.replay(http, records, speed=speed)
+
+        paced = asyncio.run(run(2.0))
+        assert paced["requests"] == 6 and paced["paths"]["/process"]["errors"] == 0
+        # 0.8s of recorded traffic at 2x takes about 0.4s, never less.
+        assert 0.4 <= paced["seconds"] < 0.8
+        assert paced["schedule_lag_p99_ms"] < 50
+
+        flat_out = asyncio.run(run(0))
+        assert flat_out["seconds"] < 0.3
+
+
+def test_replay_cli_runs_in_process():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "traffic.jsonl")
+        write_log(log, [0.0, 0.05, 0.1])
+        output = os.path.join(tmp, "report.json")
+        assert replay_traffic.main([log, "--speed", "0", "--fake-latency-ms", "5", "--output", output]) == 0
+        with open(output, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        assert report["requests"] == 3 and "cache" in report["server"]
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,69 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.modules.tree_cache import TreeCache, normalize_key
+from fake_gemini import FakeClient, FakeClock, make_connector, run_checks
+
+
+def test_normalize_key():
+    assert normalize_key("  Python!! ", "beginner") == normalize_key("python", "Beginner")
+    assert normalize_key("Machine   Learning", "beginner") == normalize_key("machine-learning", "beginner")
+    assert normalize_key("python", "beginner") != normalize_key("python", "advanced")
+
+
+def test_normalize_key_keeps_language_symbols():
+    keys = {normalize_key(topic, "beginner") for topic in ("C", "C++", "C#", ".NET", "net")}
+    assert len(keys) == 5
+    assert normalize_key(" C++! ", "Beginner") == "beginner|c++"
+    assert normalize_key("ASP.NET core", "beginner") == "beginner|asp net core"
+    assert normalize_key("Node.js", "beginner") == normalize_key("node js", "beginner")
+    assert normalize_key("Café, Ökonomie", "beginner") == "beginner|café ökonomie"
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = TreeCache(max_size=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    clock.now = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+
+def test_hit_skips_upstream():
+    client = FakeClient(latency=0.05)
+    connector = make_connector(client)
+    first = asyncio.run(connector.aprocess_request("Python", "beginner"))
+    assert asyncio.run(connector.aprocess_request("  python. ", "BEGINNER")) is first
+    start = time.perf_counter()
+    second = connector.process_request("PYTHON", "beginner")
+    elapsed = time.perf_counter() - start
+    assert second is first
+    assert client.calls == 1
+    print(f"  cache hit served in {elapsed * 1e6:.0f}us")
+
+
+def test_errors_and_fallbacks_not_cached():
+    client = FakeClient(text="not json")
+    connector = make_connector(client)
+    assert "error" in connector.process_request("Python", "beginner")
+    client.error = Exception("429 RESOURCE_EXHAUSTED")
+    fallback = connector.process_request("Python", "beginner")
+    assert "[Mock Mode]" in fallback["chatbot"]["message"]
+    assert len(connector.cache) == 0
+    # One parse failure, then one 429 per model before falling back.
+    assert client.calls == 1 + len(connector.router.models)
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,89 @@
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.main import encoded_trees, path_builder
+from backend.modules.expansion import tree_id
+from backend.modules.tree_codec import EncodedTrees, accepted_encodings, etag_matches
+from fake_gemini import FakeClient, LIVE_TREE, post, run_checks, use_client
+
+
+def test_encoded_once_per_cached_tree():
+    trees = EncodedTrees(max_size=4)
+    first = trees.get(LIVE_TREE)
+    assert trees.get(LIVE_TREE) is first and trees.hits == 1
+    assert json.loads(first.body) == {**LIVE_TREE, "tree_id": tree_id(LIVE_TREE)}
+    assert gzip.decompress(first.gzip) == first.body
+    # An equal but distinct dict is a separate entry with the same ETag.
+    copy = json.loads(json.dumps(LIVE_TREE))
+    assert trees.get(copy) is not first and trees.get(copy).etag == first.etag
+
+
+def test_errors_and_invalid_trees_are_not_encoded():
+    trees = EncodedTrees()
+    assert trees.get({"error": "boom"}) is None
+    assert trees.get({"tree": {"title": "x"}}) is None
+    assert trees.stats()["invalid"] == 1
+
+
+def test_header_parsing():
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+    assert accepted_encodings(None) == set()
+    assert etag_matches('W/"abc", "def"', '"def"')
+    assert etag_matches('W/"abc"', '"abc"') and etag_matches("*", '"abc"')
+    assert not etag_matches('"abc"', '"abd"') and not etag_matches(None, '"abc"')
+
+
+def test_process_sends_compressed_body_with_etag():
+    use_client(FakeClient())
+    body = {"topic": "etag topic", "level": "beginner"}
+    first = post("/process", body, {"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert int(first.headers["content-length"]) < len(json.dumps(first.json())) / 2
+    assert first.json()["tree"] == LIVE_TREE["tree"] and first.json()["tree_id"]
+    etag = first.headers["etag"]
+
+    plain = post("/process", body, {"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.headers["etag"] == etag
+
+    repeat = post("/process", body, {"If-None-Match": etag})
+    assert repeat.status_code == 304 and repeat.content == b"" and repeat.headers["etag"] == etag
+    stale = post("/process", body, {"If-None-Match": '"stale"'})
+    assert stale.status_code == 200 and stale.json()["tree_id"] == first.json()["tree_id"]
+
+
+def test_cache_hits_reuse_the_encoding():
+    use_client(FakeClient())
+    body = {"topic": "encoded topic", "level": "beginner"}
+    post("/process", body)
+    before = encoded_trees.hits
+    response = post("/process", body)
+    assert encoded_trees.hits == before + 1
+    # The tree ID still resolves for /expand.
+    assert path_builder._served_tree(response.json()["tree_id"]) is not None
+
+
+def test_graph_trees_get_etags():
+    path_builder.gemini.use_mock = True
+    body = {"topic": "learn html css and javascript", "level": "beginner"}
+    first = post("/generate_path", {"text": body["topic"]})
+    assert first.status_code == 200 and first.headers.get("etag")
+    assert post("/process", body, {"If-None-Match": first.headers["etag"]}).status_code == 304
+
+
+def test_errors_keep_the_json_path():
+    use_client(FakeClient(error=Exception("500 INTERNAL")))
+    response = post("/process", {"topic": "broken topic", "level": "beginner"})
+    assert response.status_code == 200 and "error" in response.json()
+    assert "etag" not in response.headers
+
+
+if __name__ == "__main__":
+    run_checks(globals())
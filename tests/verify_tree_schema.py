@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.main import path_builder
+from backend.modules.metrics import TREE_PARSES
+from backend.modules.tree_schema import LEAF_FIELDS, LearningTree, parse_children, parse_tree, tree_prompt_prefix
+from fake_gemini import FakeClient, LIVE_TREE, TREE_TEXT, post, run_checks, use_client
+
+
+def leaves(result):
+    return [leaf for module in result["tree"]["children"] for leaf in module["children"]]
+
+
+def test_complete_output_parses_as_is():
+    result, complete = parse_tree(TREE_TEXT)
+    assert complete and result == LIVE_TREE
+    fenced, complete = parse_tree("```json\n" + TREE_TEXT + "\n```")
+    assert complete and fenced == LIVE_TREE
+    # The schema sent to Gemini describes what the app already serves.
+    LearningTree.model_validate(LIVE_TREE)
+
+
+def test_every_truncation_repairs_or_fails_cleanly():
+    repaired = 0
+    for cut in range(1, len(TREE_TEXT)):
+        try:
+            result, complete = parse_tree(TREE_TEXT[:cut])
+        except ValueError:
+            continue
+        repaired += 1
+        assert not complete
+        for module in result["tree"]["children"]:
+            assert module["children"]
+        for leaf in leaves(result):
+            # No half-written leaf survives the repair.
+            assert all(leaf[f] for f in LEAF_FIELDS) and leaf in leaves(LIVE_TREE)
+        LearningTree.model_validate(result)
+    assert repaired > len(TREE_TEXT) // 2
+
+
+def test_partial_last_node_is_dropped():
+    cut = TREE_TEXT.index('"quiz"', TREE_TEXT.index(leaves(LIVE_TREE)[1]["title"]))
+    result, complete = parse_tree(TREE_TEXT[:cut])
+    assert not complete
+    assert [leaf["title"] for leaf in leaves(result)] == [leaves(LIVE_TREE)[0]["title"]]
+    assert result["chatbot"]["actions"] and "roadmap" in result["chatbot"]["message"]
+    LearningTree.model_validate(result)
+
+
+def test_truncated_expansion_keeps_finished_children():
+    text = json.dumps({"children": [
+        {"title": "Generators", "role": "leaf", "explanation": "Lazy.", "task": "Write one", "quiz": "yield?"},
+        {"title": "Decorators", "role": "leaf", "explanation": "Wrap functions.", "task": "Time a call", "quiz": "@?"},
+    ]})
+    children = parse_children(text[:text.index("Time a call")])
+    assert [child["title"] for child in children] == ["Generators"]
+    assert len(parse_children(text)) == 2
+
+
+def test_prompt_is_short_and_shared_per_level():
+    gemini = path_builder.gemini
+    tree_prompt_prefix.cache_clear()
+    first = gemini._build_tree_prompt("medieval poetry", "beginner")
+    second = gemini._build_tree_prompt("rust", "beginner")
+    assert len(first) < 800 and first.endswith('"medieval poetry"')
+    assert first[:-len('"medieval poetry"')] == second[:-len('"rust"')]
+    assert tree_prompt_prefix.cache_info().hits == 1
+    assert gemini._tree_config().response_schema is LearningTree
+
+
+def test_truncated_generation_is_served_but_not_cached():
+    cut = TREE_TEXT.index("chatbot")
+    client = FakeClient(text=TREE_TEXT[:cut])
+    use_client(client)
+    before = TREE_PARSES.value("repaired")
+
+    body = {"topic": "truncated topic", "level": "beginner"}
+    first = post("/process", body)
+    assert first.status_code == 200
+    assert first.json()["tree"] == LIVE_TREE["tree"] and "error" not in first.json()
+    assert TREE_PARSES.value("repaired") == before + 1
+
+    # A repaired tree is not cached, so the next request tries again.
+    client.text = TREE_TEXT
+    second = post("/process", body).json()
+    assert client.calls == 2 and second["chatbot"] == LIVE_TREE["chatbot"]
+
+
+def test_repaired_tree_is_served_as_a_valid_tree():
+    from backend.main import encoded_trees
+
+    # Cut inside the last leaf, so the chatbot block never arrived.
+    cut = TREE_TEXT.index('"quiz"', TREE_TEXT.index(leaves(LIVE_TREE)[-1]["title"]))
+    use_client(FakeClient(text=TREE_TEXT[:cut]))
+    invalid = encoded_trees.invalid
+    response = post("/process", {"topic": "cut off topic", "level": "beginner"})
+    assert response.status_code == 200 and response.headers.get("etag")
+    result = response.json()
+    LearningTree.model_validate(result)
+    assert len(leaves(result)) == len(leaves(LIVE_TREE)) - 1
+    assert encoded_trees.invalid == invalid
+
+
+def test_unusable_output_is_still_an_error():
+    use_client(FakeClient(text='{"tree": {"title": "x", "children": ['))
+    result = post("/process", {"topic": "empty topic", "level": "beginner"}).json()
+    assert "error" in result
+
+
+if __name__ == "__main__":
+    run_checks(globals())
@@ -0,0 +1,176 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.modules.tree_store import SQLiteTreeStore
+from fake_gemini import FakeClient, FakeClock, LIVE_TREE, make_connector, run_checks
+
+
+def _worker(path, worker, workers, rounds, errors):
+    # Each process writes its own keys and reads everybody else's.
+    try:
+        store = SQLiteTreeStore(path)
+        for i in range(rounds):
+            store.set(f"w{worker}|{i}", {"worker": worker, "i": i, "tree": LIVE_TREE["tree"]})
+        for i in range(rounds):
+            for other in range(workers):
+                value = store.get(f"w{other}|{i}")
+                if value is not None and (value["worker"], value["i"]) != (other, i):
+                    errors.put(f"worker {worker} read a wrong value for w{other}|{i}")
+    except Exception as e:
+        errors.put(f"worker {worker}: {e!r}")
+
+
+def test_processes_share_one_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trees.sqlite3")
+        SQLiteTreeStore(path)
+        workers, rounds = 4, 50
+        errors = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=_worker, args=(path, w, workers, rounds, errors))
+            for w in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(60)
+            assert p.exitcode == 0, p.exitcode
+        assert errors.empty(), errors.get()
+
+        store = SQLiteTreeStore(path)
+        assert len(store) == workers * rounds
+        for w in range(workers):
+            assert store.get(f"w{w}|{rounds - 1}")["worker"] == w
+
+
+def test_persists_across_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trees.sqlite3")
+        SQLiteTreeStore(path).set("tree|beginner|python", LIVE_TREE)
+        assert SQLiteTreeStore(path).get("tree|beginner|python") == LIVE_TREE
+
+
+def test_ttl_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock(1000.0)
+        store = SQLiteTreeStore(os.path.join(tmp, "trees.sqlite3"), ttl=10, clock=clock)
+        store.set("a", {"v": 1})
+        clock.now += 9
+        assert store.get("a") == {"v": 1}
+        clock.now += 2
+        assert store.get("a") is None
+        assert store.evict() == 1 and len(store) == 0
+
+
+def test_size_eviction_drops_least_recently_read():
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock(1000.0)
+        store = SQLiteTreeStore(
+            os.path.join(tmp, "trees.sqlite3"), max_bytes=10 ** 9, evict_every=1000,
+            touch_interval=0, clock=clock,
+        )
+        for i in range(20):
+            clock.now += 1
+            store.set(f"k{i}", {"payload": os.urandom(256).hex()})
+        clock.now += 1
+        store.get("k0")  # recently read, so it survives
+        store.flush()  # commits the recency update
+        store.max_bytes = store.stats()["bytes"] // 2
+        assert store.evict() > 0
+        assert store.stats()["bytes"] <= store.max_bytes
+        assert store.get("k0") is not None
+        assert store.get("k1") is None
+        store.close()
+
+
+def test_connector_reads_another_workers_tree():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trees.sqlite3")
+        first = make_connector(FakeClient(), store=SQLiteTreeStore(path))
+        asyncio.run(first.aprocess_request("Python", "beginner"))
+        first.store.flush()  # the writer thread would commit it shortly
+
+        # A second "worker": its own memory cache, same store file.
+        client = FakeClient()
+        second = make_connector(client, store=SQLiteTreeStore(path))
+        result = asyncio.run(second.aprocess_request("python", "Beginner"))
+        assert result == LIVE_TREE
+        assert client.calls == 0
+
+
+def test_request_path_never_waits_on_a_write_lock():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trees.sqlite3")
+        store = SQLiteTreeStore(path, touch_interval=0)
+        store.set("a", {"v": 1})
+        # Another "worker" holds the write lock, as during a long commit.
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN EXCLUSIVE")
+        try:
+            start = time.perf_counter()
+            assert store.get("a") == {"v": 1}  # the recency update is queued
+            store.put("b", {"v": 2})
+            assert store.get("b") == {"v": 2}  # served from the queue
+            assert time.perf_counter() - start < 0.05
+        finally:
+            other.execute("ROLLBACK")
+            other.close()
+        store.flush()
+        assert SQLiteTreeStore(path).get("b") == {"v": 2}
+        store.close()
+
+
+def test_busy_read_is_a_miss():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteTreeStore(os.path.join(tmp, "trees.sqlite3"))
+
+        def locked(key):
+            raise sqlite3.OperationalError("database is locked")
+
+        store._get = locked
+        assert store.get("a") is None
+        assert store.stats()["read_timeouts"] == 1 and store.misses == 1
+
+
+def test_store_reads_do_not_block_the_loop():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteTreeStore(os.path.join(tmp, "trees.sqlite3"))
+        store.set("tree|beginner|python", LIVE_TREE)
+        slow_get = store._get
+
+        def slow(key):
+            time.sleep(0.2)
+            return slow_get(key)
+
+        store._get = slow
+        connector = make_connector(FakeClient(), store=store)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            result = await connector.aprocess_request("Python", "beginner")
+            task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(run())
+        assert result == LIVE_TREE and ticks >= 10
+
+
+if __name__ == "__main__":
+    run_checks(globals())
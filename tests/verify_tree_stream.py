@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.main import path_builder
+from backend.modules.mock_connector import MockConnector
+from backend.modules.tree_stream import IncrementalTreeParser, iter_tree_events
+from fake_gemini import FakeClient, post, run_checks, use_client
+
+DOC = MockConnector().process_request("Python", "beginner")
+TEXT = json.dumps(DOC, indent=2)
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(c) for c in node.get("children", []))
+
+
+def test_events_match_document_for_any_chunking():
+    expected = list(iter_tree_events(DOC))
+    for size in (1, 3, 17, 64, len(TEXT)):
+        parser = IncrementalTreeParser()
+        events = []
+        for i in range(0, len(TEXT), size):
+            events += parser.feed(TEXT[i:i + size])
+        assert parser.complete and parser.error is None
+        assert parser.result() == DOC
+        assert events == expected
+    assert [e["path"] for e in expected[:3]] == [[], [0], [0, 0]]
+
+
+def test_root_arrives_before_first_leaf_closes():
+    parser = IncrementalTreeParser()
+    cut = TEXT.index('"Basic syntax"')
+    paths = [e["path"] for e in parser.feed(TEXT[:cut])]
+    assert paths == [[], [0], [0, 0]]
+
+
+def test_truncated_output_is_repaired_at_every_cut():
+    previous = 0
+    for cut in range(0, len(TEXT), 5):
+        parser = IncrementalTreeParser()
+        parser.feed(TEXT[:cut])
+        result = parser.result()
+        json.dumps(result)
+        if "tree" in result:
+            nodes = count_nodes(result["tree"])
+            assert nodes >= previous
+            previous = nodes
+            for module in result["tree"]["children"]:
+                for leaf in module["children"]:
+                    assert {"title", "task", "quiz"} <= set(leaf)
+    assert previous == count_nodes(DOC["tree"])
+
+
+def post_stream(payload):
+    response = post("/process/stream", payload)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_mock_connector_streams_offline():
+    path_builder.gemini.api_key = "offline"
+    path_builder.gemini.use_mock = True
+    events = post_stream({"topic": "Rust", "level": "beginner"})
+    nodes = [e for e in events if e["type"] == "node"]
+    assert nodes[0]["path"] == [] and nodes[0]["node"]["title"] == "Rust"
+    assert len(nodes) == 13
+    assert events[-1] == {"type": "done", "complete": True, "cached": False}
+
+
+def test_live_stream_is_cached_and_replayed():
+    client = FakeClient(chunk_size=32)
+    use_client(client)
+
+    first = post_stream({"topic": "Go", "level": "advanced"})
+    second = post_stream({"topic": "go", "level": "advanced"})
+    assert client.calls == 1
+    assert first[:-1] == second[:-1]
+    assert second[-1]["cached"] is True
+
+
+def test_unparseable_stream_ends_with_error():
+    broken = TEXT[:TEXT.index('"children"')] + '"children": [oops, ' + " " * 400
+    client = FakeClient(text=broken, chunk_size=16)
+    use_client(client)
+    events = post_stream({"topic": "Broken", "level": "beginner"})
+    assert events[-2]["type"] == "error" and "unparseable" in events[-2]["error"]
+    assert events[-1] == {"type": "done", "complete": False, "cached": False}
+    # The upstream stream was closed at the error, not read to the end.
+    assert client.streams_closed == 1 and client.chunks_sent < len(broken) // 16
+    assert post_stream({"topic": "Broken", "level": "beginner"}) and client.calls == 2
+
+
+if __name__ == "__main__":
+    run_checks(globals())
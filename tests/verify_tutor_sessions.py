@@ -0,0 +1,170 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from backend.main import path_builder
+from backend.modules.tree_store import SQLiteTreeStore
+from backend.modules.tutor_sessions import TUTOR_PROMPT, TutorSessions
+from fake_gemini import FakeClient, FakeClock, LIVE_TREE, make_connector, post, request, run_checks, use_client
+
+ANSWER = "A closure captures variables from the scope it was defined in. It keeps them alive after that scope returns."
+
+
+def chat(message, session_id="s1", **extra):
+    body = {"message": message, "topic": "Python", "level": "beginner", "node_context": "Functions"}
+    if session_id:
+        body["session_id"] = session_id
+    body.update(extra)
+    return post("/chat", body).json()["response"]
+
+
+def test_follow_up_sees_earlier_turns():
+    client = FakeClient(text=ANSWER)
+    use_client(client, sessions=TutorSessions())
+    chat("What is a closure?", tree=LIVE_TREE["tree"])
+    first = client.last_prompt
+    module = LIVE_TREE["tree"]["children"][0]
+    assert module["title"] in first and module["children"][0]["title"] in first
+
+    chat("Can you show an example?")
+    second = client.last_prompt
+    assert "What is a closure?" in second and ANSWER in second
+    # The new turn only extends the previous prompt, so its prefix is cacheable.
+    assert second.startswith(first[:first.rindex("Current focus")])
+    assert second.startswith(TUTOR_PROMPT)
+
+
+def test_without_session_chat_stays_stateless():
+    client = FakeClient(text=ANSWER)
+    use_client(client, sessions=TutorSessions())
+    chat("What is a closure?", session_id=None)
+    chat("Can you show an example?", session_id=None)
+    assert "What is a closure?" not in client.last_prompt
+    assert len(path_builder.gemini.sessions) == 0
+
+
+def test_streamed_answers_are_remembered():
+    client = FakeClient(text=ANSWER, chunk_size=16)
+    use_client(client, sessions=TutorSessions())
+    body = {"message": "What is a closure?", "topic": "Python", "session_id": "s2"}
+    assert post("/chat/stream", body).status_code == 200
+    chat("And a decorator?", session_id="s2")
+    assert ANSWER in client.last_prompt
+
+
+def test_cut_short_stream_is_not_remembered():
+    client = FakeClient(text=ANSWER, chunk_size=8, chunk_delay=0.01)
+    sessions = TutorSessions()
+    use_client(client, sessions=sessions)
+
+    async def read_one_then_leave():
+        chunks = path_builder.gemini.astream_tutor_response("What is a closure?", "Python", session_id="s3")
+        await chunks.__anext__()
+        await chunks.aclose()
+
+    asyncio.run(read_one_then_leave())
+    assert sessions.open("s3", "Python", "beginner").turns == []
+
+
+def test_history_is_bounded_and_summarized():
+    client = FakeClient(text=ANSWER * 3)
+    sessions = TutorSessions(max_turns=4, max_chars=1500, summary_chars=600)
+    use_client(client, sessions=sessions)
+    sizes = []
+    for i in range(40):
+        chat(f"Question number {i} about closures?")
+        sizes.append(len(client.last_prompt))
+    session = sessions.open("s1", "Python", "beginner")
+    assert len(session.turns) <= 4 and session.chars <= 1500
+    assert session.summary and sum(len(line) + 1 for line in session.summary) <= 600
+    assert "Question number 39" in session.turns[-1][0]
+    # Prompt size stops growing once the history is full.
+    assert max(sizes[20:]) <= max(sizes[:20]) + 100
+    stats = sessions.stats()
+    assert stats["turns_folded"] == 40 - len(session.turns)
+    assert stats["largest_session_chars"] == session.size() < 3000
+
+
+def test_lru_eviction_and_expiry():
+    clock = FakeClock()
+    sessions = TutorSessions(max_sessions=2, ttl=60, clock=clock)
+    a = sessions.open("a", "Python", "beginner")
+    sessions.open("b", "Python", "beginner")
+    assert sessions.open("a", "Python", "beginner") is a  # a is now most recent
+    sessions.open("c", "Python", "beginner")
+    assert sessions.stats()["evictions"] == 1
+    assert sessions.open("a", "Python", "beginner") is a
+    assert sessions.stats()["created"] == 3
+
+    clock.now = 61
+    assert sessions.open("a", "Python", "beginner") is not a
+    assert sessions.stats()["expirations"] == 1
+
+
+def test_new_topic_starts_over_and_bad_ids_are_ignored():
+    sessions = TutorSessions()
+    first = sessions.open("a", "Python", "beginner")
+    sessions.record(first, "hi", "hello")
+    assert sessions.open("a", "Rust", "beginner").turns == []
+    assert sessions.open("", "Python", "beginner") is None
+    assert sessions.open("x" * 65, "Python", "beginner") is None
+
+
+def test_workers_share_sessions_through_the_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trees.sqlite3")
+        a = TutorSessions(store=SQLiteTreeStore(path))
+        b = TutorSessions(store=SQLiteTreeStore(path))
+        first = a.open("s", "Python", "beginner", LIVE_TREE)
+        a.record(first, "What is a closure?", ANSWER)
+        a.store.flush()
+
+        second = b.open("s", "Python", "beginner")
+        assert second.prefix == first.prefix and second.turns == first.turns
+        b.record(second, "And a decorator?", "It wraps a function.")
+        b.store.flush()
+        # a's copy is now stale; it picks up b's turn instead of reusing it.
+        again = a.open("s", "Python", "beginner")
+        assert [q for q, _ in again.turns] == ["What is a closure?", "And a decorator?"]
+        assert a.stats()["restored"] == 1 and b.stats()["restored"] == 1
+        # An unchanged session is served from memory.
+        assert a.open("s", "Python", "beginner") is again
+        a.store.close()
+        b.store.close()
+
+
+def test_follow_up_on_another_connector_keeps_history_and_tree():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trees.sqlite3")
+        workers = []
+        for _ in range(2):
+            connector = make_connector(FakeClient(text=ANSWER), store=SQLiteTreeStore(path))
+            connector.sessions.store = connector.store
+            workers.append(connector)
+
+        asyncio.run(workers[0].aget_tutor_response("What is a closure?", "Python", session_id="w",
+                                                   tree=LIVE_TREE["tree"]))
+        workers[0].store.flush()
+        asyncio.run(workers[1].aget_tutor_response("Can you show an example?", "Python", session_id="w"))
+        prompt = workers[1].client.last_prompt
+        assert "What is a closure?" in prompt and ANSWER in prompt
+        assert LIVE_TREE["tree"]["children"][0]["title"] in prompt
+        for connector in workers:
+            connector.store.close()
+
+
+def test_stats_endpoint():
+    use_client(FakeClient(text=ANSWER), sessions=TutorSessions())
+    chat("What is a closure?")
+    stats = request("GET", "/chat/sessions/stats").json()
+    assert stats["sessions"] == 1 and stats["avg_prompt_chars"] > 0
+
+
+if __name__ == "__main__":
+    run_checks(globals())
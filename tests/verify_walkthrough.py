@@ -4,6 +4,11 @@ import sys
 
 BASE_URL = "http://127.0.0.1:8000"
 
+def walk(node):
+    yield node
+    for child in node.get("children") or []:
+        yield from walk(child)
+
 def test_scenario(name, payload, checks):
     print(f"\n--- Testing Scenario: {name} ---")
     try:
@@ -12,9 +17,9 @@ def test_scenario(name, payload, checks):
         data = response.json()
         
         print(f"Status: {response.status_code}")
-        print(f"Domain: {data.get('domain')}")
-        print(f"Confidence: {data.get('confidence')}")
-        print(f"Nodes Count: {len(data.get('nodes', []))}")
+        print(f"Root: {data.get('tree', {}).get('title')}")
+        print(f"Nodes Count: {sum(1 for _ in walk(data.get('tree', {})))}")
+        print(f"Server-Timing: {response.headers.get('server-timing')}")
         
         # Run checks
         for description, check_func in checks.items():
@@ -29,34 +34,35 @@ def test_scenario(name, payload, checks):
         sys.exit(1)
 
 def run_tests():
-    # Scenario 1: Domain Detection
+    # Scenario 1: Tree shape
     test_scenario(
-        "Domain Detection (Web Dev)",
+        "Tree Shape (Web Dev)",
         {"text": "I want to learn javascript and react", "level": "beginner"},
         {
-            "Domain is web_development": lambda d: d["domain"] == "web_development",
-            "Confidence > 0": lambda d: d["confidence"] > 0
+            "Root node present": lambda d: d["tree"]["role"] == "root",
+            "Has modules": lambda d: len(d["tree"]["children"]) > 0,
+            "Tree ID returned": lambda d: bool(d.get("tree_id"))
         }
     )
 
-    # Scenario 2: Level Filtering (Beginner)
+    # Scenario 2: Node fields
     test_scenario(
-        "Level Filtering (Beginner)",
+        "Node Fields (Beginner)",
         {"text": "machine learning basics", "level": "beginner"},
         {
-            "Domain is machine_learning": lambda d: d["domain"] == "machine_learning",
-            "All nodes <= Level 3": lambda d: all(n["level"] <= 3 for n in d["nodes"]),
-            "Core nodes present": lambda d: len(d["nodes"]) > 0
+            "Every node has a title": lambda d: all(n.get("title") for n in walk(d["tree"])),
+            "Roles are valid": lambda d: all(n.get("role") in ("root", "parent", "leaf") for n in walk(d["tree"])),
+            "Leaves have tasks": lambda d: all(n.get("task") for n in walk(d["tree"]) if n.get("role") == "leaf")
         }
     )
 
-    # Scenario 3: AI Structure
+    # Scenario 3: Chatbot greeting
     test_scenario(
-        "AI Structure Check",
+        "Chatbot Structure Check",
         {"text": "python for data science", "level": "intermediate"},
         {
-            "AI Suggestions field exists": lambda d: "ai_suggestions" in d,
-            "Is list": lambda d: isinstance(d["ai_suggestions"], list)
+            "Chatbot message exists": lambda d: bool(d["chatbot"]["message"]),
+            "Actions is list": lambda d: isinstance(d["chatbot"]["actions"], list)
         }
     )
 
@@ -0,0 +1,43 @@
+"""Rebuilds the precompiled TF-IDF artifact next to domains.json.
+
+The API loads backend/data/domains.tfidf.npz instead of fitting the TF-IDF
+index at startup. The artifact records a hash of domains.json and is refitted
+automatically when it goes stale (on start or on POST /admin/reload), but run
+this after editing domains.json so the fresh artifact ships with it.
+
+    python utils/compile_tfidf.py
+    python utils/compile_tfidf.py --data backend/data/domains.json --output /tmp/domains.tfidf.npz
+"""
+import argparse
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.modules.tfidf_engine import TFIDFEngine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=str(ROOT / "backend" / "data" / "domains.json"))
+    parser.add_argument("--output", help="artifact path (default: next to --data)")
+    args = parser.parse_args(argv)
+
+    engine = TFIDFEngine(args.data, args.output)
+    with open(args.data, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    engine.load_data()
+    if not engine.fitted:
+        # The artifact was current; refit anyway so the output is fresh.
+        engine.train_vectorizer()
+    engine.save_artifact(digest)
+    size = os.path.getsize(engine.artifact_path)
+    print(f"{engine.artifact_path}: {len(engine._names)} domains, {len(engine._vocabulary)} terms, {size} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Offline stand-in for google.genai.Client.
+
+FakeClient answers every call with a canned tree (or any text), after a
+configurable latency and with optional simulated 429s and 500s. The verify
+and bench scripts use it, and so does utils/replay_traffic.py when it replays
+against the in-process app.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+
+from backend.modules.mock_connector import MockConnector
+
+LIVE_TREE = MockConnector().process_request("Python", "beginner")
+LIVE_TREE["chatbot"]["message"] = "Welcome to your complete Python roadmap!"
+TREE_TEXT = json.dumps(LIVE_TREE)
+
+
+def lognormal_latency(median, p99, seed=None):
+    """Latency sampler with the given median and 99th percentile, in seconds."""
+    if median <= 0:
+        return lambda: 0.0
+    # The 99th percentile of a lognormal sits 2.326 sigmas above the median.
+    sigma = math.log(p99 / median) / 2.326 if p99 > median else 0.0
+    rng = random.Random(seed)
+    return lambda: rng.lognormvariate(math.log(median), sigma)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        self.owner.calls += 1
+        self.owner.last_prompt = contents
+        time.sleep(self.owner.delay())
+        return self.owner.respond(model, contents)
+
+
+class FakeAsyncModels:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def generate_content(self, model, contents, config=None):
+        self.owner.calls += 1
+        self.owner.last_prompt = contents
+        await asyncio.sleep(self.owner.delay())
+        return self.owner.respond(model, contents)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        self.owner.calls += 1
+        self.owner.last_prompt = contents
+        await asyncio.sleep(self.owner.delay())
+        self.owner.check(model)
+        return self.owner.stream(model, contents)
+
+
+class FakeAio:
+    def __init__(self, owner):
+        self.models = FakeAsyncModels(owner)
+
+
+class FakeClient:
+    def __init__(self, latency=0.0, text=TREE_TEXT, error=None, chunk_size=64, chunk_delay=0.0, quota=None,
+                 error_rate=0.0, quota_rate=0.0, seed=None):
+        # A number of seconds, or a callable returning one per call
+        # (see lognormal_latency).
+        self.latency = latency
+        self.text = text
+        self.error = error
+        # model -> number of calls it accepts before answering with 429s.
+        self.quota = quota
+        # Fractions of calls that fail at random with a 500 or a 429.
+        self.error_rate = error_rate
+        self.quota_rate = quota_rate
+        self.rng = random.Random(seed)
+        self.random_errors = 0
+        self.random_429s = 0
+        self.calls_by_model = {}
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.last_prompt = None
+        self.chunks_sent = 0
+        self.streams_closed = 0
+        self.models = FakeModels(self)
+        self.aio = FakeAio(self)
+
+    def delay(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    def check(self, model):
+        self.calls_by_model[model] = self.calls_by_model.get(model, 0) + 1
+        if self.error is not None:
+            raise self.error
+        if self.quota_rate or self.error_rate:
+            roll = self.rng.random()
+            if roll < self.quota_rate:
+                self.random_429s += 1
+                raise Exception(f"429 RESOURCE_EXHAUSTED: simulated rate limit on {model}")
+            if roll < self.quota_rate + self.error_rate:
+                self.random_errors += 1
+                raise Exception("500 INTERNAL: simulated upstream error")
+        if self.quota is not None and self.calls_by_model[model] > self.quota.get(model, 0):
+            raise Exception(f"429 RESOURCE_EXHAUSTED: quota exceeded for {model}")
+
+    def respond(self, model, contents):
+        self.check(model)
+        return FakeResponse(self.text)
+
+    async def stream(self, model, contents):
+        try:
+            for i in range(0, len(self.text), self.chunk_size):
+                await asyncio.sleep(self.chunk_delay)
+                self.chunks_sent += 1
+                yield FakeResponse(self.text[i:i + self.chunk_size])
+        finally:
+            self.streams_closed += 1
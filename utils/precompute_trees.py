@@ -0,0 +1,212 @@
+"""Pre-generates learning trees for every domains.json keyword at every level.
+
+Trees go into the shared tree store (TREE_STORE_PATH), where every API worker
+finds them before calling Gemini, and optionally into static JSON files the
+frontend fetches directly. Finished jobs are appended to a checkpoint file, so
+an interrupted or rate-limited run picks up where it stopped.
+
+    python utils/precompute_trees.py --static-dir frontend/precomputed   # then set PRECOMPUTED_URL in frontend/config.js
+    python utils/precompute_trees.py --mock --store /tmp/trees.sqlite3 --checkpoint /tmp/ckpt.jsonl   # offline
+
+Mock trees are canned placeholders, so --mock never uses the serving store,
+the default checkpoint or static files under frontend/: the store and
+checkpoint paths must be given and must differ from the serving ones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+
+from backend.modules.admission import Overloaded
+from backend.modules.gemini_connector import GeminiConnector
+from backend.modules.tree_cache import normalize_key
+from backend.modules.tree_store import SQLiteTreeStore
+
+LEVELS = ("beginner", "intermediate", "advanced")
+DEFAULT_STORE = ".cache/trees.sqlite3"
+DEFAULT_CHECKPOINT = ".cache/precompute_checkpoint.jsonl"
+FRONTEND_DIR = ROOT / "frontend"
+
+
+def load_jobs(domains_path, levels=LEVELS):
+    # One job per distinct (keyword, level); keywords shared by several
+    # domains ("pandas", "sql") are generated once.
+    with open(domains_path, "r", encoding="utf-8") as f:
+        domains = json.load(f)
+    jobs = {}
+    for keywords in domains.values():
+        for keyword in keywords:
+            for level in levels:
+                jobs.setdefault(normalize_key(keyword, level), (keyword, level))
+    return jobs
+
+
+def load_checkpoint(path):
+    done = set()
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    done.add(json.loads(line)["key"])
+    return done
+
+
+def static_name(key):
+    level, topic = key.split("|", 1)
+    # Spell out the symbols normalize_key keeps, so c, c++ and c# get distinct files.
+    topic = topic.replace("+", "plus").replace("#", "sharp").replace(".", "dot")
+    return f"{level}/{re.sub(r'[^a-z0-9]+', '-', topic).strip('-') or 'topic'}.json"
+
+
+def write_static(static_dir, key, result):
+    name = static_name(key)
+    path = os.path.join(static_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return name
+
+
+def write_index(static_dir, names):
+    # index.json maps normalized "level|topic" keys to files, merged with
+    # whatever earlier runs already published.
+    path = os.path.join(static_dir, "index.json")
+    index = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    index.update(names)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(index.items())), f, indent=1)
+    os.replace(path + ".tmp", path)
+    return index
+
+
+async def precompute(connector, jobs, checkpoint=None, static_dir=None, concurrency=4,
+                     retries=5, backoff=5.0, ttl=7 * 86400, limit=None):
+    """Generates every job not yet in the checkpoint. Returns a summary dict."""
+    done = load_checkpoint(checkpoint)
+    pending = [(key, topic, level) for key, (topic, level) in jobs.items() if key not in done]
+    summary = {"total": len(jobs), "skipped": len(jobs) - len(pending), "generated": 0, "failed": 0, "retries": 0}
+    if limit is not None:
+        pending = pending[:limit]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    names = {}
+
+    async def run(key, topic, level):
+        async with semaphore:
+            result = None
+            for attempt in range(retries + 1):
+                try:
+                    result = await connector.agenerate_tree(topic, level)
+                    break
+                except Exception as e:
+                    # Out of quota (or shed by admission control): wait for the
+                    # router's buckets to refill instead of taking a fallback tree.
+                    busy = isinstance(e, Overloaded)
+                    if not (busy or connector._is_quota_error(e)) or attempt == retries:
+                        print(f"FAILED {key}: {e}")
+                        break
+                    summary["retries"] += 1
+                    delay = e.retry_after if busy else connector._retry_after(e)
+                    await asyncio.sleep(delay or backoff * 2 ** attempt)
+            if not isinstance(result, dict) or "tree" not in result:
+                summary["failed"] += 1
+                return
+
+        if connector.store is not None:
+            try:
+                connector.store.set("tree|" + key, result, ttl=ttl)
+            except sqlite3.OperationalError as e:
+                # Locked or full: leave the key out of the checkpoint so the
+                # next run tries it again.
+                print(f"FAILED {key}: tree store: {e}")
+                summary["failed"] += 1
+                return
+        async with write_lock:
+            if static_dir:
+                names[key] = write_static(static_dir, key, result)
+            if checkpoint:
+                with open(checkpoint, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key}) + "\n")
+        summary["generated"] += 1
+        print(f"OK {key}")
+
+    if checkpoint:
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint)), exist_ok=True)
+    await asyncio.gather(*(run(*job) for job in pending))
+    if static_dir and names:
+        write_index(static_dir, names)
+    return summary
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--domains", default=str(ROOT / "backend/data/domains.json"))
+    parser.add_argument("--levels", default=",".join(LEVELS))
+    parser.add_argument("--store", help=f"tree store (default: TREE_STORE_PATH or {DEFAULT_STORE})")
+    parser.add_argument("--static-dir", help="also write static JSON here, e.g. frontend/precomputed")
+    parser.add_argument("--checkpoint", help=f"default: {DEFAULT_CHECKPOINT}")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint and regenerate everything")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--backoff", type=float, default=5.0, help="first wait after a 429, in seconds")
+    parser.add_argument("--ttl", type=float, default=7 * 86400, help="store TTL for precomputed trees")
+    parser.add_argument("--limit", type=int, help="stop after this many jobs")
+    parser.add_argument("--mock", action="store_true", help="use MockConnector (offline, for testing)")
+    args = parser.parse_args(argv)
+
+    serving_store = os.environ.get("TREE_STORE_PATH", DEFAULT_STORE)
+    if args.mock:
+        # Mock trees must never be served as cache hits or mark live jobs done.
+        if not args.store or not args.checkpoint:
+            parser.error("--mock needs an explicit --store and --checkpoint")
+        if os.path.abspath(args.store) == os.path.abspath(serving_store):
+            parser.error(f"--mock cannot write to the serving store {serving_store}")
+        if os.path.abspath(args.checkpoint) == os.path.abspath(DEFAULT_CHECKPOINT):
+            parser.error("--mock cannot use the default checkpoint")
+        if args.static_dir and Path(os.path.abspath(args.static_dir)).is_relative_to(FRONTEND_DIR):
+            parser.error("--mock cannot write static files under frontend/")
+    args.store = args.store or serving_store
+    args.checkpoint = args.checkpoint or DEFAULT_CHECKPOINT
+
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    connector = GeminiConnector()
+    if args.mock:
+        connector.use_mock = True
+    elif not connector.api_key or not connector.client:
+        parser.error("GEMINI_API_KEY is not set (use --mock to run offline)")
+    connector.store = SQLiteTreeStore(args.store)
+
+    jobs = load_jobs(args.domains, [l.strip().lower() for l in args.levels.split(",") if l.strip()])
+    start = time.perf_counter()
+    summary = asyncio.run(precompute(
+        connector, jobs, checkpoint=args.checkpoint, static_dir=args.static_dir,
+        concurrency=args.concurrency, retries=args.retries, backoff=args.backoff,
+        ttl=args.ttl, limit=args.limit,
+    ))
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
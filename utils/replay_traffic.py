@@ -0,0 +1,173 @@
+"""Replays a recorded traffic log (TRAFFIC_LOG) with its original timing.
+
+Requests are sent at their recorded offsets divided by --speed, so --speed 1
+reproduces production arrival times, --speed 10 compresses them tenfold, and
+--speed 0 sends everything as fast as --concurrency allows. Rotated files
+(log.1, log.2, ...) and per-worker logs can be passed together; records are
+merged by timestamp.
+
+By default the app runs in-process with the fake Gemini client from
+utils/fake_client.py, so cache sizing, single-flight coalescing and rate-limit
+settings (the usual env vars) can be tried offline. --url targets a running
+server instead.
+
+    python utils/replay_traffic.py .cache/traffic.jsonl* --speed 5 --fake-latency-ms 800
+    python utils/replay_traffic.py .cache/traffic.jsonl --url http://127.0.0.1:8000 --speed 0
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def load_records(patterns):
+    records = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        records.append(json.loads(line))
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+async def replay(http, records, speed=1.0, concurrency=64):
+    """Re-issues records on the recorded schedule. Returns a report dict."""
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    results = {}
+    lags = []
+    t0 = records[0]["ts"] if records else 0.0
+    start = loop.time()
+
+    async def send(record):
+        async with semaphore:
+            sent = time.perf_counter()
+            try:
+                response = await http.request(record["method"], record["path"], json=record.get("body"))
+                await response.aread()
+                status = response.status_code
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - sent
+        stats = results.setdefault(record["path"], {"latencies": [], "errors": 0, "recorded_ms": []})
+        stats["latencies"].append(elapsed)
+        stats["errors"] += status is None or status >= 400
+        if record.get("latency_ms") is not None:
+            stats["recorded_ms"].append(record["latency_ms"])
+
+    tasks = []
+    for record in records:
+        if speed > 0:
+            due = start + (record["ts"] - t0) / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lags.append(max(0.0, loop.time() - due))
+        tasks.append(asyncio.ensure_future(send(record)))
+    await asyncio.gather(*tasks)
+    wall = loop.time() - start
+
+    report = {"requests": len(records), "seconds": round(wall, 3), "speed": speed, "paths": {}}
+    if records:
+        report["recorded_seconds"] = round(records[-1]["ts"] - t0, 3)
+    if lags:
+        lags.sort()
+        report["schedule_lag_p99_ms"] = round(percentile(lags, 99) * 1000, 2)
+    for path, stats in sorted(results.items()):
+        latencies = sorted(stats["latencies"])
+        recorded = sorted(stats["recorded_ms"])
+        report["paths"][path] = {
+            "requests": len(latencies),
+            "errors": stats["errors"],
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "recorded_p50_ms": percentile(recorded, 50),
+            "recorded_p99_ms": percentile(recorded, 99),
+        }
+    return report
+
+
+async def run(args, records):
+    import httpx
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=120) as http:
+            report = await replay(http, records, args.speed, args.concurrency)
+            report["server"] = {
+                "cache": (await http.get("/cache/stats")).json(),
+                "routes": (await http.get("/route/stats")).json(),
+            }
+        return report
+
+    from backend.main import app, path_builder
+    from utils.fake_client import FakeClient, lognormal_latency
+
+    path_builder.gemini.api_key = "offline-replay"
+    path_builder.gemini.use_mock = False
+    path_builder.gemini.client = FakeClient(
+        latency=lognormal_latency(args.fake_latency_ms / 1000, args.fake_p99_ms / 1000, seed=args.seed),
+        quota_rate=args.fake_quota_rate,
+        seed=args.seed,
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=120) as http:
+        report = await replay(http, records, args.speed, args.concurrency)
+        report["server"] = {
+            "cache": (await http.get("/cache/stats")).json(),
+            "routes": (await http.get("/route/stats")).json(),
+        }
+    report["upstream_calls"] = path_builder.gemini.client.calls
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("logs", nargs="+", help="traffic log files or glob patterns")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression; 0 = as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--url", help="replay against this server instead of the in-process app")
+    parser.add_argument("--fake-latency-ms", type=float, default=500.0)
+    parser.add_argument("--fake-p99-ms", type=float, default=2000.0)
+    parser.add_argument("--fake-quota-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        os.chdir(ROOT)
+        os.environ.setdefault("GEMINI_API_KEY", "offline-replay")
+        # Never record the replay itself.
+        os.environ.pop("TRAFFIC_LOG", None)
+
+    records = load_records(args.logs)
+    # The app logs a line per request; keep only its warnings.
+    logging.getLogger("backend").setLevel(logging.WARNING)
+    report = asyncio.run(run(args, records))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())